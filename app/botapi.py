@@ -0,0 +1,68 @@
+from pathlib import Path
+from typing import Any
+
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, SimpleFilesPathWrapper, TelegramAPIServer
+
+from app.config import settings
+
+
+class PooledAiohttpSession(AiohttpSession):
+    """
+    Bot API uchun sozlangan ulanishlar puli: keep-alive, umumiy va host bo‘yicha limit,
+    DNS kesh. Lokal serverga (bitta host) barcha so‘rovlar qayta ishlatiladigan ulanishlardan o‘tadi.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 30.0,
+        dns_ttl: int = 300,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(limit=limit, **kwargs)
+        self._connector_init.update(
+            limit_per_host=limit_per_host,
+            keepalive_timeout=keepalive_timeout,
+            ttl_dns_cache=dns_ttl,
+            use_dns_cache=dns_ttl > 0,
+            enable_cleanup_closed=True,
+        )
+
+
+def api_server() -> TelegramAPIServer:
+    """``BOT_API_URL`` bo‘lsa self-hosted server, aks holda api.telegram.org."""
+    if not settings.BOT_API_URL:
+        return PRODUCTION
+    kwargs: dict[str, Any] = {"is_local": settings.BOT_API_LOCAL}
+    if settings.BOT_API_LOCAL and settings.BOT_API_SERVER_FILES_DIR:
+        # Server fayllari boshqa konteynerda: server yo‘li → bizdagi mount
+        kwargs["wrap_local_file"] = SimpleFilesPathWrapper(
+            server_path=Path(settings.BOT_API_SERVER_FILES_DIR),
+            local_path=Path(settings.BOT_API_LOCAL_FILES_DIR or settings.BOT_API_SERVER_FILES_DIR),
+        )
+    return TelegramAPIServer.from_base(settings.BOT_API_URL, **kwargs)
+
+
+def create_session(**kwargs: Any) -> PooledAiohttpSession:
+    return PooledAiohttpSession(
+        api=api_server(),
+        limit=settings.BOT_API_POOL_LIMIT,
+        limit_per_host=settings.BOT_API_POOL_PER_HOST,
+        keepalive_timeout=settings.BOT_API_KEEPALIVE_SEC,
+        dns_ttl=settings.BOT_API_DNS_TTL_SEC,
+        **kwargs,
+    )
+
+
+def local_file_path(api: TelegramAPIServer, file_path: str) -> Path | None:
+    """
+    Local rejimda ``getFile`` yo‘li diskdagi fayl (20 MB cheklovsiz, HTTP yuklashsiz);
+    aks holda None.
+    """
+    if not api.is_local or not file_path:
+        return None
+    path = Path(api.wrap_local_file.to_local(file_path))
+    return path if path.is_file() else None
+
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import time
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from app import metrics
+from app.db import crud
+from app.db.session import SessionLocal
+from app.i18n import I18N
+from app.sender import OutboundSender
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+# Natijalar shu oraliqda bazaga yoziladi (jarayon yiqilsa, shuncha xabar qayta ketishi mumkin)
+FLUSH_INTERVAL = 1.0
+PROGRESS_INTERVAL = 5.0
+# Xabarnoma sender ning global limitidan ko‘pi bilan shu ulushni oladi — qolgani oddiy javoblarga
+SENDER_SHARE = 0.8
+
+sent_total = metrics.counter("broadcast_sent_total", "Broadcast messages delivered")
+blocked_total = metrics.counter("broadcast_blocked_total", "Recipients that blocked the bot (403)")
+failed_total = metrics.counter("broadcast_failed_total", "Broadcast sends that failed for other reasons")
+
+
+def progress_text(t, broadcast) -> str:
+    done = broadcast.sent + broadcast.failed + broadcast.blocked
+    status = t(f"admin.broadcast.status.{broadcast.status}", broadcast.status)
+    return t(
+        "admin.broadcast.progress",
+        "📣 Xabarnoma #{id} — {status}\n✅ Yuborildi: {sent}\n🚫 Bloklagan: {blocked}\n⚠️ Xato: {failed}\n"
+        "Jami: {done} / {total}",
+    ).format(
+        id=broadcast.id,
+        status=status,
+        sent=broadcast.sent,
+        blocked=broadcast.blocked,
+        failed=broadcast.failed,
+        done=done,
+        total=broadcast.total,
+    )
+
+
+def progress_kb(t, broadcast):
+    if broadcast.status != crud.BROADCAST_ACTIVE:
+        return None
+    kb = InlineKeyboardBuilder()
+    kb.button(text=t("admin.broadcast.stop", "⏹ To‘xtatish"), callback_data=f"sa:bc:stop:{broadcast.id}")
+    return kb.as_markup()
+
+
+class Broadcaster:
+    """
+    Xabarnomalarni yuboradi: users ``id`` bo‘yicha keyset partiyalarda, ``rate`` xabar/sekund
+    tezlikda ``OutboundSender`` orqali (global limitdan qolgani oddiy javoblarga). ``rate``
+    sender limitining ``SENDER_SHARE`` qismi bilan cheklanadi: bir nechta worker da sender
+    limiti worker lar soniga bo‘lingan bo‘ladi.
+
+    Har bir qabul qiluvchining natijasi ``broadcast_deliveries`` ga yoziladi, shuning uchun
+    uzilgan xabarnoma qayta ishga tushganda yuborilganlarni takrorlamaydi. Bekor qilish
+    bazadagi ``status`` orqali — boshqa jarayondan ham ishlaydi.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        sender: OutboundSender,
+        rate: float = 25.0,
+        concurrency: int = 10,
+        batch_size: int = BATCH_SIZE,
+    ):
+        self.bot = bot
+        self.sender = sender
+        self.interval = max(1.0 / rate, sender.global_interval / SENDER_SHARE)
+        self.concurrency = max(1, concurrency)
+        self.batch_size = batch_size
+        self._running: dict[int, asyncio.Task] = {}
+
+    def start(self, broadcast_id: int) -> None:
+        task = self._running.get(broadcast_id)
+        if task is not None and not task.done():
+            return
+        task = asyncio.create_task(self._run(broadcast_id), name=f"broadcast:{broadcast_id}")
+        self._running[broadcast_id] = task
+        task.add_done_callback(lambda _: self._running.pop(broadcast_id, None))
+
+    async def resume(self) -> None:
+        """Faol (``running``) xabarnomalarni ishga tushiradi — startda va davriy job sifatida."""
+        async with SessionLocal() as session:
+            ids = await crud.list_active_broadcast_ids(session)
+        for broadcast_id in ids:
+            if broadcast_id not in self._running:
+                logger.info("Resuming broadcast %s", broadcast_id)
+                self.start(broadcast_id)
+
+    async def stop(self) -> None:
+        tasks = list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # --- Sending ---
+    async def _deliver(self, tg_id: int, text: str) -> str:
+        try:
+            await self.sender.send_message(tg_id, text, parse_mode="HTML", disable_web_page_preview=True)
+        except TelegramForbiddenError:
+            blocked_total.inc()
+            return "blocked"
+        except (TelegramBadRequest, TelegramRetryAfter) as e:
+            # chat not found, deactivated va h.k.
+            logger.info("Broadcast to %s failed: %s", tg_id, e)
+            failed_total.inc()
+            return "failed"
+        sent_total.inc()
+        return "sent"
+
+    async def _run(self, broadcast_id: int) -> None:
+        async with SessionLocal() as session:
+            broadcast = await crud.get_broadcast(session, broadcast_id)
+            if broadcast is None or broadcast.status != crud.BROADCAST_ACTIVE:
+                return
+            t = I18N("uz").t
+            user = await crud.get_user_by_tg_id(session, broadcast.created_by)
+            if user is not None and user.locale:
+                t = I18N(user.locale).t
+
+            results: list[tuple[int, str]] = []
+            gate = asyncio.Semaphore(self.concurrency)
+            last_flush = last_progress = time.monotonic()
+
+            async def deliver(user_id: int, tg_id: int) -> None:
+                try:
+                    results.append((user_id, await self._deliver(tg_id, broadcast.text)))
+                except Exception:
+                    logger.exception("Broadcast %s: send to %s failed", broadcast_id, tg_id)
+                    failed_total.inc()
+                    results.append((user_id, "failed"))
+                finally:
+                    gate.release()
+
+            async def flush(cursor: int | None = None) -> bool:
+                """Natijalarni yozadi; xabarnoma bekor qilingan bo‘lsa False."""
+                nonlocal results, last_flush, last_progress, broadcast
+                batch, results = results, []
+                await crud.record_broadcast_deliveries(session, broadcast_id, batch, cursor=cursor)
+                broadcast = await crud.get_broadcast(session, broadcast_id)
+                last_flush = time.monotonic()
+                if last_flush - last_progress >= PROGRESS_INTERVAL:
+                    last_progress = last_flush
+                    await self._show_progress(t, broadcast)
+                return broadcast.status == crud.BROADCAST_ACTIVE
+
+            active = True
+            inflight: set[asyncio.Task] = set()
+            try:
+                while active:
+                    rows = await crud.broadcast_recipients(
+                        session, broadcast_id, broadcast.cursor, limit=self.batch_size
+                    )
+                    if not rows:
+                        break
+                    next_slot = time.monotonic()
+                    for user_id, tg_id, delivered in rows:
+                        if delivered:
+                            continue
+                        # O‘z tezligimiz: sender navbatini to‘ldirib, oddiy javoblarni kechiktirmaslik uchun
+                        next_slot = max(next_slot + self.interval, time.monotonic())
+                        await asyncio.sleep(next_slot - time.monotonic())
+                        await gate.acquire()
+                        task = asyncio.create_task(deliver(user_id, tg_id))
+                        inflight.add(task)
+                        task.add_done_callback(inflight.discard)
+                        if time.monotonic() - last_flush >= FLUSH_INTERVAL and not await flush():
+                            active = False
+                            break
+                    await asyncio.gather(*inflight)
+                    # Cursor faqat butun partiya tugagach siljiydi; bekor qilinganda ham natijalar yoziladi
+                    if not await flush(cursor=rows[-1][0] if active else None):
+                        active = False
+            except asyncio.CancelledError:
+                # Bot to‘xtatilmoqda: yo‘ldagi yuborishlarni kutib, natijalarni saqlab qo‘yamiz
+                await asyncio.gather(*inflight, return_exceptions=True)
+                await crud.record_broadcast_deliveries(session, broadcast_id, results)
+                raise
+
+            if active and await crud.finish_broadcast(session, broadcast_id, "done"):
+                logger.info("Broadcast %s finished", broadcast_id)
+            broadcast = await crud.get_broadcast(session, broadcast_id)
+            await self._show_progress(t, broadcast)
+
+    async def _show_progress(self, t, broadcast) -> None:
+        if not broadcast.progress_chat_id or not broadcast.progress_message_id:
+            return
+        chat_id = broadcast.progress_chat_id
+        try:
+            await self.sender.call(
+                chat_id,
+                lambda: self.bot.edit_message_text(
+                    chat_id=chat_id,
+                    message_id=broadcast.progress_message_id,
+                    text=progress_text(t, broadcast),
+                    reply_markup=progress_kb(t, broadcast),
+                ),
+            )
+        except TelegramBadRequest:
+            pass  # "message is not modified" yoki o‘chirilgan
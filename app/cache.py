@@ -0,0 +1,170 @@
+"""
+Jarayon ichidagi keshlar (nomlangan regionlar) va ularni barcha jarayonlarda bir vaqtda
+eskirtirish: o‘zgartiruvchi crud funksiyalari tranzaksiya ichida ``NOTIFY`` yuboradi
+(commit bilan birga yetkaziladi), har bir jarayondagi ``LISTEN`` task mos yozuvni o‘chiradi.
+
+Bir kalit uchun bir vaqtdagi miss lar bitta so‘rovga birlashadi (single-flight).
+TTL — LISTEN ulanishi uzilib qolgandagi zaxira chegarasi.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Generic, Hashable, TypeVar
+
+import asyncpg
+from sqlalchemy import func, select
+from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import metrics, runtime
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CHANNEL = "cache_invalidate"
+RECONNECT_DELAY = 1.0
+RECONNECT_MAX_DELAY = 30.0
+
+
+class _LeaderGone(Exception):
+    """Yuklayotgan coroutine bekor qilindi — kutayotganlar o‘zi qayta urinadi."""
+
+
+class Region(Generic[T]):
+    def __init__(self, name: str, ttl: float = 300.0, max_entries: int = 10_000):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: dict[Hashable, tuple[T, float]] = {}
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        # Har bir invalidatsiyada oshadi: undan oldin boshlangan yuklash natijasi saqlanmaydi
+        self._epoch = 0
+        self.hits = metrics.counter("cache_hits_total", "Cache region hits", region=name)
+        self.misses = metrics.counter("cache_misses_total", "Cache region loads", region=name)
+        self.invalidations = metrics.counter("cache_invalidations_total", "Cache region invalidations", region=name)
+
+    async def get(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        while True:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self.hits.inc()
+                return entry[0]
+            waiting = self._inflight.get(key)
+            if waiting is None:
+                return await self._load(key, load)
+            try:
+                return await asyncio.shield(waiting)
+            except _LeaderGone:
+                continue
+
+    async def _load(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        self.misses.inc()
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        epoch = self._epoch
+        try:
+            value = await load()
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(_LeaderGone() if isinstance(e, asyncio.CancelledError) else e)
+                future.exception()  # kutuvchi bo‘lmasa "never retrieved" ogohlantirishi chiqmasin
+            raise
+        else:
+            if epoch == self._epoch:
+                if len(self._data) >= self.max_entries:
+                    self._data.pop(next(iter(self._data)))
+                self._data[key] = (value, time.monotonic() + self.ttl)
+            if not future.done():
+                future.set_result(value)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        self.invalidations.inc()
+        self._epoch += 1
+        if key is None:
+            self._data.clear()
+            self._inflight.clear()
+        else:
+            self._data.pop(key, None)
+            self._inflight.pop(key, None)
+
+
+_regions: dict[str, Region] = {}
+
+
+def region(name: str, ttl: float = 300.0, max_entries: int = 10_000) -> Region:
+    existing = _regions.get(name)
+    if existing is None:
+        existing = _regions[name] = Region(name, ttl, max_entries)
+    return existing
+
+
+def invalidate_local(name: str | None, key: Hashable | None = None) -> None:
+    """``name=None`` — barcha regionlar (masalan, LISTEN qayta ulanganda)."""
+    targets = _regions.values() if name is None else [_regions[name]] if name in _regions else []
+    for r in targets:
+        r.invalidate(key)
+
+
+async def publish(session: AsyncSession, name: str, key: str | int | None = None) -> None:
+    """
+    Commitdan oldin chaqiriladi: ``NOTIFY`` tranzaksiya bilan birga yetkaziladi (rollback bo‘lsa —
+    yo‘q). Joriy jarayon keshi darhol, o‘z NOTIFY si kelganda yana bir bor tozalanadi.
+    """
+    payload = runtime.json_dumps({"region": name, "key": key})
+    await session.execute(select(func.pg_notify(CHANNEL, payload)))
+    invalidate_local(name, key)
+
+
+def _on_notify(connection: Any, pid: int, channel: str, payload: str) -> None:
+    try:
+        message = runtime.json_loads(payload)
+        invalidate_local(message["region"], message.get("key"))
+    except Exception:
+        logger.exception("Bad cache invalidation payload: %r", payload)
+
+
+class CacheListener:
+    """Har bir jarayonda: alohida asyncpg ulanishida ``LISTEN``; uzilsa qayta ulanadi va hammasini tozalaydi."""
+
+    def __init__(self, url: URL):
+        self.dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="cache:listener")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        delay = RECONNECT_DELAY
+        while True:
+            lost = asyncio.Event()
+            conn = None
+            try:
+                conn = await asyncpg.connect(self.dsn)
+                conn.add_termination_listener(lambda _: lost.set())
+                await conn.add_listener(CHANNEL, _on_notify)
+                # Ulanmagan paytda kelgan xabarlar yo‘qolgan bo‘lishi mumkin
+                invalidate_local(None)
+                delay = RECONNECT_DELAY
+                await lost.wait()
+                logger.warning("Cache listener connection lost, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Cache listener failed: %s (retry in %.0fs)", e, delay)
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
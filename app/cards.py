@@ -0,0 +1,107 @@
+"""
+Sharh kartasi (caption + rasmlar) — guruh xabarlari va admin ro‘yxati uchun yagona renderer.
+
+Natija ``(tur, review_id, locale, updated_at)`` bo‘yicha LRU keshda saqlanadi: ``updated_at``
+sharh, muallif (ism/telefon) yoki filial nomi o‘zgarganda yangilanadi, shuning uchun eski
+karta qaytmaydi.
+"""
+import html
+from collections import OrderedDict
+from typing import NamedTuple
+from zoneinfo import ZoneInfo
+
+from app import metrics
+from app.db.models import Review
+from app.i18n import I18N, on_reload
+
+TASHKENT = ZoneInfo("Asia/Tashkent")
+CACHE_SIZE = 2048
+
+# Bir marta tayyorlanadi; har bir render faqat qiymatlarni qo‘yadi
+_CARD = (
+    "{header}#{id} | ⭐ {rating}\n"
+    "👤 {user} | 📱 {phone}\n"
+    "📍 {branch}\n"
+    "💬 {text}\n"
+    "🕒 {time}"
+).format
+_USER_LINK = "<a href='tg://user?id={tg_id}'>{name}</a>".format
+
+# Karta turlari: ``new`` — guruhga yangi sharh, ``list`` — admin ro‘yxati
+HEADERS = {
+    "new": ("review.card.new", "🆕 Yangi sharh!"),
+    "list": None,
+}
+
+hits = metrics.counter("review_card_cache_hits_total", "Review cards served from cache")
+misses = metrics.counter("review_card_cache_misses_total", "Review cards rendered")
+
+
+class CardPhoto(NamedTuple):
+    # ``photo_sources`` uchun ReviewPhoto bilan bir xil atributlar
+    file_id: str
+    file_unique_id: str | None
+
+
+class Card(NamedTuple):
+    caption: str
+    photos: tuple[CardPhoto, ...]
+
+
+_cache: OrderedDict[tuple, Card] = OrderedDict()
+
+
+def _branch_name(branch) -> str:
+    if branch is None:
+        return "-"
+    if branch.nameuz and branch.nameru and branch.nameuz != branch.nameru:
+        return f"{branch.nameuz} / {branch.nameru}"
+    return branch.nameuz or branch.nameru or "-"
+
+
+def _render(review: Review, locale: str, kind: str) -> Card:
+    t = I18N(locale).t
+    header = HEADERS[kind]
+    user = review.user
+    if user is not None:
+        name = " ".join(filter(None, [user.first_name, user.last_name])) or t("review.card.user", "User")
+        user_html = _USER_LINK(tg_id=user.tg_id, name=html.escape(name))
+        phone = user.phone or "-"
+    else:
+        user_html = phone = "-"
+    caption = _CARD(
+        header=f"{t(*header)}\n" if header else "",
+        id=review.id,
+        rating=review.rating or "-",
+        user=user_html,
+        phone=html.escape(phone),
+        branch=html.escape(_branch_name(review.branch)),
+        text=html.escape(review.text or "-"),
+        time=review.created_at.astimezone(TASHKENT).strftime("%Y-%m-%d %H:%M"),
+    )
+    photos = tuple(CardPhoto(p.file_id, p.file_unique_id) for p in (review.photos or []))
+    return Card(caption, photos)
+
+
+def review_card(review: Review, locale: str = "uz", kind: str = "list") -> Card:
+    """``review`` da ``user``, ``branch`` va ``photos`` yuklangan bo‘lishi kerak."""
+    if review.updated_at is None:
+        return _render(review, locale, kind)
+    key = (kind, review.id, locale, review.updated_at)
+    card = _cache.get(key)
+    if card is not None:
+        _cache.move_to_end(key)
+        hits.inc()
+        return card
+    misses.inc()
+    card = _cache[key] = _render(review, locale, kind)
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return card
+
+
+def clear() -> None:
+    _cache.clear()
+
+
+on_reload(clear)
@@ -12,5 +12,92 @@ class Settings(BaseModel):
         int(x) for x in os.getenv("SUPER_ADMINS", "").split(",") if x.strip()
     ]
     APP_ENV: str = os.getenv("APP_ENV", "dev")
+    # Loglash: json | text; logger=ulush (0..1) sampling; shundan sekin update lar WARNING
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
+    LOG_SAMPLING: str = os.getenv("LOG_SAMPLING", "aiogram.event=0,app.updates=0.1")
+    LOG_SLOW_UPDATE_MS: int = int(os.getenv("LOG_SLOW_UPDATE_MS", "1000"))
+    # Event loop kechikishi: probe oralig‘i; shundan uzoq bloklansa stek loglanadi (0 — o‘chiq)
+    LOOP_MONITOR_INTERVAL_MS: int = int(os.getenv("LOOP_MONITOR_INTERVAL_MS", "100"))
+    LOOP_BLOCK_MS: int = int(os.getenv("LOOP_BLOCK_MS", "250"))
+    # Tracing: update lar ulushi + shundan sekinlari har doim; OTLP/JSON fayllar (aylanma)
+    TRACING: bool = os.getenv("TRACING", "0").lower() in ("1", "true", "yes")
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "0.05"))
+    TRACE_SLOW_MS: int = int(os.getenv("TRACE_SLOW_MS", "1000"))
+    TRACE_DIR: str = os.getenv("TRACE_DIR", "data/traces")
+    TRACE_FILE_MAX_MB: int = int(os.getenv("TRACE_FILE_MAX_MB", "16"))
+    # Har bir worker uchun alohida: shuncha eng yangi fayl saqlanadi
+    TRACE_FILE_KEEP: int = int(os.getenv("TRACE_FILE_KEEP", "10"))
+    # Self-hosted telegram-bot-api (bo‘sh — api.telegram.org)
+    BOT_API_URL: str = os.getenv("BOT_API_URL", "")
+    BOT_API_LOCAL: bool = os.getenv("BOT_API_LOCAL", "0").lower() in ("1", "true", "yes")
+    BOT_API_SERVER_FILES_DIR: str = os.getenv("BOT_API_SERVER_FILES_DIR", "")
+    BOT_API_LOCAL_FILES_DIR: str = os.getenv("BOT_API_LOCAL_FILES_DIR", "")
+    BOT_API_POOL_LIMIT: int = int(os.getenv("BOT_API_POOL_LIMIT", "100"))
+    BOT_API_POOL_PER_HOST: int = int(os.getenv("BOT_API_POOL_PER_HOST", "0"))
+    BOT_API_KEEPALIVE_SEC: float = float(os.getenv("BOT_API_KEEPALIVE_SEC", "30"))
+    BOT_API_DNS_TTL_SEC: int = int(os.getenv("BOT_API_DNS_TTL_SEC", "300"))
+    # Sxema fingerprinti mos kelsa DDL tekshiruvlarini o‘tkazib yuborish
+    FAST_START: bool = os.getenv("FAST_START", "1").lower() in ("1", "true", "yes")
+    # >1 bo‘lsa: bitta poller + N ta worker jarayoni (chat_id bo‘yicha taqsimlanadi)
+    WORKERS: int = int(os.getenv("WORKERS", "0"))
+    # Bot ni nechta jarayon xizmat qiladi (supervisor worker larga o‘rnatadi; WORKERS ular ichida 0)
+    WORKER_COUNT: int = int(os.getenv("WORKER_COUNT", "1"))
+    # Worker jarayonlari soni (supervisor o‘rnatadi): har bir jarayonning OutboundSender i
+    # global va guruh limitlarining 1/N ulushini oladi — jami Telegram limitidan oshmaydi
+    OUTBOUND_SHARDS: int = int(os.getenv("OUTBOUND_SHARDS", "1"))
+    # DB ulanishlari: jarayon puli va worker rejimidagi umumiy byudjet
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_BUDGET: int = int(os.getenv("DB_POOL_BUDGET", "20"))
+    # Sekin so‘rovlar: chegara, EXPLAIN rejasini olish, /slowlog dagi qatorlar soni
+    DB_SLOW_QUERY_MS: int = int(os.getenv("DB_SLOW_QUERY_MS", "200"))
+    DB_EXPLAIN: bool = os.getenv("DB_EXPLAIN", "1").lower() in ("1", "true", "yes")
+    DB_SLOWLOG_TOP: int = int(os.getenv("DB_SLOWLOG_TOP", "10"))
+    # FSM holatlari: oxirgi faollikdan keyin yashash vaqti, yozuvlar/hajm limiti (LRU), tozalash davri
+    FSM_TTL_SEC: int = int(os.getenv("FSM_TTL_SEC", "3600"))
+    FSM_MAX_ENTRIES: int = int(os.getenv("FSM_MAX_ENTRIES", "100000"))
+    FSM_MAX_MB: int = int(os.getenv("FSM_MAX_MB", "64"))
+    FSM_SWEEP_SEC: int = int(os.getenv("FSM_SWEEP_SEC", "60"))
+    # default | performance (uvloop, orjson, gc.freeze)
+    RUNTIME_PROFILE: str = os.getenv("RUNTIME_PROFILE", "default")
+
+    # Export: xotirada ushlanadigan maksimal hajm, undan keyin diskka o‘tadi.
+    # Yuklash limiti: Bot API 50 MB, lokal Bot API server 2000 MB gacha qabul qiladi
+    EXPORT_CHUNK_ROWS: int = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+    EXPORT_SPOOL_MAX_BYTES: int = int(os.getenv("EXPORT_SPOOL_MAX_BYTES", str(8 * 1024 * 1024)))
+    EXPORT_MAX_UPLOAD_BYTES: int = int(
+        os.getenv("EXPORT_MAX_UPLOAD_BYTES", str((2000 if BOT_API_LOCAL else 50) * 1024 * 1024))
+    )
+
+    # Sharhlarni write-behind (jurnal + partiyali INSERT) bilan yozish
+    REVIEW_BATCHING: bool = os.getenv("REVIEW_BATCHING", "0").lower() in ("1", "true", "yes")
+    REVIEW_BATCH_FLUSH_MS: int = int(os.getenv("REVIEW_BATCH_FLUSH_MS", "200"))
+    REVIEW_BATCH_MAX_ROWS: int = int(os.getenv("REVIEW_BATCH_MAX_ROWS", "500"))
+    REVIEW_JOURNAL_DIR: str = os.getenv("REVIEW_JOURNAL_DIR", "data/journal")
+
+    # Xabarnomalar: o‘z tezligi (worker 0 sender limitining 80% i bilan cheklanadi), parallel so‘rovlar,
+    # faollarini tekshirish
+    BROADCAST_RATE: float = float(os.getenv("BROADCAST_RATE", "25"))
+    BROADCAST_CONCURRENCY: int = int(os.getenv("BROADCAST_CONCURRENCY", "10"))
+    BROADCAST_RESUME_SEC: int = int(os.getenv("BROADCAST_RESUME_SEC", "15"))
+
+    # Dayjestlar: tekshirish davri, dayjestda to‘liq ko‘rsatiladigan past baholi sharhlar soni
+    DIGEST_CHECK_SEC: int = int(os.getenv("DIGEST_CHECK_SEC", "60"))
+    DIGEST_LOW_MAX: int = int(os.getenv("DIGEST_LOW_MAX", "10"))
+
+    # Kunlik statistikani yangilash davriyligi (0 — o‘chirilgan)
+    ROLLUP_INTERVAL_SEC: int = int(os.getenv("ROLLUP_INTERVAL_SEC", "60"))
+    ROLLUP_SETTLE_SEC: int = int(os.getenv("ROLLUP_SETTLE_SEC", "30"))
+    # Sovuq arxiv: shu kundan eski (va kunlik statistikaga kirgan) sharhlar reviews_archive ga
+    # ko‘chiriladi (0 — o‘chirilgan); har bir bo‘lak alohida tranzaksiya
+    ARCHIVE_AFTER_DAYS: int = int(os.getenv("ARCHIVE_AFTER_DAYS", "0"))
+    ARCHIVE_BATCH: int = int(os.getenv("ARCHIVE_BATCH", "2000"))
+    ARCHIVE_INTERVAL_SEC: int = int(os.getenv("ARCHIVE_INTERVAL_SEC", "3600"))
+    # Rasm arxivi (kontent-manzilli lokal ombor)
+    PHOTO_ARCHIVE_DIR: str = os.getenv("PHOTO_ARCHIVE_DIR", "data/photos")
+    PHOTO_ARCHIVE_CONCURRENCY: int = int(os.getenv("PHOTO_ARCHIVE_CONCURRENCY", "4"))
+    PHOTO_ARCHIVE_INTERVAL_SEC: int = int(os.getenv("PHOTO_ARCHIVE_INTERVAL_SEC", "30"))
+    PHOTO_ARCHIVE_SERVE_LOCAL: bool = os.getenv("PHOTO_ARCHIVE_SERVE_LOCAL", "0").lower() in ("1", "true", "yes")
 
 settings = Settings()
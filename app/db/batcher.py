@@ -0,0 +1,261 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app import metrics, runtime
+from app.db import crud
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_NAME = "reviews.jsonl"
+CHECKPOINT_NAME = "reviews.checkpoint"
+# Hammasi yozilgandan keyin jurnal shu hajmdan oshsa qaytadan boshlanadi
+COMPACT_BYTES = 4 * 1024 * 1024
+RETRY_BACKOFF_MAX = 30.0
+
+queue_depth = metrics.gauge("review_batch_queue_depth", "Reviews journaled but not yet in Postgres")
+flush_seconds = metrics.histogram("review_batch_flush_seconds", "Batch INSERT + commit latency")
+fsync_seconds = metrics.histogram("review_journal_fsync_seconds", "Journal write + fsync latency")
+rows_flushed = metrics.counter("review_batch_rows_total", "Reviews written by the batcher")
+rows_rejected = metrics.counter("review_batch_rejected_total", "Reviews dropped on integrity errors")
+flush_errors = metrics.counter("review_batch_flush_errors_total", "Failed flush attempts (retried)")
+
+
+def _write_checkpoint(path: Path, offset: int) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(str(offset))
+    os.replace(tmp, path)
+
+
+class ReviewBatcher:
+    """
+    Sharhlar uchun write-behind: ``submit`` yozuvni jurnalga yozib fsync qilgandan keyin
+    qaytadi (foydalanuvchiga javob berish mumkin), Postgres ga esa har ``flush_ms`` yoki
+    ``max_rows`` yozuvda bitta multi-row INSERT bilan tushiriladi.
+
+    Jurnal (JSONL) + checkpoint (bayt offset) qayta ishga tushganda yozilmaganlarni tiklaydi;
+    ``idempotency_key`` tufayli qayta yozish dublikat bermaydi.
+    """
+
+    def __init__(
+        self,
+        journal_dir: str | Path,
+        flush_ms: int = 200,
+        max_rows: int = 500,
+        on_flush: Callable[[list[int]], Awaitable[None]] | None = None,
+    ):
+        self.dir = Path(journal_dir)
+        self.flush_interval = flush_ms / 1000
+        self.max_rows = max_rows
+        self.on_flush = on_flush
+        self._journal = self.dir / JOURNAL_NAME
+        self._checkpoint = self.dir / CHECKPOINT_NAME
+        self._file = None
+        self._offset = 0
+        # Jurnalga yozilishini kutayotganlar: (qator, future)
+        self._pending: list[tuple[bytes, dict, asyncio.Future]] = []
+        # Jurnalda bor, bazada hali yo‘q: (yozuv, jurnal offset i shu yozuvdan keyin)
+        self._buffer: list[tuple[dict, int]] = []
+        self._io_lock = asyncio.Lock()
+        self._write_wakeup = asyncio.Event()
+        self._flush_wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._notify_tasks: set[asyncio.Task] = set()
+        self._closing = False
+
+    # --- Lifecycle ---
+    async def start(self) -> None:
+        await asyncio.to_thread(self.dir.mkdir, parents=True, exist_ok=True)
+        recovered = await asyncio.to_thread(self._recover)
+        if recovered:
+            logger.info("Review journal: %s unflushed reviews recovered", recovered)
+        self._tasks = [
+            asyncio.create_task(self._writer(), name="batcher:journal"),
+            asyncio.create_task(self._flusher(), name="batcher:flush"),
+        ]
+
+    async def stop(self) -> None:
+        """Navbatdagilarni yozib, bazaga tushirishga urinadi; qolganlari jurnalda qoladi."""
+        self._closing = True
+        self._write_wakeup.set()
+        self._flush_wakeup.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.gather(*self._notify_tasks, return_exceptions=True)
+        if self._file is not None:
+            await asyncio.to_thread(self._file.close)
+
+    def _recover(self) -> int:
+        checkpoint = 0
+        if self._checkpoint.exists():
+            checkpoint = int(self._checkpoint.read_text() or 0)
+        self._file = open(self._journal, "a+b")
+        checkpoint = min(checkpoint, os.fstat(self._file.fileno()).st_size)
+        self._file.seek(checkpoint)
+        offset = checkpoint
+        for line in self._file:
+            if not line.endswith(b"\n"):
+                break  # yozish paytida uzilgan oxirgi qator
+            offset += len(line)
+            self._buffer.append((runtime.json_loads(line), offset))
+        # Yarim qolgan qator kesib tashlanadi, yangi yozuvlar undan keyin boshlanadi
+        self._file.truncate(offset)
+        self._file.seek(offset)
+        self._offset = offset
+        queue_depth.set(len(self._buffer))
+        return len(self._buffer)
+
+    # --- Submit ---
+    async def submit(
+        self,
+        user_id: int,
+        branch_id: int,
+        rating: int | None,
+        text: str | None,
+        photos: list[str | dict] | None,
+    ) -> str:
+        """Sharhni jurnalga yozadi (fsync bilan); ``idempotency_key`` ni qaytaradi."""
+        if self._closing:
+            raise RuntimeError("ReviewBatcher is stopped")
+        record = {
+            "key": uuid.uuid4().hex,
+            "user_id": user_id,
+            "branch_id": branch_id,
+            "rating": rating,
+            "text": text,
+            "photos": photos or [],
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        line = (runtime.json_dumps(record) + "\n").encode("utf-8")
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((line, record, future))
+        self._write_wakeup.set()
+        await future
+        return record["key"]
+
+    def _append(self, lines: list[bytes]) -> None:
+        self._file.write(b"".join(lines))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    async def _writer(self) -> None:
+        """Group commit: bir vaqtda kelgan barcha yozuvlar bitta write + fsync bilan."""
+        while True:
+            await self._write_wakeup.wait()
+            self._write_wakeup.clear()
+            batch, self._pending = self._pending, []
+            if batch:
+                started = time.perf_counter()
+                try:
+                    async with self._io_lock:
+                        await asyncio.to_thread(self._append, [line for line, _, _ in batch])
+                except Exception as e:
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    logger.exception("Review journal write failed")
+                    continue
+                fsync_seconds.observe(time.perf_counter() - started)
+                for line, record, future in batch:
+                    self._offset += len(line)
+                    self._buffer.append((record, self._offset))
+                    if not future.done():
+                        future.set_result(None)
+                queue_depth.set(len(self._buffer))
+                if len(self._buffer) >= self.max_rows:
+                    self._flush_wakeup.set()
+            if self._closing and not self._pending:
+                return
+
+    # --- Flush ---
+    async def _flusher(self) -> None:
+        backoff = self.flush_interval
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wakeup.clear()
+            while self._buffer:
+                try:
+                    await self._flush_batch(self._buffer[: self.max_rows])
+                    backoff = self.flush_interval
+                except Exception as e:
+                    # Baza vaqtincha yo‘q va h.k. — yozuvlar jurnalda, keyinroq qayta urinamiz
+                    flush_errors.inc()
+                    logger.warning("Review batch flush failed: %s, retry in %.1fs", e, backoff)
+                    if self._closing:
+                        return
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, RETRY_BACKOFF_MAX)
+                    break
+            else:
+                await self._compact()
+            if self._closing and not self._buffer and not self._pending:
+                return
+
+    async def _flush_batch(self, batch: list[tuple[dict, int]]) -> None:
+        records = [record for record, _ in batch]
+        started = time.perf_counter()
+        async with SessionLocal() as session:
+            try:
+                inserted = await crud.insert_reviews_batch(session, records)
+                await session.commit()
+            except (IntegrityError, DataError):
+                # Masalan, filial o‘chirilgan (FK) — har bir yozuv alohida savepoint da
+                await session.rollback()
+                inserted = await self._insert_one_by_one(session, records)
+                await session.commit()
+        flush_seconds.observe(time.perf_counter() - started)
+
+        del self._buffer[: len(batch)]
+        queue_depth.set(len(self._buffer))
+        rows_flushed.inc(len(inserted))
+        await asyncio.to_thread(_write_checkpoint, self._checkpoint, batch[-1][1])
+
+        if inserted and self.on_flush is not None:
+            task = asyncio.create_task(self._notify(sorted(inserted.values())))
+            self._notify_tasks.add(task)
+            task.add_done_callback(self._notify_tasks.discard)
+
+    async def _insert_one_by_one(self, session, records: list[dict]) -> dict[str, int]:
+        inserted: dict[str, int] = {}
+        for record in records:
+            try:
+                async with session.begin_nested():
+                    inserted.update(await crud.insert_reviews_batch(session, [record]))
+            except (IntegrityError, DataError) as e:
+                rows_rejected.inc()
+                logger.warning(
+                    "Review %s rejected (branch_id=%s): %s", record["key"], record["branch_id"], e.orig
+                )
+        return inserted
+
+    async def _notify(self, review_ids: list[int]) -> None:
+        try:
+            await self.on_flush(review_ids)
+        except Exception:
+            logger.exception("Review batch on_flush callback failed")
+
+    async def _compact(self) -> None:
+        """Hamma yozuv bazada bo‘lsa, katta jurnal bo‘shatiladi (checkpoint 0 ga qaytadi)."""
+        if self._offset < COMPACT_BYTES:
+            return
+        async with self._io_lock:
+            if self._buffer or self._pending:
+                return
+            await asyncio.to_thread(self._truncate)
+            self._offset = 0
+
+    def _truncate(self) -> None:
+        self._file.truncate(0)
+        self._file.seek(0)
+        os.fsync(self._file.fileno())
+        _write_checkpoint(self._checkpoint, 0)
@@ -1,12 +1,16 @@
-from aiogram import Bot
-from sqlalchemy import select, func, text
+from sqlalchemy import select, update, func, text, literal, literal_column, or_, tuple_, union_all, any_, Float, Integer, Numeric, String
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.models import User, Branch, Review, Admin, ReviewPhoto
-from aiogram.types import InputMediaPhoto
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by, insert as pg_insert
+from app.db.models import (
+    User, Branch, Review, Admin, ReviewPhoto, BranchDailyStat, JobWatermark, PhotoBlob, AppMeta,
+    Broadcast, BroadcastDelivery, NotificationRoute, DigestSetting, ReviewArchive,
+)
+from app import cache
 from app.config import settings
 from sqlalchemy.orm import joinedload
 from zoneinfo import ZoneInfo
-import html
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator
 async def get_review_with_relations(session: AsyncSession, review_id: int) -> Review | None:
     q = await session.execute(
         select(Review)
@@ -15,13 +19,28 @@ async def get_review_with_relations(session: AsyncSession, review_id: int) -> Re
     )
     return q.scalar_one_or_none()
 
+# Sharh kartasida ko‘rinadigan maydonlar
+CARD_USER_FIELDS = ("first_name", "last_name", "phone")
+
+
+async def touch_reviews(session: AsyncSession, *where) -> None:
+    """Mos sharhlarning ``updated_at`` ini yangilaydi — keshdagi kartalari eskiradi; commit qilmaydi."""
+    await session.execute(
+        update(Review).where(*where).values(updated_at=func.now()).execution_options(synchronize_session=False)
+    )
+
+
 async def upsert_user(session: AsyncSession, tg_id: int, **kwargs) -> User:
     q = await session.execute(select(User).where(User.tg_id == tg_id))
     user = q.scalar_one_or_none()
+    # Foydalanuvchi botga yozdi — demak endi bloklamagan
+    kwargs.setdefault("is_blocked", False)
     if user is None:
         user = User(tg_id=tg_id, **kwargs)
         session.add(user)
     else:
+        if any(k in kwargs and getattr(user, k) != kwargs[k] for k in CARD_USER_FIELDS):
+            await touch_reviews(session, Review.user_id == user.id)
         for k, v in kwargs.items():
             setattr(user, k, v)
     await session.commit()
@@ -32,9 +51,33 @@ async def get_user_by_tg_id(session: AsyncSession, tg_id: int) -> User | None:
     q = await session.execute(select(User).where(User.tg_id == tg_id))
     return q.scalar_one_or_none()
 
+# Filiallar va admin rollari deyarli har bir update da o‘qiladi, kam o‘zgaradi
+branches_cache = cache.region("branches")
+admins_cache = cache.region("admins", max_entries=1000)
+
+
 async def list_branches(session: AsyncSession) -> list[Branch]:
-    q = await session.execute(select(Branch).order_by(Branch.nameuz, Branch.id))
-    return list(q.scalars().all())
+    async def load() -> list[Branch]:
+        q = await session.execute(
+            select(Branch.id, Branch.nameuz, Branch.nameru, Branch.created_at).order_by(Branch.nameuz, Branch.id)
+        )
+        # Hech qaysi sessiyaga bog‘lanmagan nusxalar: keshda turganda expire/refresh bo‘lmaydi
+        return [Branch(**row._asdict()) for row in q.all()]
+
+    return list(await branches_cache.get("all", load))
+
+
+def _photo_row(review_id: int, photo: str | dict) -> dict:
+    # eski FSM ma'lumotlari faqat file_id (str) saqlagan
+    if isinstance(photo, str):
+        photo = {"file_id": photo}
+    return {
+        "review_id": review_id,
+        "file_id": photo["file_id"],
+        "file_unique_id": photo.get("file_unique_id"),
+        "file_size": photo.get("file_size"),
+    }
+
 
 async def create_review(
     session: AsyncSession,
@@ -42,7 +85,7 @@ async def create_review(
     branch_id: int,
     rating: int | None,
     text: str | None,
-    photos: list[str] | None
+    photos: list[str | dict] | None
 ) -> Review:
     # 1. Review obyektini yaratish
     r = Review(
@@ -56,8 +99,8 @@ async def create_review(
 
     # 2. Photo qo‘shish (commitdan oldin!)
     if photos:
-        for file_id in photos:
-            session.add(ReviewPhoto(review_id=r.id, file_id=file_id))
+        for photo in photos:
+            session.add(ReviewPhoto(**_photo_row(r.id, photo)))
 
     # 3. Commit
     await session.commit()
@@ -74,17 +117,78 @@ async def create_review(
     )
     return q.unique().scalar_one()   # 👈 muammoni hal qiladi
 
+# asyncpg bitta so‘rovda 32767 dan ortiq parametr qabul qilmaydi (sharh — 6, rasm — 4 ta)
+REVIEW_INSERT_CHUNK = 5000
+PHOTO_INSERT_CHUNK = 5000
+
+
+async def insert_reviews_batch(session: AsyncSession, records: list[dict]) -> dict[str, int]:
+    """
+    Bir nechta sharhni (va rasmlarini) multi-row INSERT bilan yozadi; commit qilmaydi.
+    ``idempotency_key`` allaqachon bor yozuvlar o‘tkazib yuboriladi.
+    Yangi qo‘shilganlar uchun ``{idempotency_key: review_id}`` qaytaradi.
+    """
+    if not records:
+        return {}
+    inserted: dict[str, int] = {}
+    for i in range(0, len(records), REVIEW_INSERT_CHUNK):
+        stmt = (
+            pg_insert(Review)
+            .values([
+                {
+                    "user_id": r["user_id"],
+                    "branch_id": r["branch_id"],
+                    "rating": r.get("rating"),
+                    "text": r.get("text"),
+                    # Foydalanuvchi yuborgan vaqt; inserted_at ni esa baza o‘zi qo‘yadi
+                    "created_at": datetime.fromisoformat(r["created_at"]),
+                    "idempotency_key": r["key"],
+                }
+                for r in records[i:i + REVIEW_INSERT_CHUNK]
+            ])
+            .on_conflict_do_nothing(index_elements=[Review.idempotency_key])
+            .returning(Review.id, Review.idempotency_key)
+        )
+        inserted.update({key: review_id for review_id, key in (await session.execute(stmt)).all()})
+
+    photos = [
+        _photo_row(inserted[r["key"]], photo)
+        for r in records
+        if r["key"] in inserted
+        for photo in r.get("photos") or []
+    ]
+    for i in range(0, len(photos), PHOTO_INSERT_CHUNK):
+        await session.execute(pg_insert(ReviewPhoto).values(photos[i:i + PHOTO_INSERT_CHUNK]))
+    return inserted
+
+
+async def get_reviews_for_notify(session: AsyncSession, review_ids: list[int]) -> list[Review]:
+    q = await session.execute(
+        select(Review)
+        .options(joinedload(Review.user), joinedload(Review.branch), joinedload(Review.photos))
+        .where(Review.id.in_(review_ids))
+        .order_by(Review.id)
+    )
+    return list(q.unique().scalars().all())
+
+
+async def get_admin_role(session: AsyncSession, tg_id: int) -> str | None:
+    async def load() -> str | None:
+        q = await session.execute(select(Admin.role).where(Admin.tg_id == tg_id))
+        return q.scalar_one_or_none()
+
+    return await admins_cache.get(tg_id, load)
+
 async def is_super_admin(session: AsyncSession, tg_id: int) -> bool:
-    q = await session.execute(select(Admin).where(Admin.tg_id == tg_id, Admin.role == 'super_admin'))
-    return q.scalar_one_or_none() is not None
+    return await get_admin_role(session, tg_id) == 'super_admin'
 
 async def is_admin(session: AsyncSession, tg_id: int) -> bool:
-    q = await session.execute(select(Admin).where(Admin.tg_id == tg_id))
-    return q.scalar_one_or_none() is not None
+    return await get_admin_role(session, tg_id) is not None
 
 async def add_admin(session: AsyncSession, tg_id: int, role: str = 'admin') -> Admin:
     a = Admin(tg_id=tg_id, role=role)
     session.add(a)
+    await cache.publish(session, "admins", tg_id)
     await session.commit()
     await session.refresh(a)
     return a
@@ -117,20 +221,48 @@ async def remove_admin(session: AsyncSession, requested_by_tg_id: int, tg_id: in
     if a is None:
         return False
     await session.delete(a)
+    await cache.publish(session, "admins", tg_id)
     await session.commit()
     return True
 
+def _review_totals(watermark: int):
+    """
+    Filial bo‘yicha (count, rated, sum): yig‘ilgan qismi branch_daily_stats dan (arxivlanganlar ham
+    shu yerda), watermark dan keyingi "dum" — reviews dan. Butun tarix skan qilinmaydi.
+    """
+    S = BranchDailyStat
+    rolled = select(S.branch_id, S.reviews_count, S.rated_count, S.rating_sum)
+    tail = select(
+        Review.branch_id,
+        literal_column("1"),
+        (Review.rating.isnot(None)).cast(Integer),
+        func.coalesce(Review.rating, 0),
+    ).where(Review.id > watermark)
+    parts = union_all(rolled, tail).subquery()
+    branch_id, count, rated, total = parts.c
+    return (
+        select(
+            branch_id.label("branch_id"),
+            func.sum(count).label("reviews_count"),
+            func.sum(rated).label("rated_count"),
+            func.sum(total).label("rating_sum"),
+        )
+        .group_by(branch_id)
+        .subquery()
+    )
+
+
 async def branch_stats(session: AsyncSession):
+    totals = _review_totals(await get_watermark(session, ROLLUP_WATERMARK))
     q = await session.execute(
         select(
             Branch.id,
             Branch.nameuz,
             Branch.nameru,
-            func.count(Review.id),
-            func.round(func.avg(Review.rating), 2)
+            totals.c.reviews_count,
+            func.round(totals.c.rating_sum.cast(Numeric) / func.nullif(totals.c.rated_count, 0), 2),
         )
-        .join(Review, Review.branch_id == Branch.id, isouter=True)
-        .group_by(Branch.id)
+        .join(totals, totals.c.branch_id == Branch.id, isouter=True)
         .order_by(Branch.nameuz, Branch.id)
     )
     stats = []
@@ -156,8 +288,7 @@ async def _ensure_admin(session: AsyncSession, tg_id: int) -> None:
     # SUPER_ADMINS from config are always allowed
     if tg_id in settings.SUPER_ADMINS:
         return
-    q = await session.execute(select(Admin).where(Admin.tg_id == tg_id))
-    if q.scalar_one_or_none() is None:
+    if not await is_admin(session, tg_id):
         raise PermissionError("Only admins can perform this action")
 
 
@@ -175,6 +306,7 @@ async def create_branch_admin(
     await _ensure_admin(session, requested_by_tg_id)
     b = Branch(nameuz=nameuz, nameru=nameru)
     session.add(b)
+    await cache.publish(session, "branches")
     await session.commit()
     await session.refresh(b)
     return b
@@ -192,10 +324,13 @@ async def update_branch_admin(
     b = q.scalar_one_or_none()
     if b is None:
         raise ValueError("Branch not found")
+    if (nameuz is not None and nameuz != b.nameuz) or (nameru is not None and nameru != b.nameru):
+        await touch_reviews(session, Review.branch_id == b.id)
     if nameuz is not None:
         b.nameuz = nameuz
     if nameru is not None:
         b.nameru = nameru
+    await cache.publish(session, "branches")
     await session.commit()
     await session.refresh(b)
     return b
@@ -212,6 +347,9 @@ async def delete_branch_admin(
     if b is None:
         return False
     await session.delete(b)
+    # Filial marshrutlari ham CASCADE bilan o‘chadi
+    await cache.publish(session, "branches")
+    await cache.publish(session, "routes")
     await session.commit()
     return True
 
@@ -223,7 +361,8 @@ async def count_users(session: AsyncSession) -> int:
 
 
 async def count_reviews(session: AsyncSession) -> int:
-    q = await session.execute(select(func.count(Review.id)))
+    totals = _review_totals(await get_watermark(session, ROLLUP_WATERMARK))
+    q = await session.execute(select(func.sum(totals.c.reviews_count)))
     return int(q.scalar() or 0)
 
 
@@ -267,6 +406,65 @@ async def list_reviews_admin(
     return res.unique().scalars().all()  
 
 
+async def stream_reviews_export(
+    session: AsyncSession,
+    requested_by_tg_id: int,
+    branch_id: int | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    chunk_size: int = 1000,
+    include_archive: bool = True,
+) -> AsyncIterator[list]:
+    """
+    Sharhlarni server-side cursor orqali bo‘laklab qaytaradi (har safar ``chunk_size`` qator).
+    Butun natija hech qachon xotiraga yuklanmaydi. ``include_archive`` — reviews_archive dagilar
+    ham (ID bo‘yicha birga); sana oralig‘i arxivga tegmasa, u faqat created_at indeksida tekshiriladi.
+    """
+    await _ensure_admin(session, requested_by_tg_id)
+
+    def review_rows(model, photo_ids):
+        q = (
+            select(
+                model.id.label("review_id"),
+                model.created_at,
+                model.rating,
+                model.text,
+                Branch.id.label("branch_id"),
+                Branch.nameuz,
+                Branch.nameru,
+                User.tg_id,
+                User.first_name,
+                User.last_name,
+                User.phone,
+                photo_ids.label("photo_ids"),
+            )
+            .join(Branch, Branch.id == model.branch_id)
+            .outerjoin(User, User.id == model.user_id)
+        )
+        if branch_id is not None:
+            q = q.where(model.branch_id == branch_id)
+        if date_from is not None:
+            q = q.where(model.created_at >= date_from)
+        if date_to is not None:
+            q = q.where(model.created_at < date_to)
+        return q
+
+    photo_ids = (
+        select(func.string_agg(ReviewPhoto.file_id, " "))
+        .where(ReviewPhoto.review_id == Review.id)
+        .scalar_subquery()
+    )
+    q = review_rows(Review, photo_ids)
+    if include_archive:
+        archived = review_rows(ReviewArchive, func.array_to_string(ReviewArchive.photo_file_ids, " "))
+        q = union_all(q, archived)
+    q = q.order_by(literal_column("review_id")).execution_options(yield_per=chunk_size)
+
+    result = await session.stream(q)
+    async for rows in result.partitions():
+        yield rows
+
+
 async def get_review(session: AsyncSession, review_id: int) -> Review | None:
     q = await session.execute(select(Review).where(Review.id == review_id))
     return q.scalar_one_or_none()
@@ -282,126 +480,619 @@ async def delete_review_admin(
     r = q.scalar_one_or_none()
     if r is None:
         return False
+    await _unroll_review(session, r)
     await session.delete(r)
     await session.commit()
     return True
 
-async def get_admin_group(session: AsyncSession, super_admin_id: int) -> int | None:
+# =============== Notification routes ===============
+
+async def list_notification_routes(session: AsyncSession) -> list[tuple[int, int | None]]:
+    """Barcha ``(chat_id, branch_id)`` marshrutlar; ``branch_id`` None — barcha filiallar."""
+    q = await session.execute(select(NotificationRoute.chat_id, NotificationRoute.branch_id))
+    return [tuple(row) for row in q.all()]
+
+
+async def set_chat_routes(
+    session: AsyncSession, chat_id: int, branch_ids: list[int] | None, created_by: int
+) -> None:
+    """
+    Chat marshrutlarini almashtiradi: ``None`` — barcha filiallar, ``[]`` — chat o‘chiriladi.
+    Mavjud bo‘lmagan filial ID lari ``ValueError`` beradi.
+    """
+    if branch_ids:
+        q = await session.execute(select(Branch.id).where(Branch.id.in_(branch_ids)))
+        missing = set(branch_ids) - set(q.scalars().all())
+        if missing:
+            raise ValueError(f"Unknown branches: {sorted(missing)}")
+    await session.execute(NotificationRoute.__table__.delete().where(NotificationRoute.chat_id == chat_id))
+    targets = [None] if branch_ids is None else sorted(set(branch_ids))
+    if targets:
+        await session.execute(
+            pg_insert(NotificationRoute)
+            .values([{"chat_id": chat_id, "branch_id": b, "created_by": created_by} for b in targets])
+            .on_conflict_do_nothing()
+        )
+    await cache.publish(session, "routes")
+    await session.commit()
+
+
+# =============== Digests ===============
+DIGEST_MODES = ("hourly", "batch")
+
+
+async def list_digest_settings(session: AsyncSession) -> list[DigestSetting]:
+    q = await session.execute(select(DigestSetting).order_by(DigestSetting.chat_id))
+    return list(q.scalars().all())
+
+
+async def set_digest_setting(
+    session: AsyncSession,
+    chat_id: int,
+    mode: str | None,
+    updated_by: int,
+    batch_size: int = 20,
+    instant_low: bool = True,
+) -> None:
+    """
+    ``mode=None`` — dayjest o‘chadi (har bir sharh alohida). Yangi dayjest faqat keyingi
+    sharhlardan boshlanadi; rejim o‘zgarganda watermark saqlanadi.
+    """
+    if mode is None:
+        await session.execute(DigestSetting.__table__.delete().where(DigestSetting.chat_id == chat_id))
+        await cache.publish(session, "routes")
+        await session.commit()
+        return
+    if mode not in DIGEST_MODES:
+        raise ValueError(f"Unknown digest mode: {mode}")
+    last_id = (await session.execute(select(func.coalesce(func.max(Review.id), 0)))).scalar_one()
+    stmt = pg_insert(DigestSetting).values(
+        chat_id=chat_id,
+        mode=mode,
+        batch_size=batch_size,
+        instant_low=instant_low,
+        last_review_id=last_id,
+        updated_by=updated_by,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DigestSetting.chat_id],
+        set_={
+            "mode": stmt.excluded.mode,
+            "batch_size": stmt.excluded.batch_size,
+            "instant_low": stmt.excluded.instant_low,
+            "updated_by": stmt.excluded.updated_by,
+            "updated_at": func.now(),
+        },
+    )
+    await session.execute(stmt)
+    await cache.publish(session, "routes")
+    await session.commit()
+
+
+async def review_digest(
+    session: AsyncSession,
+    after_id: int,
+    branch_ids: tuple[int, ...] | None = None,
+    settle_seconds: int = 30,
+    low_rating: int = 2,
+) -> list[tuple]:
+    """
+    ``after_id`` dan keyingi sharhlarning filial bo‘yicha yig‘indisi — bitta so‘rov. Har bir qator:
+    ``(branch_id, jami, baholangan, baholar yig‘indisi, r1..r5, max id, past baholar ID lari)``.
+    ``settle_seconds`` dan yangilari keyingi oynaga qoladi (rollup lar bilan bir xil sabab).
+    """
+    q = (
+        select(
+            Review.branch_id,
+            func.count(Review.id),
+            func.count(Review.rating),
+            func.coalesce(func.sum(Review.rating), 0),
+            *[func.count(Review.id).filter(Review.rating == n) for n in range(1, 6)],
+            func.max(Review.id),
+            func.array_agg(aggregate_order_by(Review.id, Review.id)).filter(Review.rating <= low_rating),
+        )
+        .where(
+            Review.id > after_id,
+            Review.inserted_at < func.now() - timedelta(seconds=settle_seconds),
+        )
+        .group_by(Review.branch_id)
+        .order_by(Review.branch_id)
+    )
+    if branch_ids is not None:
+        q = q.where(Review.branch_id.in_(branch_ids))
+    res = await session.execute(q)
+    return [tuple(row) for row in res.all()]
+
+
+async def advance_digest(session: AsyncSession, chat_id: int, last_review_id: int | None) -> None:
+    """Dayjest yuborildi (yoki oyna bo‘sh o‘tdi): vaqt va watermark yangilanadi."""
+    values = {"last_sent_at": func.now()}
+    if last_review_id is not None:
+        values["last_review_id"] = func.greatest(DigestSetting.last_review_id, last_review_id)
+    await session.execute(
+        DigestSetting.__table__.update().where(DigestSetting.chat_id == chat_id).values(**values)
+    )
+    await session.commit()
+
+
+# =============== Watermarks & daily rollups ===============
+
+ROLLUP_WATERMARK = "branch_daily_stats"
+LOCAL_TZ = "Asia/Tashkent"
+
+
+def _local_day(column):
+    # literal — GROUP BY dagi ifoda SELECT dagisi bilan bir xil bo‘lishi uchun (bind param emas)
+    return func.date(func.timezone(literal_column(f"'{LOCAL_TZ}'"), column))
+
+
+async def get_watermark(session: AsyncSession, name: str, for_update: bool = False) -> int:
+    await session.execute(
+        pg_insert(JobWatermark).values(name=name, value=0).on_conflict_do_nothing()
+    )
+    q = select(JobWatermark.value).where(JobWatermark.name == name)
+    if for_update:
+        q = q.with_for_update()
+    res = await session.execute(q)
+    return int(res.scalar_one())
+
+
+async def set_watermark(session: AsyncSession, name: str, value: int) -> None:
+    row = await session.get(JobWatermark, name)
+    row.value = value
+
+
+async def refresh_branch_rollups(
+    session: AsyncSession,
+    settle_seconds: int = 30,
+    batch_size: int = 50_000,
+) -> int:
+    """
+    Watermark dan keyingi yangi sharhlarni branch_daily_stats ga qo‘shadi.
+    Faqat ``settle_seconds`` dan oldin yozilganlar (``inserted_at``) olinadi — hali commit
+    bo‘lmagan tranzaksiyalardagi ID lar o‘tkazib yuborilmasligi uchun. ``created_at`` bunga
+    yaramaydi: write-behind batcher uni navbatga qo‘yilgan vaqtdan oladi.
+    Qayta ishlangan sharhlar sonini qaytaradi.
+    """
+    watermark = await get_watermark(session, ROLLUP_WATERMARK, for_update=True)
+    window = (
+        select(Review.id)
+        .where(
+            Review.id > watermark,
+            Review.inserted_at < func.now() - timedelta(seconds=settle_seconds),
+        )
+        .order_by(Review.id)
+        .limit(batch_size)
+        .subquery()
+    )
+    res = await session.execute(select(func.max(window.c.id), func.count(window.c.id)))
+    upper, processed = res.one()
+    if upper is None:
+        await session.commit()
+        return 0
+
+    day = _local_day(Review.created_at)
+    agg = (
+        select(
+            Review.branch_id,
+            day,
+            func.count(Review.id),
+            func.count(Review.rating),
+            func.coalesce(func.sum(Review.rating), 0),
+            *[func.count(Review.id).filter(Review.rating == n) for n in range(1, 6)],
+        )
+        .where(Review.id > watermark, Review.id <= upper)
+        .group_by(Review.branch_id, day)
+    )
+    counters = ["reviews_count", "rated_count", "rating_sum", "r1", "r2", "r3", "r4", "r5"]
+    stmt = pg_insert(BranchDailyStat).from_select(["branch_id", "day", *counters], agg)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BranchDailyStat.branch_id, BranchDailyStat.day],
+        set_={c: getattr(BranchDailyStat, c) + getattr(stmt.excluded, c) for c in counters},
+    )
+    await session.execute(stmt)
+    await set_watermark(session, ROLLUP_WATERMARK, int(upper))
+    await session.commit()
+    return int(processed)
+
+
+async def _unroll_review(session: AsyncSession, review: Review) -> None:
     """
-    Super admin uchun bog‘langan guruh ID sini qaytaradi.
-    Agar topilmasa, None qaytaradi.
+    O‘chirilayotgan sharh allaqachon yig‘ilgan bo‘lsa, kunlik statistikadan ayiradi.
+    Watermark qulflanadi: parallel ``refresh_branch_rollups`` sharhni bu tranzaksiya tugaguncha yig‘maydi.
     """
-    # Ensure column exists (idempotent)
-    await session.execute(text("ALTER TABLE admins ADD COLUMN IF NOT EXISTS group_id BIGINT"))
+    watermark = await get_watermark(session, ROLLUP_WATERMARK, for_update=True)
+    if review.id > watermark:
+        return
+    rating = review.rating
+    values = {
+        "reviews_count": BranchDailyStat.reviews_count - 1,
+        "rated_count": BranchDailyStat.rated_count - (1 if rating else 0),
+        "rating_sum": BranchDailyStat.rating_sum - (rating or 0),
+    }
+    if rating:
+        col = f"r{rating}"
+        values[col] = getattr(BranchDailyStat, col) - 1
+    await session.execute(
+        BranchDailyStat.__table__.update()
+        .where(
+            BranchDailyStat.branch_id == review.branch_id,
+            BranchDailyStat.day == review.created_at.astimezone(ZoneInfo(LOCAL_TZ)).date(),
+        )
+        .values(**values)
+    )
+
+
+# =============== Cold archive ===============
+
+# Bitta statement: reviews dan o‘chiradi va rasmlari bilan reviews_archive ga yozadi. Barcha
+# qismlar bitta snapshotni ko‘radi — review_photos dagi qatorlar CASCADE dan oldin o‘qiladi.
+_ARCHIVE_CHUNK_SQL = text("""
+WITH moved AS (
+    DELETE FROM reviews
+    WHERE id IN (
+        SELECT id FROM reviews
+        WHERE id <= :watermark AND created_at < :cutoff
+        ORDER BY id
+        LIMIT :batch
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, user_id, branch_id, rating, text, created_at
+)
+INSERT INTO reviews_archive (
+    id, user_id, branch_id, rating, text, created_at, photo_file_ids, photo_unique_ids
+)
+SELECT m.id, m.user_id, m.branch_id, m.rating, m.text, m.created_at, p.file_ids, p.unique_ids
+FROM moved m
+LEFT JOIN LATERAL (
+    SELECT array_agg(file_id ORDER BY id) AS file_ids,
+           array_agg(file_unique_id ORDER BY id) AS unique_ids
+    FROM review_photos
+    WHERE review_id = m.id
+) p ON true
+""")
+
+
+async def archive_reviews_chunk(session: AsyncSession, cutoff: datetime, batch_size: int = 2000) -> int:
+    """
+    ``cutoff`` dan eski sharhlarning bitta bo‘lagini arxivga ko‘chiradi va commit qiladi.
+    Faqat kunlik statistikaga allaqachon kirganlar (ID ≤ rollup watermark) olinadi — ular
+    branch_daily_stats da qoladi. Har bir bo‘lak o‘zi yakunlangan: to‘xtab qolsa, keyingisi
+    qolgan joydan davom etadi. Ko‘chirilganlar sonini qaytaradi.
+    """
+    watermark = await get_watermark(session, ROLLUP_WATERMARK)
+    res = await session.execute(
+        _ARCHIVE_CHUNK_SQL, {"watermark": watermark, "cutoff": cutoff, "batch": batch_size}
+    )
     await session.commit()
+    return int(res.rowcount or 0)
+
+
+TREND_WINDOWS = (7, 30, 90)
+
+
+async def branch_trends(session: AsyncSession, today: date) -> list[dict]:
+    """
+    Filiallar bo‘yicha 7/30/90 kunlik trendlar va haftalik o‘zgarish (WoW).
+    Faqat branch_daily_stats dan hisoblanadi, reviews jadvali skan qilinmaydi.
+    """
+    S = BranchDailyStat
+
+    def window(start: date, end: date):
+        cond = (S.day > start) & (S.day <= end)
+        return (
+            func.coalesce(func.sum(S.reviews_count).filter(cond), 0),
+            func.coalesce(func.sum(S.rated_count).filter(cond), 0),
+            func.coalesce(func.sum(S.rating_sum).filter(cond), 0),
+        )
+
+    windows = {n: window(today - timedelta(days=n), today) for n in TREND_WINDOWS}
+    prev_week = window(today - timedelta(days=14), today - timedelta(days=7))
+    cols = [c for n in TREND_WINDOWS for c in windows[n]] + list(prev_week)
+
+    rollup = (
+        select(S.branch_id, *cols)
+        .where(S.day > today - timedelta(days=max(TREND_WINDOWS)))
+        .group_by(S.branch_id)
+        .subquery()
+    )
+    q = await session.execute(
+        select(Branch.id, Branch.nameuz, Branch.nameru, *list(rollup.c)[1:])
+        .join(rollup, rollup.c.branch_id == Branch.id, isouter=True)
+        .order_by(Branch.nameuz, Branch.id)
+    )
+
+    def summary(count, rated, total):
+        count, rated, total = int(count or 0), int(rated or 0), int(total or 0)
+        return {"reviews_count": count, "avg_rating": round(total / rated, 2) if rated else None}
+
+    trends = []
+    for row in q.all():
+        branch_id, nameuz, nameru, *values = row
+        display_name = nameuz or nameru or str(branch_id)
+        if nameuz and nameru and nameuz != nameru:
+            display_name = f"{nameuz} / {nameru}"
+        item = {"branch_id": branch_id, "display_name": display_name}
+        for i, n in enumerate(TREND_WINDOWS):
+            item[n] = summary(*values[i * 3:i * 3 + 3])
+        prev = summary(*values[-3:])
+        cur = item[7]
+        item["wow_count"] = cur["reviews_count"] - prev["reviews_count"]
+        item["wow_avg"] = (
+            round(cur["avg_rating"] - prev["avg_rating"], 2)
+            if cur["avg_rating"] is not None and prev["avg_rating"] is not None
+            else None
+        )
+        trends.append(item)
+    return trends
+
+
+# =============== Full-text search ===============
+
+def _search_tsquery(query: str):
+    simple = func.websearch_to_tsquery(literal_column("'simple'::regconfig"), query)
+    russian = func.websearch_to_tsquery(literal_column("'russian'::regconfig"), query)
+    return simple.op("||")(russian)
+
+
+def _search_vector(column):
+    # reviews.search_vector bilan bir xil ifoda — arxivda saqlanmaydi, so‘ralganda hisoblanadi
+    simple = func.to_tsvector(literal_column("'simple'::regconfig"), func.coalesce(column, ""))
+    russian = func.to_tsvector(literal_column("'russian'::regconfig"), func.coalesce(column, ""))
+    return simple.op("||")(russian)
+
+
+def _search_matches(model, vector, query: str, tsq):
+    score = (
+        func.ts_rank_cd(vector, tsq).cast(Float)
+        + func.word_similarity(query, func.coalesce(model.text, "")).cast(Float)
+    ).label("score")
+    return select(model.id.label("id"), score).where(
+        or_(
+            vector.op("@@")(tsq),
+            literal(query).op("<%")(model.text),
+        )
+    )
+
+
+async def search_reviews(
+    session: AsyncSession,
+    requested_by_tg_id: int,
+    query: str,
+    limit: int = 5,
+    after: tuple[float, int] | None = None,
+    include_archive: bool = False,
+) -> tuple[list[tuple[Review | ReviewArchive, float]], tuple[float, int] | None]:
+    """
+    Sharh matni bo‘yicha qidiruv: tsvector (GIN) + pg_trgm (noaniq moslik).
+    Natijalar reyting bo‘yicha saralanadi va (score, id) keyset kursor bilan sahifalanadi.
+    ``include_archive`` — reviews_archive ham (indekssiz, to‘liq skan; faqat so‘ralganda).
+    Sahifa va keyingi sahifa kursorini (yoki None) qaytaradi.
+    """
+    await _ensure_admin(session, requested_by_tg_id)
+
+    tsq = _search_tsquery(query)
+    matches = _search_matches(Review, Review.search_vector, query, tsq)
+    if include_archive:
+        # Arxiv asl ID larni saqlaydi — (score, id) kursor ikkala jadval uchun ham yagona
+        archived = _search_matches(ReviewArchive, _search_vector(ReviewArchive.text), query, tsq)
+        matches = union_all(matches, archived)
+    matches = matches.subquery()
+    q = select(matches.c.id, matches.c.score)
+    if after is not None:
+        q = q.where(tuple_(matches.c.score, matches.c.id) < tuple_(literal(after[0], Float), after[1]))
+    q = q.order_by(matches.c.score.desc(), matches.c.id.desc()).limit(limit + 1)
+    rows = (await session.execute(q)).all()
+
+    page = rows[:limit]
+    next_cursor = (float(page[-1].score), int(page[-1].id)) if len(rows) > limit else None
+    if not page:
+        return [], None
+
+    ids = [r.id for r in page]
+    by_id = {}
+    for model in (Review, ReviewArchive) if include_archive else (Review,):
+        missing = [i for i in ids if i not in by_id]
+        if not missing:
+            break
+        res = await session.execute(
+            select(model)
+            .options(joinedload(model.user), joinedload(model.branch))
+            .where(model.id.in_(missing))
+        )
+        by_id.update((r.id, r) for r in res.scalars().all())
+    return [(by_id[r.id], float(r.score)) for r in page if r.id in by_id], next_cursor
+
+
+# =============== Photo archive ===============
+
+PHOTO_ARCHIVE_WATERMARK = "photo_archive"
+
+
+async def list_photos_to_archive(session: AsyncSession, after_id: int, limit: int = 200) -> list:
+    """Hali arxivlanmagan rasmlar (file_unique_id bo‘yicha), ID tartibida."""
     q = await session.execute(
-        select(Admin.group_id).where(Admin.tg_id == super_admin_id)
+        select(ReviewPhoto.id, ReviewPhoto.file_id, ReviewPhoto.file_unique_id)
+        .where(
+            ReviewPhoto.id > after_id,
+            ~select(PhotoBlob.file_unique_id)
+            .where(PhotoBlob.file_unique_id == ReviewPhoto.file_unique_id)
+            .exists(),
+        )
+        .order_by(ReviewPhoto.id)
+        .limit(limit)
     )
+    return list(q.all())
+
+
+async def save_photo_blob(
+    session: AsyncSession,
+    photo_id: int,
+    file_unique_id: str,
+    sha256: str,
+    path: str,
+    size: int,
+) -> None:
+    await session.execute(
+        pg_insert(PhotoBlob)
+        .values(file_unique_id=file_unique_id, sha256=sha256, path=path, size=size)
+        .on_conflict_do_nothing()
+    )
+    # Eski yozuvlarda file_unique_id bo‘lmagan — to‘ldirib qo‘yamiz
+    await session.execute(
+        ReviewPhoto.__table__.update()
+        .where(ReviewPhoto.id == photo_id, ReviewPhoto.file_unique_id.is_(None))
+        .values(file_unique_id=file_unique_id, file_size=size)
+    )
+    await session.commit()
+
+
+async def get_photo_blob_paths(session: AsyncSession, file_unique_ids: list[str]) -> dict[str, str]:
+    if not file_unique_ids:
+        return {}
+    # Bitta massiv parametr — butun ro‘yxat uchun ham bind parametrlar chegarasiga yetmaydi
+    q = await session.execute(
+        select(PhotoBlob.file_unique_id, PhotoBlob.path)
+        .where(PhotoBlob.file_unique_id == any_(literal(file_unique_ids, ARRAY(String))))
+    )
+    return dict(q.all())
+
+
+# =============== App metadata (key/value) ===============
+
+async def get_meta(session: AsyncSession, key: str) -> str | None:
+    q = await session.execute(select(AppMeta.value).where(AppMeta.key == key))
     return q.scalar_one_or_none()
 
 
-async def set_admin_group(session: AsyncSession, tg_id: int, group_id: int):
-    """Superadmin uchun guruh ID ni saqlash (yoki yangilash)."""
-    # faqat SUPER_ADMINS ro'yxatidagi foydalanuvchilar o'zgartira oladi
-    if tg_id not in settings.SUPER_ADMINS:
-        raise ValueError("Not a superadmin")
+async def set_meta(session: AsyncSession, key: str, value: str) -> None:
+    stmt = pg_insert(AppMeta).values(key=key, value=value)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AppMeta.key],
+        set_={"value": stmt.excluded.value, "updated_at": func.now()},
+    )
+    await session.execute(stmt)
+    await session.commit()
 
-    # Ensure column exists (idempotent)
-    await session.execute(text("ALTER TABLE admins ADD COLUMN IF NOT EXISTS group_id BIGINT"))
+
+# =============== Broadcasts ===============
+
+BROADCAST_ACTIVE = "running"
+
+
+async def count_broadcast_audience(session: AsyncSession) -> int:
+    q = await session.execute(select(func.count(User.id)).where(User.is_blocked.is_(False)))
+    return int(q.scalar() or 0)
+
+
+async def create_broadcast(session: AsyncSession, created_by: int, text: str) -> Broadcast:
+    broadcast = Broadcast(
+        created_by=created_by,
+        text=text,
+        status=BROADCAST_ACTIVE,
+        total=await count_broadcast_audience(session),
+    )
+    session.add(broadcast)
     await session.commit()
+    await session.refresh(broadcast)
+    return broadcast
 
-    q = await session.execute(select(Admin).where(Admin.tg_id == tg_id))
-    admin = q.scalar_one_or_none()
-    if admin is None:
-        # Agar DBda bo'lmasa, super_admin sifatida yaratamiz
-        admin = Admin(tg_id=tg_id, role='super_admin', group_id=group_id)
-        session.add(admin)
-    else:
-        admin.group_id = group_id
+
+async def get_broadcast(session: AsyncSession, broadcast_id: int) -> Broadcast | None:
+    return await session.get(Broadcast, broadcast_id, populate_existing=True)
+
+
+async def list_broadcasts(session: AsyncSession, limit: int = 5) -> list[Broadcast]:
+    q = await session.execute(select(Broadcast).order_by(Broadcast.id.desc()).limit(limit))
+    return list(q.scalars().all())
+
+
+async def list_active_broadcast_ids(session: AsyncSession) -> list[int]:
+    q = await session.execute(
+        select(Broadcast.id).where(Broadcast.status == BROADCAST_ACTIVE).order_by(Broadcast.id)
+    )
+    return list(q.scalars().all())
+
+
+async def set_broadcast_progress_message(
+    session: AsyncSession, broadcast_id: int, chat_id: int, message_id: int
+) -> None:
+    await session.execute(
+        Broadcast.__table__.update()
+        .where(Broadcast.id == broadcast_id)
+        .values(progress_chat_id=chat_id, progress_message_id=message_id)
+    )
     await session.commit()
-    await session.refresh(admin)
-    return admin
 
-async def notify_superadmin_group(bot: Bot, session: AsyncSession, super_admin_id: int, review: Review):
-    """Yangi sharh haqida superadmin guruhiga xabar yuborish"""
 
-    # Guruh ID ni olish
-    group_id = await get_admin_group(session, super_admin_id)
-    if not group_id:
-        print("[notify_superadmin_group] ⚠️ Superadmin uchun group_id topilmadi")
-        return
+async def finish_broadcast(session: AsyncSession, broadcast_id: int, status: str) -> bool:
+    """Faol broadcastni ``done``/``cancelled`` qiladi; allaqachon tugagan bo‘lsa False."""
+    res = await session.execute(
+        Broadcast.__table__.update()
+        .where(Broadcast.id == broadcast_id, Broadcast.status == BROADCAST_ACTIVE)
+        .values(status=status, finished_at=func.now())
+    )
+    await session.commit()
+    return res.rowcount > 0
 
-    # Review ni barcha relation’lari bilan qayta yuklab olish
-    review = await get_review_with_relations(session, review.id)
-    if not review:
-        print(f"[notify_superadmin_group] ⚠️ Review id={review.id} topilmadi")
-        return
 
-    user = review.user
-    branch = review.branch
-    if branch:
-        branch_name = branch.nameuz or branch.nameru or "-"
-        if branch.nameuz and branch.nameru and branch.nameuz != branch.nameru:
-            branch_name = f"{branch.nameuz} / {branch.nameru}"
-    else:
-        branch_name = "-"
-
-    # Vaqtni Toshkent TZ ga o‘tkazish
-    localtime = review.created_at.astimezone(ZoneInfo("Asia/Tashkent"))
-
-    # User haqida ma'lumot
-    name = " ".join(filter(None, [user.first_name, user.last_name])) if user else "-"
-    phone = user.phone if user and user.phone else "-"
-    branch_name = branch_name or "-"
-    review_text = review.text or "-"
-    
-    safe_name = html.escape(name)
-    safe_phone = html.escape(phone)
-    safe_branch = html.escape(branch_name)
-    safe_text = html.escape(review_text)
-    # Safe tg_link — keep only the <a> tag
-    tg_link = f"<a href='tg://user?id={user.tg_id}'>{safe_name or 'User'}</a>" if user else "-"
-
-    # Caption formatlash
-    caption = (
-    f"🆕 Yangi sharh!\n"
-    f"#{review.id} | \n"
-    f"👤 {tg_link} | 📱 {safe_phone}\n"
-    f"📍 {safe_branch}\n"
-    f"💬 {safe_text}\n"
-    f"🕒 {localtime.strftime('%Y-%m-%d %H:%M')}"
-    )
-
-    photos = [p.file_id for p in (review.photos or [])]
-
-    try:
-        if not photos:
-            # faqat text
-            await bot.send_message(
-                chat_id=group_id,
-                text=caption,
-                parse_mode="HTML"
-            )
-        elif len(photos) == 1:
-            # bitta rasm
-            await bot.send_photo(
-                chat_id=group_id,
-                photo=photos[0],
-                caption=caption,
-                parse_mode="HTML"
+async def broadcast_recipients(
+    session: AsyncSession, broadcast_id: int, after_user_id: int, limit: int = 500
+) -> list:
+    """
+    Keyset partiya: ``(user_id, tg_id, delivered)`` — ``delivered`` bo‘lganlar (uzilishdan oldin
+    yuborilgan) qayta yuborilmaydi, lekin cursor ularni ham o‘tib ketadi.
+    """
+    delivered = (
+        select(BroadcastDelivery.user_id)
+        .where(BroadcastDelivery.broadcast_id == broadcast_id, BroadcastDelivery.user_id == User.id)
+        .exists()
+    )
+    q = await session.execute(
+        select(User.id, User.tg_id, delivered.label("delivered"))
+        .where(User.id > after_user_id, User.is_blocked.is_(False))
+        .order_by(User.id)
+        .limit(limit)
+    )
+    return list(q.all())
+
+
+async def record_broadcast_deliveries(
+    session: AsyncSession,
+    broadcast_id: int,
+    results: list[tuple[int, str]],
+    cursor: int | None = None,
+) -> None:
+    """
+    ``(user_id, status)`` natijalarini yozadi, 403 larni ``is_blocked`` qiladi va hisoblagichlarni
+    faqat haqiqatan qo‘shilgan qatorlar bo‘yicha oshiradi (qayta yozish ikki marta sanalmaydi).
+    """
+    counts = {"sent": 0, "failed": 0, "blocked": 0}
+    if results:
+        res = await session.execute(
+            pg_insert(BroadcastDelivery)
+            .values([
+                {"broadcast_id": broadcast_id, "user_id": user_id, "status": status}
+                for user_id, status in results
+            ])
+            .on_conflict_do_nothing()
+            .returning(BroadcastDelivery.status)
+        )
+        for status in res.scalars():
+            counts[status] += 1
+        blocked_ids = [user_id for user_id, status in results if status == "blocked"]
+        if blocked_ids:
+            await session.execute(
+                User.__table__.update().where(User.id.in_(blocked_ids)).values(is_blocked=True)
             )
-        else:
-            # ko‘p rasm → media group
-            media = []
-            for idx, file_id in enumerate(photos):
-                if idx == 0:
-                    media.append(InputMediaPhoto(media=file_id, caption=caption, parse_mode="HTML"))
-                else:
-                    media.append(InputMediaPhoto(media=file_id))
-            await bot.send_media_group(chat_id=group_id, media=media)
-             # ✅ Agar muvaffaqiyatli yuborilsa:
-        print(f"[notify_superadmin_group] ✅ Sharh #{review.id} guruhga yuborildi ({group_id})")
-
-
-    except Exception as e:
-        print(f"[notify_superadmin_group] ❌ Guruhga yuborishda xatolik: {e}")
+    values = {
+        "sent": Broadcast.sent + counts["sent"],
+        "failed": Broadcast.failed + counts["failed"],
+        "blocked": Broadcast.blocked + counts["blocked"],
+    }
+    if cursor is not None:
+        values["cursor"] = func.greatest(Broadcast.cursor, cursor)
+    await session.execute(
+        Broadcast.__table__.update().where(Broadcast.id == broadcast_id).values(**values)
+    )
+    await session.commit()
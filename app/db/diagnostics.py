@@ -0,0 +1,178 @@
+"""
+Sekin SQL so‘rovlar jurnali: har bir statement engine hodisalari orqali o‘lchanadi,
+``DB_SLOW_QUERY_MS`` dan oshganlari loglanadi (normallashtirilgan SQL, yashirilgan parametrlar,
+handler) va fon taskida ``EXPLAIN`` rejasi olinadi. Natijalar fingerprint bo‘yicha yig‘iladi —
+``/slowlog`` eng ko‘p vaqt olganlarini ko‘rsatadi.
+
+Yig‘indi jarayon xotirasida: ``WORKERS>1`` da ``/slowlog`` faqat so‘rov kelgan workerni ko‘rsatadi
+(har bir sekin so‘rov baribir ``app.db.slow`` logiga yoziladi).
+"""
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app import metrics
+from app.config import settings
+from app.logs import log_context
+
+logger = logging.getLogger("app.db.slow")
+
+MAX_FINGERPRINTS = 200
+# Bitta so‘rov rejasi shundan tez-tez olinmaydi
+EXPLAIN_INTERVAL = 600.0
+EXPLAIN_TIMEOUT = 5.0
+SQL_MAX_LEN = 2000
+
+query_seconds = metrics.histogram("db_query_seconds", "SQL statement latency")
+slow_total = metrics.counter("db_slow_queries_total", "Statements slower than DB_SLOW_QUERY_MS")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<![:\w]):\w+\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """Literal va parametrlarni ``?`` ga almashtiradi — bir xil so‘rovlar bitta fingerprint."""
+    sql = _STRING.sub("?", statement)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(...)", sql)
+    return _SPACES.sub(" ", sql).strip()[:SQL_MAX_LEN]
+
+
+def redact(value: Any) -> Any:
+    """Parametr qiymatlari (telefon, sharh matni, tg_id) logga tushmaydi — faqat turi va hajmi."""
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value[:10]] + (["..."] if len(value) > 10 else [])
+    if isinstance(value, dict):
+        return {k: redact(v) for k, v in value.items()}
+    if isinstance(value, (str, bytes)):
+        return f"<{type(value).__name__}:{len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+@dataclass
+class SlowQuery:
+    sql: str
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    handlers: set[str] = field(default_factory=set)
+    plan: str | None = None
+    explained_at: float = 0.0
+    last_seen: float = 0.0
+
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms: float, explain: bool = True):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.engine: AsyncEngine | None = None
+        self.stats: dict[str, SlowQuery] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    # --- Engine hodisalari (sinxron, greenlet ichida) ---
+    def install(self, engine: AsyncEngine) -> None:
+        self.engine = engine
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", self._before)
+        event.listen(sync_engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if context is not None:
+            context._diag_started = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        started = getattr(context, "_diag_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        query_seconds.observe(elapsed)
+        if elapsed * 1000 >= self.threshold_ms and not conn.info.get("diag_explain"):
+            self.record(statement, parameters, elapsed * 1000, executemany)
+
+    # --- Yig‘ish ---
+    def record(self, statement: str, parameters: Any, elapsed_ms: float, executemany: bool = False) -> None:
+        slow_total.inc()
+        ctx = log_context.get() or {}
+        handler = ctx.get("handler") or "-"
+        fingerprint = normalize_sql(statement)
+        entry = self.stats.get(fingerprint)
+        if entry is None:
+            if len(self.stats) >= MAX_FINGERPRINTS:
+                del self.stats[min(self.stats, key=lambda k: self.stats[k].total_ms)]
+            entry = self.stats[fingerprint] = SlowQuery(fingerprint)
+        entry.count += 1
+        entry.total_ms += elapsed_ms
+        entry.max_ms = max(entry.max_ms, elapsed_ms)
+        entry.handlers.add(handler)
+        entry.last_seen = time.time()
+
+        params = redact(parameters)
+        if self._should_explain(entry, statement, executemany):
+            entry.explained_at = time.monotonic()
+            task = asyncio.get_running_loop().create_task(
+                self._explain_and_log(entry, statement, parameters, params, elapsed_ms, handler)
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            self._log(entry, params, elapsed_ms, handler)
+
+    def _should_explain(self, entry: SlowQuery, statement: str, executemany: bool) -> bool:
+        if not self.explain or self.engine is None or executemany:
+            return False
+        # Faqat o‘qish so‘rovlari; ANALYZE siz — so‘rov qayta bajarilmaydi
+        keyword = statement.lstrip()[:6].upper()
+        if not (keyword.startswith("SELECT") or keyword.startswith("WITH")):
+            return False
+        return time.monotonic() - entry.explained_at >= EXPLAIN_INTERVAL
+
+    def _log(self, entry: SlowQuery, params: Any, elapsed_ms: float, handler: str, plan: str | None = None) -> None:
+        logger.warning(
+            "Slow query %.1f ms in %s: %s | params=%s%s",
+            elapsed_ms,
+            handler,
+            entry.sql,
+            params,
+            f"\n{plan}" if plan else "",
+            extra={"duration_ms": round(elapsed_ms, 2)},
+        )
+
+    async def _explain_and_log(
+        self, entry: SlowQuery, statement: str, parameters: Any, params: Any, elapsed_ms: float, handler: str
+    ) -> None:
+        plan = None
+        try:
+            async with asyncio.timeout(EXPLAIN_TIMEOUT):
+                async with self.engine.connect() as conn:
+                    conn.sync_connection.info["diag_explain"] = True
+                    try:
+                        result = await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+                        plan = "\n".join(row[0] for row in result)
+                    finally:
+                        conn.sync_connection.info.pop("diag_explain", None)
+            entry.plan = plan
+        except Exception as e:
+            logger.info("EXPLAIN failed for slow query: %s", e)
+        self._log(entry, params, elapsed_ms, handler, plan)
+
+    def top(self, n: int | None = None) -> list[SlowQuery]:
+        n = n or settings.DB_SLOWLOG_TOP
+        return sorted(self.stats.values(), key=lambda e: e.total_ms, reverse=True)[:n]
+
+    def reset(self) -> None:
+        self.stats.clear()
+
+
+slowlog = SlowQueryLog(settings.DB_SLOW_QUERY_MS, explain=settings.DB_EXPLAIN)
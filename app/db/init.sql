@@ -44,3 +44,123 @@ CREATE TABLE IF NOT EXISTS admins (
   role VARCHAR(20) NOT NULL CHECK (role IN ('admin','super_admin')),
   created_at TIMESTAMPTZ DEFAULT now()
 );
+
+CREATE TABLE IF NOT EXISTS branch_daily_stats (
+  branch_id BIGINT REFERENCES branches(id) ON DELETE CASCADE,
+  day DATE NOT NULL,
+  reviews_count INTEGER NOT NULL DEFAULT 0,
+  rated_count INTEGER NOT NULL DEFAULT 0,
+  rating_sum INTEGER NOT NULL DEFAULT 0,
+  r1 INTEGER NOT NULL DEFAULT 0,
+  r2 INTEGER NOT NULL DEFAULT 0,
+  r3 INTEGER NOT NULL DEFAULT 0,
+  r4 INTEGER NOT NULL DEFAULT 0,
+  r5 INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (branch_id, day)
+);
+CREATE INDEX IF NOT EXISTS ix_branch_daily_stats_day ON branch_daily_stats (day);
+
+CREATE TABLE IF NOT EXISTS job_watermarks (
+  name VARCHAR(50) PRIMARY KEY,
+  value BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ DEFAULT now()
+);
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+ALTER TABLE reviews ADD COLUMN IF NOT EXISTS search_vector tsvector
+  GENERATED ALWAYS AS (
+    to_tsvector('simple'::regconfig, coalesce(text, '')) ||
+    to_tsvector('russian'::regconfig, coalesce(text, ''))
+  ) STORED;
+CREATE INDEX IF NOT EXISTS ix_reviews_search_vector ON reviews USING gin (search_vector);
+CREATE INDEX IF NOT EXISTS ix_reviews_text_trgm ON reviews USING gin (text gin_trgm_ops);
+
+ALTER TABLE review_photos ADD COLUMN IF NOT EXISTS file_unique_id VARCHAR(64);
+ALTER TABLE review_photos ADD COLUMN IF NOT EXISTS file_size INTEGER;
+CREATE INDEX IF NOT EXISTS ix_review_photos_file_unique_id ON review_photos (file_unique_id);
+
+ALTER TABLE reviews ADD COLUMN IF NOT EXISTS idempotency_key VARCHAR(64);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_reviews_idempotency_key ON reviews (idempotency_key);
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS is_blocked BOOLEAN NOT NULL DEFAULT false;
+
+ALTER TABLE reviews ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now();
+CREATE INDEX IF NOT EXISTS ix_reviews_user_id ON reviews (user_id);
+
+ALTER TABLE reviews ADD COLUMN IF NOT EXISTS inserted_at TIMESTAMPTZ NOT NULL DEFAULT now();
+ALTER TABLE reviews ALTER COLUMN inserted_at SET DEFAULT clock_timestamp();
+
+CREATE TABLE IF NOT EXISTS broadcasts (
+  id BIGSERIAL PRIMARY KEY,
+  created_by BIGINT NOT NULL,
+  text TEXT NOT NULL,
+  status VARCHAR(20) NOT NULL DEFAULT 'running',
+  cursor BIGINT NOT NULL DEFAULT 0,
+  total INTEGER NOT NULL DEFAULT 0,
+  sent INTEGER NOT NULL DEFAULT 0,
+  failed INTEGER NOT NULL DEFAULT 0,
+  blocked INTEGER NOT NULL DEFAULT 0,
+  progress_chat_id BIGINT,
+  progress_message_id INTEGER,
+  created_at TIMESTAMPTZ DEFAULT now(),
+  finished_at TIMESTAMPTZ
+);
+CREATE INDEX IF NOT EXISTS ix_broadcasts_status ON broadcasts (status);
+
+CREATE TABLE IF NOT EXISTS broadcast_deliveries (
+  broadcast_id BIGINT REFERENCES broadcasts(id) ON DELETE CASCADE,
+  user_id BIGINT REFERENCES users(id) ON DELETE CASCADE,
+  status VARCHAR(10) NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT now(),
+  PRIMARY KEY (broadcast_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS notification_routes (
+  id BIGSERIAL PRIMARY KEY,
+  chat_id BIGINT NOT NULL,
+  branch_id BIGINT REFERENCES branches(id) ON DELETE CASCADE,
+  created_by BIGINT,
+  created_at TIMESTAMPTZ DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_notification_routes_chat_id ON notification_routes (chat_id);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_notification_routes_chat_branch
+  ON notification_routes (chat_id, COALESCE(branch_id, 0));
+
+CREATE TABLE IF NOT EXISTS digest_settings (
+  chat_id BIGINT PRIMARY KEY,
+  mode VARCHAR(10) NOT NULL,
+  batch_size INTEGER NOT NULL DEFAULT 20,
+  instant_low BOOLEAN NOT NULL DEFAULT true,
+  last_review_id BIGINT NOT NULL DEFAULT 0,
+  last_sent_at TIMESTAMPTZ DEFAULT now(),
+  updated_by BIGINT,
+  updated_at TIMESTAMPTZ DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS reviews_archive (
+  id BIGINT PRIMARY KEY,
+  user_id BIGINT REFERENCES users(id) ON DELETE SET NULL,
+  branch_id BIGINT REFERENCES branches(id) ON DELETE CASCADE,
+  rating SMALLINT,
+  text TEXT,
+  created_at TIMESTAMPTZ NOT NULL,
+  photo_file_ids TEXT[],
+  photo_unique_ids VARCHAR(64)[],
+  archived_at TIMESTAMPTZ DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_reviews_archive_created_at ON reviews_archive (created_at);
+
+CREATE TABLE IF NOT EXISTS photo_blobs (
+  file_unique_id VARCHAR(64) PRIMARY KEY,
+  sha256 VARCHAR(64) NOT NULL,
+  path TEXT NOT NULL,
+  size INTEGER NOT NULL,
+  archived_at TIMESTAMPTZ DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_photo_blobs_sha256 ON photo_blobs (sha256);
+
+CREATE TABLE IF NOT EXISTS app_meta (
+  key VARCHAR(100) PRIMARY KEY,
+  value TEXT NOT NULL,
+  updated_at TIMESTAMPTZ DEFAULT now()
+);
@@ -1,5 +1,12 @@
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import BigInteger, ForeignKey, Integer, String, Text, Boolean, DateTime, func
+from sqlalchemy import BigInteger, ForeignKey, Index, Integer, String, Text, Boolean, Date, DateTime, Computed, func
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
+
+# Qidiruv vektori: o‘zbekcha (lotin/kirill) uchun 'simple', ruscha uchun 'russian' stemmer
+REVIEW_SEARCH_VECTOR_SQL = (
+    "to_tsvector('simple'::regconfig, coalesce(text, '')) || "
+    "to_tsvector('russian'::regconfig, coalesce(text, ''))"
+)
 
 class Base(DeclarativeBase):
     pass
@@ -12,6 +19,8 @@ class User(Base):
     last_name: Mapped[str | None] = mapped_column(String(120))
     phone: Mapped[str | None] = mapped_column(String(50))
     locale: Mapped[str] = mapped_column(String(5), default="uz")
+    # Botni bloklagan (403) — broadcast larda o‘tkazib yuboriladi
+    is_blocked: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
 class Branch(Base):
@@ -24,11 +33,26 @@ class Branch(Base):
 class Review(Base):
     __tablename__ = "reviews"
     id: Mapped[int] = mapped_column(primary_key=True)
-    user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"))
+    user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), index=True)
     branch_id: Mapped[int] = mapped_column(ForeignKey("branches.id", ondelete="CASCADE"), index=True)
     rating: Mapped[int | None] = mapped_column(Integer, nullable=True)
     text: Mapped[str | None] = mapped_column(Text)
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # Bazaga haqiqatda yozilgan vaqt (batcher created_at ni navbatga qo‘yilganda belgilaydi) —
+    # rollup/digest watermark lari shunga tayanadi
+    inserted_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True), server_default=func.clock_timestamp(), nullable=False
+    )
+    # Karta kesh kaliti: sharh, muallif profili yoki filial nomi o‘zgarganda yangilanadi
+    updated_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+    # Postgres o‘zi hisoblaydi (GENERATED ... STORED), oddiy so‘rovlarda yuklanmaydi
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR, Computed(REVIEW_SEARCH_VECTOR_SQL, persisted=True), deferred=True
+    )
+    # Write-behind batcher qayta yuborganda dublikat bo‘lmasligi uchun
+    idempotency_key: Mapped[str | None] = mapped_column(String(64), nullable=True)
 
     # relationships
     user: Mapped["User"] = relationship("User", backref="reviews")
@@ -39,16 +63,41 @@ class Review(Base):
         cascade="all, delete-orphan"
     )
 
+Index("ux_reviews_idempotency_key", Review.idempotency_key, unique=True)
+
 class ReviewPhoto(Base):
     __tablename__ = "review_photos"
     id: Mapped[int] = mapped_column(primary_key=True)
     review_id: Mapped[int] = mapped_column(ForeignKey("reviews.id", ondelete="CASCADE"), index=True)
     file_id: Mapped[str] = mapped_column(Text)
+    file_unique_id: Mapped[str | None] = mapped_column(String(64), index=True, nullable=True)
+    file_size: Mapped[int | None] = mapped_column(Integer, nullable=True)
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     # relationships
     review: Mapped["Review"] = relationship("Review", back_populates="photos")
     
+class ReviewArchive(Base):
+    """
+    Sovuq arxiv: ``ARCHIVE_AFTER_DAYS`` dan eski sharhlar asl ID si bilan shu yerga ko‘chiriladi.
+    Rasmlar alohida jadval o‘rniga massivlarda; qidiruv indekslari yo‘q — arxiv faqat eksport va
+    "arxivda ham qidirish" so‘ralganda o‘qiladi. Statistikasi branch_daily_stats da qoladi.
+    """
+    __tablename__ = "reviews_archive"
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    branch_id: Mapped[int] = mapped_column(ForeignKey("branches.id", ondelete="CASCADE"))
+    rating: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    text: Mapped[str | None] = mapped_column(Text)
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), index=True)
+    photo_file_ids: Mapped[list[str] | None] = mapped_column(ARRAY(Text), nullable=True)
+    photo_unique_ids: Mapped[list[str | None] | None] = mapped_column(ARRAY(String(64)), nullable=True)
+    archived_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    user: Mapped["User"] = relationship("User")
+    branch: Mapped["Branch"] = relationship("Branch")
+
+
 class Admin(Base):
     __tablename__ = "admins"
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -56,3 +105,107 @@ class Admin(Base):
     group_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     role: Mapped[str] = mapped_column(String(20))  # 'admin' | 'super_admin'
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class BranchDailyStat(Base):
+    """Kunlik (Asia/Tashkent) filial statistikasi — reviews jadvalidan inkremental yig‘iladi."""
+    __tablename__ = "branch_daily_stats"
+    branch_id: Mapped[int] = mapped_column(ForeignKey("branches.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[Date] = mapped_column(Date, primary_key=True, index=True)
+    reviews_count: Mapped[int] = mapped_column(Integer, default=0)
+    rated_count: Mapped[int] = mapped_column(Integer, default=0)
+    rating_sum: Mapped[int] = mapped_column(Integer, default=0)
+    r1: Mapped[int] = mapped_column(Integer, default=0)
+    r2: Mapped[int] = mapped_column(Integer, default=0)
+    r3: Mapped[int] = mapped_column(Integer, default=0)
+    r4: Mapped[int] = mapped_column(Integer, default=0)
+    r5: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class JobWatermark(Base):
+    """Fon jobs uchun progress: oxirgi qayta ishlangan ID."""
+    __tablename__ = "job_watermarks"
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    value: Mapped[int] = mapped_column(BigInteger, default=0)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class PhotoBlob(Base):
+    """Arxivlangan rasm: file_unique_id bo‘yicha bitta nusxa, kontent (sha256) bo‘yicha saqlanadi."""
+    __tablename__ = "photo_blobs"
+    file_unique_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    sha256: Mapped[str] = mapped_column(String(64), index=True)
+    path: Mapped[str] = mapped_column(Text)
+    size: Mapped[int] = mapped_column(Integer)
+    archived_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class AppMeta(Base):
+    """Ichki kalit/qiymat: sxema fingerprinti, bot buyruqlari xeshi va h.k."""
+    __tablename__ = "app_meta"
+    key: Mapped[str] = mapped_column(String(100), primary_key=True)
+    value: Mapped[str] = mapped_column(Text)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class Broadcast(Base):
+    """Super admin xabarnomasi: users bo‘ylab keyset (``cursor`` — oxirgi tugallangan users.id)."""
+    __tablename__ = "broadcasts"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    created_by: Mapped[int] = mapped_column(BigInteger)
+    text: Mapped[str] = mapped_column(Text)
+    status: Mapped[str] = mapped_column(String(20), default="running", index=True)  # running | done | cancelled
+    cursor: Mapped[int] = mapped_column(BigInteger, default=0)
+    total: Mapped[int] = mapped_column(Integer, default=0)
+    sent: Mapped[int] = mapped_column(Integer, default=0)
+    failed: Mapped[int] = mapped_column(Integer, default=0)
+    blocked: Mapped[int] = mapped_column(Integer, default=0)
+    # Jonli progress xabari (admin chatida tahrirlanadi)
+    progress_chat_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    progress_message_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    finished_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class BroadcastDelivery(Base):
+    """Har bir qabul qiluvchi uchun natija — qayta ishga tushganda yuborilganlar takrorlanmaydi."""
+    __tablename__ = "broadcast_deliveries"
+    broadcast_id: Mapped[int] = mapped_column(ForeignKey("broadcasts.id", ondelete="CASCADE"), primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    status: Mapped[str] = mapped_column(String(10))  # sent | failed | blocked
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class NotificationRoute(Base):
+    """Yangi sharh xabari qaysi chatga boradi: ``branch_id`` NULL — barcha filiallar."""
+    __tablename__ = "notification_routes"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    chat_id: Mapped[int] = mapped_column(BigInteger, index=True)
+    branch_id: Mapped[int | None] = mapped_column(ForeignKey("branches.id", ondelete="CASCADE"), nullable=True)
+    created_by: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+Index(
+    "ux_notification_routes_chat_branch",
+    NotificationRoute.chat_id,
+    func.coalesce(NotificationRoute.branch_id, 0),
+    unique=True,
+)
+
+
+class DigestSetting(Base):
+    """
+    Chat uchun dayjest rejimi: ``hourly`` — soatiga bir marta, ``batch`` — ``batch_size`` ta sharh
+    yig‘ilganda. Qatori yo‘q chatlar har bir sharhni alohida oladi.
+    ``last_review_id`` — oxirgi dayjestga kirgan sharh (watermark).
+    """
+    __tablename__ = "digest_settings"
+    chat_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    mode: Mapped[str] = mapped_column(String(10))  # hourly | batch
+    batch_size: Mapped[int] = mapped_column(Integer, default=20)
+    # Past baholar (≤2⭐) baribir darhol yuboriladi
+    instant_low: Mapped[bool] = mapped_column(Boolean, default=True, server_default="true")
+    last_review_id: Mapped[int] = mapped_column(BigInteger, default=0)
+    last_sent_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_by: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,103 @@
+import hashlib
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app.db import models
+
+SCHEMA_FINGERPRINT_KEY = "schema_fingerprint"
+
+# create_all dan oldin: kengaytmalar (indekslar ularga bog‘liq)
+PRE_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+]
+
+# create_all dan keyin: mavjud bazalar uchun idempotent migratsiyalar va indekslar
+POST_DDL = [
+    "ALTER TABLE admins ADD COLUMN IF NOT EXISTS group_id BIGINT",
+    "ALTER TABLE reviews ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS ({models.REVIEW_SEARCH_VECTOR_SQL}) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_reviews_search_vector ON reviews USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_reviews_text_trgm ON reviews USING gin (text gin_trgm_ops)",
+    "ALTER TABLE review_photos ADD COLUMN IF NOT EXISTS file_unique_id VARCHAR(64)",
+    "ALTER TABLE review_photos ADD COLUMN IF NOT EXISTS file_size INTEGER",
+    "CREATE INDEX IF NOT EXISTS ix_review_photos_file_unique_id ON review_photos (file_unique_id)",
+    "ALTER TABLE reviews ADD COLUMN IF NOT EXISTS idempotency_key VARCHAR(64)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_reviews_idempotency_key ON reviews (idempotency_key)",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS is_blocked BOOLEAN NOT NULL DEFAULT false",
+    "ALTER TABLE reviews ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+    "CREATE INDEX IF NOT EXISTS ix_reviews_user_id ON reviews (user_id)",
+    # now() — jadval qayta yozilmaydi; keyin default yangi qatorlar uchun clock_timestamp()
+    "ALTER TABLE reviews ADD COLUMN IF NOT EXISTS inserted_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+    "ALTER TABLE reviews ALTER COLUMN inserted_at SET DEFAULT clock_timestamp()",
+]
+
+# Bir martalik ma'lumot migratsiyalari: jadval shu ``ensure_schema`` da birinchi marta yaratilgandagina
+# bajariladi (POST_DDL esa har bir sxema o‘zgarishida qayta ishlaydi)
+ON_CREATE = {
+    # Eski yagona guruh (admins.group_id) — "barcha filiallar" marshruti sifatida
+    "notification_routes": [
+        "INSERT INTO notification_routes (chat_id, branch_id, created_by) "
+        "SELECT group_id, NULL, tg_id FROM admins WHERE role = 'super_admin' AND group_id IS NOT NULL "
+        "ON CONFLICT DO NOTHING",
+    ],
+}
+
+
+def schema_fingerprint() -> str:
+    """Modellar va qo‘shimcha DDL dan hosil qilingan xesh — sxema o‘zgarsa, xesh ham o‘zgaradi."""
+    dialect = postgresql.dialect()
+    parts = list(PRE_DDL)
+    for table in models.Base.metadata.sorted_tables:
+        parts.append(str(CreateTable(table).compile(dialect=dialect)))
+        for index in sorted(table.indexes, key=lambda i: i.name or ""):
+            parts.append(str(CreateIndex(index).compile(dialect=dialect)))
+    parts.extend(POST_DDL)
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+async def _table_exists(conn: AsyncConnection, name: str) -> bool:
+    exists = await conn.execute(text("SELECT to_regclass(:name)"), {"name": name})
+    return exists.scalar() is not None
+
+
+async def _stored_fingerprint(conn: AsyncConnection) -> str | None:
+    if not await _table_exists(conn, "app_meta"):
+        return None
+    q = await conn.execute(
+        select(models.AppMeta.value).where(models.AppMeta.key == SCHEMA_FINGERPRINT_KEY)
+    )
+    return q.scalar_one_or_none()
+
+
+async def ensure_schema(conn: AsyncConnection, force: bool = False) -> bool:
+    """
+    Sxemani yaratadi/yangilaydi. Saqlangan fingerprint mos kelsa (``force`` bo‘lmasa),
+    katalog tekshiruvlari va DDL butunlay o‘tkazib yuboriladi.
+    DDL bajarilgan bo‘lsa True qaytaradi.
+    """
+    fingerprint = schema_fingerprint()
+    if not force and await _stored_fingerprint(conn) == fingerprint:
+        return False
+
+    for stmt in PRE_DDL:
+        await conn.execute(text(stmt))
+    created = [name for name in ON_CREATE if not await _table_exists(conn, name)]
+    await conn.run_sync(models.Base.metadata.create_all)
+    for stmt in POST_DDL:
+        await conn.execute(text(stmt))
+    for name in created:
+        for stmt in ON_CREATE[name]:
+            await conn.execute(text(stmt))
+
+    stmt = pg_insert(models.AppMeta).values(key=SCHEMA_FINGERPRINT_KEY, value=fingerprint)
+    await conn.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[models.AppMeta.key],
+            set_={"value": stmt.excluded.value},
+        )
+    )
+    return True
@@ -0,0 +1,21 @@
+import re
+
+# /start payload: b<branch_id> yoki b<branch_id>_r<rating> (QR kodlar uchun)
+REVIEW_PAYLOAD = re.compile(r"b(\d+)(?:_r([1-5]))?")
+
+
+def parse_review_payload(payload: str | None) -> tuple[int, int | None] | None:
+    """``"b3_r5"`` → ``(3, 5)``, ``"b3"`` → ``(3, None)``; noto‘g‘ri payload uchun None."""
+    m = REVIEW_PAYLOAD.fullmatch(payload or "")
+    if m is None:
+        return None
+    rating = int(m.group(2)) if m.group(2) else None
+    return int(m.group(1)), rating
+
+
+def review_payload(branch_id: int, rating: int | None = None) -> str:
+    return f"b{branch_id}_r{rating}" if rating else f"b{branch_id}"
+
+
+def review_link(bot_username: str, branch_id: int, rating: int | None = None) -> str:
+    return f"https://t.me/{bot_username}?start={review_payload(branch_id, rating)}"
@@ -0,0 +1,122 @@
+"""
+Guruhlar uchun sharh dayjesti: har bir sharh o‘rniga soatiga bir marta (``hourly``) yoki
+``batch_size`` ta sharh yig‘ilganda (``batch``) bitta xabar — soni, baholar gistogrammasi,
+filiallar va past baholi (≤2⭐) sharhlar to‘liq.
+
+Har bir oyna bitta yig‘uvchi so‘rovdan quriladi, shuning uchun Bot API chaqiruvlari soni
+sharhlar soniga bog‘liq emas.
+"""
+import html
+import logging
+from datetime import datetime, timedelta, timezone
+
+from app import cards, metrics
+from app.config import settings
+from app.db import crud
+from app.db.session import SessionLocal
+from app.i18n import I18N
+from app.notify import LOW_RATING, route_table
+from app.sender import OutboundSender
+
+logger = logging.getLogger(__name__)
+
+HOURLY_WINDOW = timedelta(hours=1)
+MESSAGE_LIMIT = 4000
+BAR_WIDTH = 10
+
+digests_sent = metrics.counter("review_digests_sent_total", "Review digests delivered")
+
+
+def _bar(count: int, top: int) -> str:
+    filled = round(BAR_WIDTH * count / top) if top else 0
+    return "█" * filled + "░" * (BAR_WIDTH - filled)
+
+
+def digest_text(t, rows: list[tuple], branch_names: dict[int, str], low_cards: list[str], low_total: int) -> str:
+    total = sum(r[1] for r in rows)
+    rated = sum(r[2] for r in rows)
+    rating_sum = sum(r[3] for r in rows)
+    histogram = [sum(r[4 + i] for r in rows) for i in range(5)]
+    last_id = max(r[9] for r in rows)
+
+    lines = [
+        t("digest.title", "📊 Sharhlar dayjesti: {count} ta (oxirgisi #{last})").format(count=total, last=last_id),
+        t("digest.avg", "⭐ O‘rtacha: {avg}").format(avg=f"{rating_sum / rated:.2f}" if rated else "-"),
+        "",
+    ]
+    top = max(histogram) or 1
+    for stars in range(5, 0, -1):
+        count = histogram[stars - 1]
+        lines.append(f"{stars}⭐ {_bar(count, top)} {count}")
+
+    lines.append("")
+    lines.append(t("digest.branches", "📍 Filiallar:"))
+    for r in sorted(rows, key=lambda r: r[1], reverse=True):
+        avg = f"{r[3] / r[2]:.1f}" if r[2] else "-"
+        lines.append(f"• {html.escape(branch_names.get(r[0], f'#{r[0]}'))}: {r[1]} (⭐ {avg})")
+
+    if low_total:
+        lines.append("")
+        lines.append(t("digest.low", "⚠️ Past baholar (≤2⭐): {count}").format(count=low_total))
+    text = "\n".join(lines)
+    shown = 0
+    for caption in low_cards:
+        if len(text) + len(caption) + 2 > MESSAGE_LIMIT:
+            break
+        text += "\n\n" + caption
+        shown += 1
+    if low_cards and shown < low_total:
+        text += "\n\n" + t("digest.more", "… yana {count} ta").format(count=low_total - shown)
+    return text
+
+
+class DigestScheduler:
+    """Davriy job (faqat 0-worker): dayjest vaqti kelgan chatlarga umumlashma yuboradi."""
+
+    def __init__(self, sender: OutboundSender, settle_seconds: int = 30):
+        self.sender = sender
+        self.settle_seconds = settle_seconds
+
+    async def run(self) -> None:
+        async with SessionLocal() as session:
+            configs = await crud.list_digest_settings(session)
+            if not configs:
+                return
+            branch_names = {b.id: b.nameuz or b.nameru or f"#{b.id}" for b in await crud.list_branches(session)}
+            for config in configs:
+                try:
+                    await self._maybe_send(session, config, branch_names)
+                except Exception:
+                    await session.rollback()
+                    logger.exception("Digest for chat %s failed", config.chat_id)
+
+    async def _maybe_send(self, session, config, branch_names: dict[int, str]) -> None:
+        now = datetime.now(timezone.utc)
+        if config.mode == "hourly" and config.last_sent_at and now - config.last_sent_at < HOURLY_WINDOW:
+            return
+        branch_ids = (await route_table()).branches_for(config.chat_id)
+        if branch_ids == ():
+            return  # chat hech qaysi filialni olmaydi
+        rows = await crud.review_digest(
+            session, config.last_review_id, branch_ids, self.settle_seconds, low_rating=LOW_RATING
+        )
+        total = sum(r[1] for r in rows)
+        if config.mode == "batch" and total < config.batch_size:
+            return
+        if not total:
+            # Bo‘sh soat — keyingi oyna shu paytdan boshlanadi
+            await crud.advance_digest(session, config.chat_id, None)
+            return
+
+        low_ids = sorted(i for r in rows for i in (r[10] or []))
+        low_cards: list[str] = []
+        # instant_low bo‘lsa ular allaqachon alohida yuborilgan — dayjestda faqat soni
+        if low_ids and not config.instant_low:
+            reviews = await crud.get_reviews_for_notify(session, low_ids[: settings.DIGEST_LOW_MAX])
+            low_cards = [cards.review_card(r).caption for r in reviews]
+        t = I18N("uz").t
+        text = digest_text(t, rows, branch_names, low_cards, len(low_ids))
+        await self.sender.send_message(config.chat_id, text, parse_mode="HTML")
+        digests_sent.inc()
+        await crud.advance_digest(session, config.chat_id, max(r[9] for r in rows))
+        logger.info("Digest of %s reviews sent to %s", total, config.chat_id)
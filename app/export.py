@@ -0,0 +1,189 @@
+import asyncio
+import csv
+import io
+import re
+from datetime import datetime
+from tempfile import SpooledTemporaryFile
+from typing import IO, AsyncGenerator
+from zoneinfo import ZoneInfo
+
+from aiogram.types.input_file import InputFile
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import crud
+
+try:  # XLSX ixtiyoriy: openpyxl o‘rnatilmagan bo‘lsa faqat CSV ishlaydi
+    from openpyxl import Workbook
+except ImportError:  # pragma: no cover
+    Workbook = None
+
+TASHKENT = ZoneInfo("Asia/Tashkent")
+
+EXPORT_COLUMNS = [
+    "review_id",
+    "created_at",
+    "rating",
+    "text",
+    "branch_id",
+    "branch_uz",
+    "branch_ru",
+    "user_tg_id",
+    "first_name",
+    "last_name",
+    "phone",
+    "photo_file_ids",
+]
+
+FORMATS = ("csv", "xlsx")
+
+# Excel varag‘idagi qatorlar limiti (sarlavha bilan)
+XLSX_MAX_ROWS = 1_048_576
+# XLSX (siqilgan XML) qiymatlar matnidan taxminan shuncha marta kichik chiqmaydi
+XLSX_MIN_RATIO = 4
+
+# XML 1.0 da taqiqlangan boshqaruv belgilari (openpyxl.cell.cell.ILLEGAL_CHARACTERS_RE bilan bir xil)
+_ILLEGAL_CHARS_RE = re.compile(r"[\000-\010]|[\013-\014]|[\016-\037]")
+# Shu belgilar bilan boshlangan katak Excel/Sheets da formula sifatida ochiladi
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+class ExportTooBig(Exception):
+    """The export grew past ``EXPORT_MAX_UPLOAD_BYTES`` and was stopped early."""
+
+
+def xlsx_available() -> bool:
+    return Workbook is not None
+
+
+class SpooledInputFile(InputFile):
+    """Uploads an already written (possibly spooled-to-disk) file object in chunks."""
+
+    def __init__(self, file: IO[bytes], filename: str, chunk_size: int = 64 * 1024):
+        super().__init__(filename=filename, chunk_size=chunk_size)
+        self.file = file
+
+    async def read(self, bot) -> AsyncGenerator[bytes, None]:
+        self.file.seek(0)
+        while chunk := self.file.read(self.chunk_size):
+            yield chunk
+
+
+def _row_values(row) -> list:
+    (
+        review_id, created_at, rating, text,
+        branch_id, nameuz, nameru,
+        tg_id, first_name, last_name, phone, photo_ids,
+    ) = row
+    created = created_at.astimezone(TASHKENT).strftime("%Y-%m-%d %H:%M:%S") if created_at else ""
+    return [
+        review_id, created, rating if rating is not None else "", _clean(text),
+        branch_id, _clean(nameuz), _clean(nameru),
+        tg_id or "", _clean(first_name), _clean(last_name), _clean(phone), photo_ids or "",
+    ]
+
+
+def _clean(value: str | None) -> str:
+    # Nusxalangan matndagi \x0b kabi belgilar XLSX ni butunlay buzadi
+    return _ILLEGAL_CHARS_RE.sub("", value) if value else ""
+
+
+def _escape_formula(value, prefixes=_FORMULA_PREFIXES):
+    if isinstance(value, str) and value.startswith(prefixes):
+        return "'" + value
+    return value
+
+
+async def _write_csv(spool: IO[bytes], chunks, max_bytes: int) -> int:
+    count = 0
+    # BOM — Excel UTF-8 ni to‘g‘ri ochishi uchun
+    spool.write("\ufeff".encode("utf-8"))
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+    async for rows in chunks:
+        writer.writerows([_escape_formula(v) for v in _row_values(r)] for r in rows)
+        count += len(rows)
+        spool.write(buf.getvalue().encode("utf-8"))
+        buf.seek(0)
+        buf.truncate()
+        if spool.tell() > max_bytes:
+            raise ExportTooBig()
+    spool.write(buf.getvalue().encode("utf-8"))
+    return count
+
+
+async def _write_xlsx(spool: IO[bytes], chunks, max_bytes: int) -> int:
+    count = 0
+    raw_bytes = 0
+    # write_only rejimida qatorlar vaqtinchalik faylga yoziladi, xotirada qolmaydi.
+    # Varaq to‘lsa keyingisi ochiladi: reviews, reviews_2, ...
+    wb = Workbook(write_only=True)
+    ws = None
+    sheet_rows = XLSX_MAX_ROWS
+    async for rows in chunks:
+        for r in rows:
+            if sheet_rows >= XLSX_MAX_ROWS:
+                ws = wb.create_sheet("reviews" if ws is None else f"reviews_{len(wb.worksheets) + 1}")
+                ws.append(EXPORT_COLUMNS)
+                sheet_rows = 1
+            # openpyxl "=" bilan boshlangan satrni formula deb saqlaydi
+            values = [_escape_formula(v, "=") for v in _row_values(r)]
+            raw_bytes += sum(len(v) for v in values if isinstance(v, str))
+            ws.append(values)
+            sheet_rows += 1
+        count += len(rows)
+        # Fayl faqat oxirida siqiladi — hajmni qiymatlar matnidan pastki baho bilan tekshiramiz
+        if raw_bytes // XLSX_MIN_RATIO > max_bytes:
+            raise ExportTooBig()
+    if ws is None:
+        wb.create_sheet("reviews").append(EXPORT_COLUMNS)
+    # ZIP siqish og‘ir — event loop ni bloklamasligi uchun alohida oqimda
+    await asyncio.to_thread(wb.save, spool)
+    return count
+
+
+async def build_reviews_export(
+    session: AsyncSession,
+    requested_by_tg_id: int,
+    fmt: str = "csv",
+    branch_id: int | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+) -> tuple[SpooledTemporaryFile, int]:
+    """
+    Sharhlarni CSV/XLSX ko‘rinishida vaqtinchalik faylga yozadi.
+    Xotira ``EXPORT_SPOOL_MAX_BYTES`` dan oshmaydi — undan kattasi diskka o‘tadi.
+    Fayl ``EXPORT_MAX_UPLOAD_BYTES`` dan oshsa ``ExportTooBig`` — DB kursori darhol yopiladi.
+    Faylni yopish chaqiruvchining vazifasi.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == "xlsx" and not xlsx_available():
+        raise RuntimeError("openpyxl is not installed")
+
+    chunks = crud.stream_reviews_export(
+        session,
+        requested_by_tg_id=requested_by_tg_id,
+        branch_id=branch_id,
+        date_from=date_from,
+        date_to=date_to,
+        chunk_size=settings.EXPORT_CHUNK_ROWS,
+    )
+    spool = SpooledTemporaryFile(max_size=settings.EXPORT_SPOOL_MAX_BYTES, mode="w+b")
+    try:
+        if fmt == "xlsx":
+            count = await _write_xlsx(spool, chunks, settings.EXPORT_MAX_UPLOAD_BYTES)
+        else:
+            count = await _write_csv(spool, chunks, settings.EXPORT_MAX_UPLOAD_BYTES)
+    except BaseException:
+        spool.close()
+        await chunks.aclose()
+        raise
+    spool.flush()
+    return spool, count
+
+
+def spool_size(spool: IO[bytes]) -> int:
+    spool.seek(0, io.SEEK_END)
+    return spool.tell()
@@ -0,0 +1,208 @@
+"""
+Lokal sinov uchun Bot API o‘rnini bosuvchi server (telegram-bot-api stand-in).
+
+    python -m app.fake_botapi --port 8081 [--local --files-dir data/botapi]
+    BOT_API_URL=http://127.0.0.1:8081 python -m app.main
+
+Chaqiruvlar yoziladi va ``GET /_fake/calls`` orqali ko‘rinadi; foydalanuvchi
+update lari ``POST /_fake/updates`` bilan navbatga qo‘yiladi va ``getUpdates`` orqali beriladi.
+"""
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import time
+from pathlib import Path
+from typing import Any
+
+from aiohttp import web
+
+BOT_USER = {"id": 42, "is_bot": True, "first_name": "Fake", "username": "fake_review_bot"}
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, str) and value[:1] in ("{", "["):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+class FakeBotAPI:
+    def __init__(self, local: bool = False, files_dir: str | Path = "data/botapi", latency: float = 0.0):
+        self.local = local
+        self.files_dir = Path(files_dir).resolve()
+        self.latency = latency
+        self.calls: list[tuple[str, dict]] = []
+        self._updates: list[dict] = []
+        self._new_update = asyncio.Event()
+        self._update_ids = itertools.count(1)
+        self._message_ids: dict[int, itertools.count] = {}
+        self._runner: web.AppRunner | None = None
+        self.app = web.Application()
+        self.app.add_routes([
+            web.post("/bot{token}/{method}", self._method),
+            web.get("/file/bot{token}/{path:.+}", self._file),
+            web.post("/_fake/updates", self._push_updates),
+            web.get("/_fake/calls", self._get_calls),
+            web.delete("/_fake/calls", self._clear_calls),
+        ])
+
+    # --- Server ---
+    async def start(self, host: str = "127.0.0.1", port: int = 8081) -> str:
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        return f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def __aenter__(self) -> "FakeBotAPI":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    def push_update(self, update: dict) -> None:
+        update.setdefault("update_id", next(self._update_ids))
+        self._updates.append(update)
+        self._new_update.set()
+
+    def methods(self) -> list[str]:
+        return [name for name, _ in self.calls]
+
+    # --- Helpers ---
+    def _message(self, chat_id: int | str, **fields: Any) -> dict:
+        chat_id = int(chat_id)
+        ids = self._message_ids.setdefault(chat_id, itertools.count(1))
+        chat_type = "private" if chat_id > 0 else "supergroup"
+        return {
+            "message_id": fields.pop("message_id", None) or next(ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": chat_type},
+            "from": BOT_USER,
+            **fields,
+        }
+
+    @staticmethod
+    def _photo(file_id: str) -> list[dict]:
+        unique = hashlib.md5(file_id.encode()).hexdigest()[:16]
+        return [{"file_id": file_id, "file_unique_id": unique, "width": 800, "height": 600, "file_size": 1024}]
+
+    @staticmethod
+    def _file_bytes(file_unique_id: str) -> bytes:
+        return hashlib.sha256(file_unique_id.encode()).digest() * 32
+
+    def _get_file(self, file_id: str) -> dict:
+        unique = hashlib.md5(file_id.encode()).hexdigest()[:16]
+        relative = f"photos/{unique}.jpg"
+        result = {"file_id": file_id, "file_unique_id": unique, "file_size": 1024, "file_path": relative}
+        if self.local:
+            # telegram-bot-api --local: getFile absolyut yo‘l qaytaradi, fayl diskda bo‘ladi
+            path = self.files_dir / relative
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if not path.exists():
+                path.write_bytes(self._file_bytes(unique))
+            result["file_path"] = str(path)
+        return result
+
+    def _media_id(self, value: Any) -> str:
+        return value if isinstance(value, str) else getattr(value, "filename", None) or "uploaded"
+
+    def _result(self, method: str, p: dict) -> Any:
+        if method == "getMe":
+            return BOT_USER
+        if method == "getUpdates":
+            offset = int(p.get("offset") or 0)
+            return [u for u in self._updates if u["update_id"] >= offset]
+        if method == "sendMessage":
+            return self._message(p["chat_id"], text=p.get("text", ""))
+        if method in ("editMessageText", "editMessageReplyMarkup"):
+            if "inline_message_id" in p:
+                return True
+            return self._message(p["chat_id"], message_id=int(p["message_id"]), text=p.get("text", ""))
+        if method == "sendPhoto":
+            return self._message(p["chat_id"], photo=self._photo(self._media_id(p.get("photo"))), caption=p.get("caption"))
+        if method == "sendDocument":
+            doc_id = self._media_id(p.get("document"))
+            return self._message(p["chat_id"], document={"file_id": doc_id, "file_unique_id": doc_id[:16]})
+        if method == "sendMediaGroup":
+            return [
+                self._message(p["chat_id"], photo=self._photo(self._media_id(m.get("media"))))
+                for m in p.get("media", [])
+            ]
+        if method == "getFile":
+            return self._get_file(p["file_id"])
+        if method == "getMyCommands":
+            return []
+        # answerCallbackQuery, deleteMessage, setMyCommands, deleteWebhook, ...
+        return True
+
+    # --- Handlers ---
+    async def _method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = {k: _decode(v) for k, v in (await request.post()).items()}
+        self.calls.append((method, params))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == "getUpdates" and not self._result(method, params):
+            self._new_update.clear()
+            timeout = float(params.get("timeout") or 0)
+            try:
+                await asyncio.wait_for(self._new_update.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        if method == "getUpdates":
+            # Tasdiqlangan (offset dan kichik) update lar navbatdan olib tashlanadi
+            offset = int(params.get("offset") or 0)
+            self._updates = [u for u in self._updates if u["update_id"] >= offset]
+        return web.json_response({"ok": True, "result": self._result(method, params)})
+
+    async def _file(self, request: web.Request) -> web.Response:
+        unique = Path(request.match_info["path"]).stem
+        return web.Response(body=self._file_bytes(unique))
+
+    async def _push_updates(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        for update in payload if isinstance(payload, list) else [payload]:
+            self.push_update(update)
+        return web.json_response({"ok": True})
+
+    async def _get_calls(self, request: web.Request) -> web.Response:
+        return web.json_response([{"method": m, "params": p} for m, p in self.calls], dumps=lambda o: json.dumps(o, default=str))
+
+    async def _clear_calls(self, request: web.Request) -> web.Response:
+        self.calls.clear()
+        return web.json_response({"ok": True})
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    api = FakeBotAPI(local=args.local, files_dir=args.files_dir, latency=args.latency)
+    url = await api.start(args.host, args.port)
+    print(f"Fake Bot API listening on {url} (local={args.local})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await api.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--local", action="store_true", help="telegram-bot-api --local rejimini taqlid qilish")
+    parser.add_argument("--files-dir", default="data/botapi")
+    parser.add_argument("--latency", type=float, default=0.0, help="har bir so‘rovga qo‘shiladigan kechikish (s)")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
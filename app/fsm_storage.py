@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+entries_gauge = metrics.gauge("fsm_entries", "FSM records held in memory")
+bytes_gauge = metrics.gauge("fsm_bytes", "Approximate size of FSM records")
+
+
+def approx_size(value: Any) -> int:
+    """FSM ma'lumotining taxminiy hajmi (bayt) — aniq emas, limit uchun yetarli."""
+    if isinstance(value, dict):
+        return 64 + sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return 56 + sum(approx_size(v) for v in value)
+    if isinstance(value, str):
+        return 49 + len(value)
+    return 32
+
+
+@dataclass
+class _Record:
+    state: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+    size: int = 0
+    expires_at: float = 0.0
+
+
+class TTLMemoryStorage(BaseStorage):
+    """
+    ``MemoryStorage`` o‘rniga: har bir yozuv oxirgi faollikdan ``ttl`` soniya yashaydi,
+    yozuvlar soni va taxminiy hajmi cheklangan (eng eski ishlatilgani chiqariladi — LRU).
+
+    ``MemoryStorage`` dan farqli o‘laroq o‘qish yozuv yaratmaydi: holati yo‘q foydalanuvchilar
+    xotira egallamaydi, ``state.clear()`` esa yozuvni butunlay o‘chiradi.
+    Yozuvlar oxirgi faollik tartibida turadi, shuning uchun sweeper faqat boshidan o‘qiydi.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 3600.0,
+        max_entries: int = 100_000,
+        max_bytes: int = 64 * 1024 * 1024,
+        sweep_interval: float = 60.0,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._records: OrderedDict[StorageKey, _Record] = OrderedDict()
+        self._bytes = 0
+        self._active: dict[str, metrics.Gauge] = {}
+        self._sweeper: asyncio.Task | None = None
+
+    # --- Lifecycle ---
+    def start(self) -> None:
+        if self._sweeper is None and self.sweep_interval > 0:
+            self._sweeper = asyncio.create_task(self._sweep_loop(), name="fsm:sweeper")
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+    # --- BaseStorage ---
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        record = self._records.get(key)
+        if record is None:
+            if state is None:
+                return
+            record = self._add(key)
+        self._count_state(record.state, -1)
+        record.state = state
+        self._count_state(state, 1)
+        self._touched(key, record)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        record = self._lookup(key)
+        return record.state if record is not None else None
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        record = self._records.get(key)
+        if record is None:
+            if not data:
+                return
+            record = self._add(key)
+        record.data = data.copy()
+        size = approx_size(record.data)
+        self._bytes += size - record.size
+        record.size = size
+        self._touched(key, record)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        record = self._lookup(key)
+        return record.data.copy() if record is not None else {}
+
+    # --- Internals ---
+    def _add(self, key: StorageKey) -> _Record:
+        record = self._records[key] = _Record()
+        return record
+
+    def _lookup(self, key: StorageKey) -> _Record | None:
+        record = self._records.get(key)
+        if record is None:
+            return None
+        now = time.monotonic()
+        if record.expires_at <= now:
+            self._evict(key, "ttl")
+            return None
+        # Har bir update avval holatni o‘qiydi — bu foydalanuvchi faolligi hisoblanadi
+        record.expires_at = now + self.ttl
+        self._records.move_to_end(key)
+        return record
+
+    def _touched(self, key: StorageKey, record: _Record) -> None:
+        if record.state is None and not record.data:
+            self._remove(key)
+            return
+        record.expires_at = time.monotonic() + self.ttl
+        self._records.move_to_end(key)
+        while self._records and (len(self._records) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._records))
+            if oldest == key:
+                break  # joriy yozuvning o‘zi limitdan katta — baribir saqlaymiz
+            self._evict(oldest, "lru")
+        self._update_gauges()
+
+    def _remove(self, key: StorageKey) -> _Record | None:
+        record = self._records.pop(key, None)
+        if record is not None:
+            self._bytes -= record.size
+            self._count_state(record.state, -1)
+            self._update_gauges()
+        return record
+
+    def _evict(self, key: StorageKey, reason: str) -> None:
+        record = self._remove(key)
+        if record is not None:
+            metrics.counter("fsm_evictions_total", "FSM records dropped", reason=reason).inc()
+            logger.debug("FSM %s evicted (%s, state=%s)", key.user_id, reason, record.state)
+
+    def _count_state(self, state: str | None, delta: int) -> None:
+        if state is None:
+            return
+        gauge = self._active.get(state)
+        if gauge is None:
+            gauge = self._active[state] = metrics.gauge(
+                "fsm_active_states", "Users currently in each FSM state", state=state
+            )
+        gauge.inc(delta)
+
+    def _update_gauges(self) -> None:
+        entries_gauge.set(len(self._records))
+        bytes_gauge.set(self._bytes)
+
+    def sweep(self) -> int:
+        """Muddati o‘tgan yozuvlarni o‘chiradi; o‘chirilganlar sonini qaytaradi."""
+        now = time.monotonic()
+        evicted = 0
+        while self._records:
+            key, record = next(iter(self._records.items()))
+            if record.expires_at > now:
+                break
+            self._evict(key, "ttl")
+            evicted += 1
+        return evicted
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            evicted = self.sweep()
+            if evicted:
+                logger.info("FSM sweeper: %s expired conversations dropped", evicted)
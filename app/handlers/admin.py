@@ -1,15 +1,30 @@
+import html
 from aiogram import Router, F
+from aiogram.filters import Command, CommandObject
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from sqlalchemy.exc import IntegrityError
 from zoneinfo import ZoneInfo
+from datetime import date, datetime, time, timedelta
+from app.callbacks import CallbackRoutes
 from app.db import crud
-from app.i18n import I18N
+from app.db.diagnostics import slowlog
+from app import cards, export, metrics
+from app.broadcast import Broadcaster, progress_kb, progress_text
+from app.deeplinks import review_link
+from app.i18n import I18N, locale_of
+from app.keyboards import registry
 from app.config import settings
 from aiogram.types import InputMediaPhoto
+from aiogram.exceptions import TelegramBadRequest
+from app.photo_archive import blob_paths, photo_sources
+from app.sender import OutboundSender
 router = Router()
+callbacks = CallbackRoutes(router)
+
+TASHKENT = ZoneInfo("Asia/Tashkent")
 
 
 # --- States ---
@@ -20,6 +35,8 @@ class AdminStates(StatesGroup):
     br_edit_name_ru = State()
     sa_add_admin = State()  # super admin: add admin by tg_id
     sa_remove_admin = State()  # super admin: remove admin by tg_id
+    re_export_range = State()  # export: custom date range input
+    sa_broadcast_text = State()  # super admin: broadcast matni
 
 
 # --- Helpers ---
@@ -36,7 +53,7 @@ def branch_label(branch) -> str:
     return branch.nameuz or branch.nameru or f"#{branch.id}"
 
 
-def edit_skip_kb(t, field: str):
+def _build_edit_skip_kb(t, field: str):
     kb = InlineKeyboardBuilder()
     kb.button(text=t("admin.btn.skip", "O‘tkazib yuborish"), callback_data=f"adm:br:skip:{field}")
     kb.button(text=t("common.kb.back", "⬅ Orqaga"), callback_data="adm:br")
@@ -56,6 +73,13 @@ EDIT_PROMPTS = {
 }
 
 
+registry.keyboard("admin.edit_skip", field=tuple(EDIT_PROMPTS))(_build_edit_skip_kb)
+
+
+def edit_skip_kb(t, field: str):
+    return registry.get("admin.edit_skip", t, field=field)
+
+
 FIELD_ORDER = [
     ("nameuz", AdminStates.br_edit_name_uz),
     ("nameru", AdminStates.br_edit_name_ru),
@@ -173,7 +197,8 @@ def is_super_admin_env(tg_id: int) -> bool:
     return tg_id in settings.SUPER_ADMINS
 
 
-def admin_main_kb(t):
+@registry.keyboard("admin.admin_main")
+def _build_admin_main_kb(t):
     kb = InlineKeyboardBuilder()
     kb.button(text=t("admin.kb.branches", "🏢 Filiallar"), callback_data="adm:br")
     kb.button(text=t("admin.kb.users", "👥 Foydalanuvchilar"), callback_data="adm:us")
@@ -182,25 +207,42 @@ def admin_main_kb(t):
     return kb.as_markup()
 
 
-def branches_menu_kb(t):
+def admin_main_kb(t):
+    return registry.get("admin.admin_main", t)
+
+
+@registry.keyboard("admin.branches_menu")
+def _build_branches_menu_kb(t):
     kb = InlineKeyboardBuilder()
     kb.button(text=t("admin.kb.branches.add", "➕ Filial qo‘shish"), callback_data="adm:br:add")
     kb.button(text=t("admin.kb.branches.edit", "✏️ Filialni tahrirlash"), callback_data="adm:br:edit")
     kb.button(text=t("admin.kb.branches.delete", "🗑 Filialni o‘chirish"), callback_data="adm:br:del")
     kb.button(text=t("admin.kb.branches.stats", "📊 Filial statistikasi"), callback_data="adm:br:stats")
+    kb.button(text=t("admin.kb.branches.trends", "📈 Trendlar"), callback_data="adm:br:trends")
+    kb.button(text=t("admin.kb.branches.links", "🔗 QR havolalar"), callback_data="adm:br:links")
     kb.button(text=t("common.kb.back", "⬅ Orqaga"), callback_data="adm:back")
     kb.adjust(1)
     return kb.as_markup()
 
 
-def back_to_branches_kb(t):
+def branches_menu_kb(t):
+    return registry.get("admin.branches_menu", t)
+
+
+@registry.keyboard("admin.back_to_branches")
+def _build_back_to_branches_kb(t):
     kb = InlineKeyboardBuilder()
     kb.button(text=t("common.kb.back", "⬅ Orqaga"), callback_data="adm:br")
     kb.adjust(1)
     return kb.as_markup()
 
 
-def users_menu_kb(t):
+def back_to_branches_kb(t):
+    return registry.get("admin.back_to_branches", t)
+
+
+@registry.keyboard("admin.users_menu")
+def _build_users_menu_kb(t):
     kb = InlineKeyboardBuilder()
     kb.button(text=t("admin.kb.users.list", "📃 Foydalanuvchilar ro‘yxati"), callback_data="adm:us:list")
     kb.button(text=t("common.kb.back", "⬅ Orqaga"), callback_data="adm:back")
@@ -208,25 +250,67 @@ def users_menu_kb(t):
     return kb.as_markup()
 
 
-def reviews_menu_kb(t):
+def users_menu_kb(t):
+    return registry.get("admin.users_menu", t)
+
+
+@registry.keyboard("admin.reviews_menu")
+def _build_reviews_menu_kb(t):
     kb = InlineKeyboardBuilder()
     kb.button(text=t("admin.kb.reviews.list", "📃 Sharhlar ro‘yxati"), callback_data="adm:re:list")
     kb.button(text=t("admin.kb.reviews.delete", "🗑 Sharhni o‘chirish"), callback_data="adm:re:del")
+    kb.button(text=t("admin.kb.reviews.export", "📤 Eksport"), callback_data="adm:re:exp")
     kb.button(text=t("common.kb.back", "⬅ Orqaga"), callback_data="adm:back")
     kb.adjust(1)
     return kb.as_markup()
 
 
-def sa_menu_kb(t):
+def reviews_menu_kb(t):
+    return registry.get("admin.reviews_menu", t)
+
+
+@registry.keyboard("admin.sa_menu")
+def _build_sa_menu_kb(t):
     kb = InlineKeyboardBuilder()
     kb.button(text=t("admin.kb.admins", "🛡 Administratorlar"), callback_data="sa:list")
     kb.button(text=t("admin.kb.admins.add", "➕ Admin qo‘shish"), callback_data="sa:add")
     kb.button(text=t("admin.kb.admins.remove", "🗑 Adminni o‘chirish"), callback_data="sa:remove")
+    kb.button(text=t("admin.kb.broadcast", "📣 Xabarnoma"), callback_data="sa:bc")
     kb.button(text=t("common.kb.back", "⬅ Orqaga"), callback_data="adm:back")
     kb.adjust(1)
     return kb.as_markup()
 
 
+def sa_menu_kb(t):
+    return registry.get("admin.sa_menu", t)
+
+
+@registry.keyboard("admin.broadcast_menu")
+def _build_broadcast_menu_kb(t):
+    kb = InlineKeyboardBuilder()
+    kb.button(text=t("admin.kb.broadcast.new", "✍️ Yangi xabarnoma"), callback_data="sa:bc:new")
+    kb.button(text=t("common.kb.back", "⬅ Orqaga"), callback_data="sa:menu")
+    kb.adjust(1)
+    return kb.as_markup()
+
+
+def broadcast_menu_kb(t):
+    return registry.get("admin.broadcast_menu", t)
+
+
+@registry.keyboard("admin.broadcast_confirm")
+def _build_broadcast_confirm_kb(t):
+    kb = InlineKeyboardBuilder()
+    kb.button(text=t("admin.kb.broadcast.send", "🚀 Yuborish"), callback_data="sa:bc:go")
+    kb.button(text=t("admin.kb.broadcast.cancel", "✖️ Bekor qilish"), callback_data="sa:bc")
+    kb.adjust(2)
+    return kb.as_markup()
+
+
+def broadcast_confirm_kb(t):
+    return registry.get("admin.broadcast_confirm", t)
+
+
 # --- Entry ---
 @router.message(F.text == "/admin_sardoba")
 async def admin_panel(msg: Message, session):
@@ -249,7 +333,7 @@ async def super_admin_panel(msg: Message, session):
     await msg.answer(t("admin.super.panel", "Super Admin Panel"), reply_markup=sa_menu_kb(t))
 
 
-@router.callback_query(F.data == "sa:add")
+@callbacks.route("sa:add")
 async def sa_add_admin_ask(cb: CallbackQuery, state: FSMContext, session):
     if not is_super_admin_env(cb.from_user.id):
         return
@@ -280,7 +364,7 @@ async def sa_add_admin_do(msg: Message, state: FSMContext, session):
     await msg.answer(t("admin.super.panel", "Super Admin Panel"), reply_markup=sa_menu_kb(t))
 
 
-@router.callback_query(F.data == "sa:list")
+@callbacks.route("sa:list")
 async def sa_list_admins(cb: CallbackQuery, session):
     if not is_super_admin_env(cb.from_user.id):
         return
@@ -295,7 +379,7 @@ async def sa_list_admins(cb: CallbackQuery, session):
     await cb.message.edit_text("\n".join(lines), reply_markup=sa_menu_kb(t))
 
 
-@router.callback_query(F.data == "sa:remove")
+@callbacks.route("sa:remove")
 async def sa_remove_admin_ask(cb: CallbackQuery, state: FSMContext, session):
     if not is_super_admin_env(cb.from_user.id):
         return
@@ -325,7 +409,96 @@ async def sa_remove_admin_do(msg: Message, state: FSMContext, session):
     await msg.answer(t("admin.super.panel", "Super Admin Panel"), reply_markup=sa_menu_kb(t))
 
 
-@router.callback_query(F.data == "adm:back")
+@callbacks.route("sa:menu")
+async def sa_menu(cb: CallbackQuery, state: FSMContext, session):
+    if not is_super_admin_env(cb.from_user.id):
+        return
+    await state.clear()
+    t = await get_t(session, cb.from_user.id)
+    await cb.message.edit_text(t("admin.super.panel", "Super Admin Panel"), reply_markup=sa_menu_kb(t))
+
+
+# --- Broadcasts ---
+@callbacks.route("sa:bc")
+async def broadcast_menu(cb: CallbackQuery, state: FSMContext, session):
+    if not is_super_admin_env(cb.from_user.id):
+        return
+    await state.clear()
+    t = await get_t(session, cb.from_user.id)
+    lines = [t("admin.broadcast.title", "📣 Xabarnomalar")]
+    for b in await crud.list_broadcasts(session):
+        status = t(f"admin.broadcast.status.{b.status}", b.status)
+        lines.append(f"#{b.id} | {status} | ✅ {b.sent} 🚫 {b.blocked} ⚠️ {b.failed} / {b.total}")
+    await cb.message.edit_text("\n".join(lines), reply_markup=broadcast_menu_kb(t))
+
+
+@callbacks.route("sa:bc:new")
+async def broadcast_new(cb: CallbackQuery, state: FSMContext, session):
+    if not is_super_admin_env(cb.from_user.id):
+        return
+    t = await get_t(session, cb.from_user.id)
+    await state.set_state(AdminStates.sa_broadcast_text)
+    await cb.message.edit_text(
+        t("admin.broadcast.prompt", "Barcha foydalanuvchilarga yuboriladigan xabar matnini yozing:")
+    )
+
+
+@router.message(AdminStates.sa_broadcast_text)
+async def broadcast_text_input(msg: Message, state: FSMContext, session):
+    if not is_super_admin_env(msg.from_user.id):
+        await state.clear()
+        return
+    t = await get_t(session, msg.from_user.id)
+    if not msg.text:
+        await msg.answer(t("admin.broadcast.prompt", "Barcha foydalanuvchilarga yuboriladigan xabar matnini yozing:"))
+        return
+    # Formatlash (qalin, havola va h.k.) HTML sifatida saqlanadi
+    await state.update_data(broadcast_text=msg.html_text)
+    audience = await crud.count_broadcast_audience(session)
+    header = t("admin.broadcast.confirm", "Quyidagi xabar {count} ta foydalanuvchiga yuboriladi:").format(
+        count=audience
+    )
+    await msg.answer(f"{header}\n\n{msg.html_text}", reply_markup=broadcast_confirm_kb(t))
+
+
+@callbacks.route("sa:bc:go")
+async def broadcast_start(
+    cb: CallbackQuery, state: FSMContext, session, broadcaster: Broadcaster | None = None
+):
+    if not is_super_admin_env(cb.from_user.id):
+        return
+    t = await get_t(session, cb.from_user.id)
+    text = (await state.get_data()).get("broadcast_text")
+    await state.clear()
+    if not text:
+        await cb.message.edit_text(t("error", "Xatolik yuz berdi. Qayta urinib ko‘ring."), reply_markup=sa_menu_kb(t))
+        return
+    broadcast = await crud.create_broadcast(session, created_by=cb.from_user.id, text=text)
+    await cb.message.edit_text(progress_text(t, broadcast), reply_markup=progress_kb(t, broadcast))
+    await crud.set_broadcast_progress_message(
+        session, broadcast.id, cb.message.chat.id, cb.message.message_id
+    )
+    # Boshqa workerda bo‘lsak, 0-worker ``resume`` job i orqali ilib oladi
+    if broadcaster is not None:
+        broadcaster.start(broadcast.id)
+
+
+@callbacks.route("sa:bc:stop:{broadcast_id:int}")
+async def broadcast_stop(cb: CallbackQuery, session, broadcast_id: int):
+    if not is_super_admin_env(cb.from_user.id):
+        return
+    t = await get_t(session, cb.from_user.id)
+    await crud.finish_broadcast(session, broadcast_id, "cancelled")
+    broadcast = await crud.get_broadcast(session, broadcast_id)
+    if broadcast is None:
+        return
+    try:
+        await cb.message.edit_text(progress_text(t, broadcast), reply_markup=progress_kb(t, broadcast))
+    except TelegramBadRequest:
+        pass
+
+
+@callbacks.route("adm:back")
 async def admin_back(cb: CallbackQuery, session):
     if not await is_admin(session, cb.from_user.id):
         return
@@ -334,7 +507,7 @@ async def admin_back(cb: CallbackQuery, session):
 
 
 # --- Branches ---
-@router.callback_query(F.data == "adm:br")
+@callbacks.route("adm:br")
 async def branches_menu(cb: CallbackQuery, session):
     if not await is_admin(session, cb.from_user.id):
         return
@@ -342,7 +515,7 @@ async def branches_menu(cb: CallbackQuery, session):
     await cb.message.edit_text(t("admin.branches.title", "🏢 Filiallar"), reply_markup=branches_menu_kb(t))
 
 
-@router.callback_query(F.data == "adm:br:stats")
+@callbacks.route("adm:br:stats")
 async def branches_stats(cb: CallbackQuery, session):
     if not await is_admin(session, cb.from_user.id):
         return
@@ -359,7 +532,60 @@ async def branches_stats(cb: CallbackQuery, session):
     await cb.message.edit_text("\n".join(lines), reply_markup=branches_menu_kb(t))
 
 
-@router.callback_query(F.data == "adm:br:add")
+@callbacks.route("adm:br:links")
+async def branches_links(cb: CallbackQuery, session):
+    if not await is_admin(session, cb.from_user.id):
+        return
+    t = await get_t(session, cb.from_user.id)
+    branches = await crud.list_branches(session)
+    if not branches:
+        await cb.message.edit_text(t("admin.branch.empty", "Filiallar yo‘q."), reply_markup=branches_menu_kb(t))
+        return
+    username = (await cb.bot.me()).username
+    lines = [t("admin.links.header", "🔗 Filiallar uchun QR havolalar")]
+    for b in branches:
+        lines.append("")
+        lines.append(f"🏢 {html.escape(branch_label(b))}")
+        lines.append(f"<code>{review_link(username, b.id)}</code>")
+    lines.append("")
+    lines.append(t("admin.links.hint", "Reyting bilan ochish uchun havola oxiriga _r1 … _r5 qo‘shing (masalan, _r5)."))
+    await cb.message.edit_text("\n".join(lines), reply_markup=branches_menu_kb(t))
+
+
+def _fmt_delta(value, suffix: str = "") -> str:
+    if value is None:
+        return "—"
+    sign = "+" if value > 0 else ""
+    return f"{sign}{value}{suffix}"
+
+
+@callbacks.route("adm:br:trends")
+async def branches_trends(cb: CallbackQuery, session):
+    if not await is_admin(session, cb.from_user.id):
+        return
+    t = await get_t(session, cb.from_user.id)
+    trends = await crud.branch_trends(session, today=datetime.now(TASHKENT).date())
+    if not trends:
+        await cb.message.edit_text(t("admin.stats.empty", "Hozircha statistika yo‘q."), reply_markup=branches_menu_kb(t))
+        return
+    days = t("admin.export.period.days", "kun")
+    reviews_word = t("admin.stats.reviews", "sharh")
+    lines = [t("admin.trends.header", "📈 Filial trendlari")]
+    for item in trends:
+        lines.append("")
+        lines.append(f"🏢 {item['display_name']}")
+        for n in crud.TREND_WINDOWS:
+            w = item[n]
+            avg = w["avg_rating"] if w["avg_rating"] is not None else "-"
+            lines.append(f"  {n} {days}: {w['reviews_count']} {reviews_word}, ⭐ {avg}")
+        lines.append(
+            f"  {t('admin.trends.wow', 'Haftalik o‘zgarish')}: "
+            f"{_fmt_delta(item['wow_count'])} {reviews_word}, ⭐ {_fmt_delta(item['wow_avg'])}"
+        )
+    await cb.message.edit_text("\n".join(lines), reply_markup=branches_menu_kb(t))
+
+
+@callbacks.route("adm:br:add")
 async def branch_add_start(cb: CallbackQuery, state: FSMContext, session):
     if not await is_admin(session, cb.from_user.id):
         return
@@ -429,7 +655,7 @@ async def branch_add_name_ru(msg: Message, state: FSMContext, session):
     await msg.answer(t("admin.branches.title", "🏢 Filiallar"), reply_markup=branches_menu_kb(t))
 
 
-@router.callback_query(F.data == "adm:br:edit")
+@callbacks.route("adm:br:edit")
 async def branch_edit_list(cb: CallbackQuery, session):
     if not await is_admin(session, cb.from_user.id):
         return
@@ -446,12 +672,11 @@ async def branch_edit_list(cb: CallbackQuery, session):
     await cb.message.edit_text(t("admin.kb.branches.edit", "✏️ Filialni tahrirlash"), reply_markup=kb.as_markup())
 
 
-@router.callback_query(F.data.startswith("adm:br:edit:"))
-async def branch_edit_start(cb: CallbackQuery, state: FSMContext, session):
+@callbacks.route("adm:br:edit:{branch_id:int}")
+async def branch_edit_start(cb: CallbackQuery, state: FSMContext, session, branch_id: int):
     if not await is_admin(session, cb.from_user.id):
         return
     t = await get_t(session, cb.from_user.id)
-    branch_id = int(cb.data.split(":")[3])
     await state.update_data(
         branch_id=branch_id,
         edit_nameuz=None,
@@ -481,23 +706,21 @@ async def branch_edit_name_ru_input(msg: Message, state: FSMContext, session):
     await _advance_edit_flow(msg, state, session, msg.from_user.id, t, "nameru", value)
 
 
-@router.callback_query(F.data.startswith("adm:br:skip:"))
-async def branch_edit_skip(cb: CallbackQuery, state: FSMContext, session):
+@callbacks.route("adm:br:skip:{field}")
+async def branch_edit_skip(cb: CallbackQuery, state: FSMContext, session, field: str):
     if not await is_admin(session, cb.from_user.id):
         await state.clear()
         return
-    parts = cb.data.split(":")
-    field = parts[3] if len(parts) > 3 else None
     current_state = await state.get_state()
     expected_field = STATE_TO_FIELD.get(current_state)
-    if field is None or expected_field != field:
+    if expected_field != field:
         await cb.answer("⏳")
         return
     t = await get_t(session, cb.from_user.id)
     await _advance_edit_flow(cb, state, session, cb.from_user.id, t, field, None)
 
 
-@router.callback_query(F.data == "adm:br:del")
+@callbacks.route("adm:br:del")
 async def branch_delete_list(cb: CallbackQuery, session):
     if not await is_admin(session, cb.from_user.id):
         return
@@ -514,12 +737,11 @@ async def branch_delete_list(cb: CallbackQuery, session):
     await cb.message.edit_text(t("admin.kb.branches.delete", "🗑 Filialni o‘chirish"), reply_markup=kb.as_markup())
 
 
-@router.callback_query(F.data.startswith("adm:br:del:"))
-async def branch_delete_do(cb: CallbackQuery, session):
+@callbacks.route("adm:br:del:{branch_id:int}")
+async def branch_delete_do(cb: CallbackQuery, session, branch_id: int):
     if not await is_admin(session, cb.from_user.id):
         return
     t = await get_t(session, cb.from_user.id)
-    branch_id = int(cb.data.split(":")[3])
     ok = await crud.delete_branch_admin(session, requested_by_tg_id=cb.from_user.id, branch_id=branch_id)
     if not ok:
         await cb.answer(t("admin.branch.delete.not_found", "Topilmadi"), show_alert=True)
@@ -536,14 +758,14 @@ async def branch_delete_do(cb: CallbackQuery, session):
 
 
 # --- Users ---
-@router.callback_query(F.data == "adm:us")
+@callbacks.route("adm:us")
 async def users_menu(cb: CallbackQuery, session):
     if not await is_admin(session, cb.from_user.id):
         return
     t = await get_t(session, cb.from_user.id)
     await cb.message.edit_text(t("admin.users.title", "👥 Foydalanuvchilar"), reply_markup=users_menu_kb(t))
 
-@router.callback_query(F.data == "adm:us:list")
+@callbacks.route("adm:us:list")
 async def users_list(cb: CallbackQuery, session):
     if not await is_admin(session, cb.from_user.id):
         return
@@ -567,28 +789,127 @@ async def users_list(cb: CallbackQuery, session):
         parse_mode="HTML"   # ✅ moved parse_mode here
     )
 # --- Groups ---
-@router.message(F.text == "/setgroup")
-async def set_group(msg: Message, session):
+SETGROUP_ALL = {"", "all", "hammasi", "все"}
+SETGROUP_OFF = {"off", "-", "o‘chirish", "выкл"}
+
+
+def _parse_setgroup_args(raw: str | None) -> list[int] | None:
+    """``all``/bo‘sh → None (barcha filiallar), ``off`` → [], aks holda filial ID lari."""
+    arg = (raw or "").strip().lower()
+    if arg in SETGROUP_ALL:
+        return None
+    if arg in SETGROUP_OFF:
+        return []
+    return [int(x) for x in arg.replace(",", " ").split()]
+
+
+@router.message(Command("setgroup"))
+async def set_group(msg: Message, command: CommandObject, session):
+    t = await get_t(session, msg.from_user.id)
     # Faqat guruhda ishlasin
     if msg.chat.type not in ("group", "supergroup"):
-        await msg.answer("❗ Bu buyruqni faqat guruhda yuboring")
+        await msg.answer(t("admin.setgroup.only_group", "❗ Bu buyruqni faqat guruhda yuboring"))
+        return
+    # Sharhlar (telefon raqamlari bilan) qayerga borishini faqat super admin belgilaydi
+    if not is_super_admin_env(msg.from_user.id):
+        await msg.answer(t("admin.not_superadmin", "Siz super admin emassiz."))
+        return
+
+    try:
+        branch_ids = _parse_setgroup_args(command.args)
+        await crud.set_chat_routes(session, msg.chat.id, branch_ids, created_by=msg.from_user.id)
+    except ValueError:
+        await session.rollback()
+        await msg.answer(
+            t("admin.setgroup.usage", "Foydalanish: /setgroup all | /setgroup 1,3 | /setgroup off"),
+            parse_mode=None,
+        )
+        return
+
+    if branch_ids is None:
+        await msg.answer(t("admin.setgroup.all", "✅ Guruh barcha filiallar sharhlarini oladi"))
+    elif not branch_ids:
+        await msg.answer(t("admin.setgroup.off", "🔕 Guruhga sharhlar yuborilmaydi"))
+    else:
+        names = [branch_label(b) for b in await crud.list_branches(session) if b.id in branch_ids]
+        await msg.answer(
+            t("admin.setgroup.branches", "✅ Guruh quyidagi filiallar sharhlarini oladi:")
+            + "\n" + "\n".join(f"• {html.escape(n)}" for n in names)
+        )
+
+
+# --- Digests ---
+DIGEST_HOURLY = {"hourly", "soatlik", "час"}
+# Past baholarni ham faqat dayjestda yuborish
+DIGEST_QUIET = {"quiet", "jim", "тихо"}
+DIGEST_MIN_BATCH = 2
+
+
+def _parse_digest_args(raw: str | None) -> tuple[str | None, int, bool]:
+    """``off`` → (None, ..), ``hourly [quiet]`` yoki ``N [quiet]`` → (rejim, batch_size, instant_low)."""
+    args = (raw or "").strip().lower().split()
+    if not args:
+        raise ValueError("mode required")
+    mode_arg, flags = args[0], set(args[1:])
+    if flags - DIGEST_QUIET:
+        raise ValueError(f"unknown flags: {flags}")
+    instant_low = not flags
+    if mode_arg in SETGROUP_OFF:
+        return None, 0, True
+    if mode_arg in DIGEST_HOURLY:
+        return "hourly", 0, instant_low
+    batch_size = int(mode_arg)
+    if batch_size < DIGEST_MIN_BATCH:
+        raise ValueError("batch too small")
+    return "batch", batch_size, instant_low
+
+
+@router.message(Command("digest"))
+async def set_digest(msg: Message, command: CommandObject, session):
+    t = await get_t(session, msg.from_user.id)
+    if msg.chat.type not in ("group", "supergroup"):
+        await msg.answer(t("admin.setgroup.only_group", "❗ Bu buyruqni faqat guruhda yuboring"))
+        return
+    if not is_super_admin_env(msg.from_user.id):
+        await msg.answer(t("admin.not_superadmin", "Siz super admin emassiz."))
         return
 
     try:
-        await crud.set_admin_group(session, msg.from_user.id, msg.chat.id)
-        await msg.answer("✅ Guruh muvaffaqiyatli bog‘landi")
+        mode, batch_size, instant_low = _parse_digest_args(command.args)
     except ValueError:
-        await msg.answer("⛔ Siz superadmin emassiz")
+        await msg.answer(
+            t(
+                "admin.digest.usage",
+                "Foydalanish: /digest hourly | /digest 20 | /digest off "
+                "(oxiriga quiet — past baholar ham faqat dayjestda)",
+            ),
+            parse_mode=None,
+        )
+        return
+    await crud.set_digest_setting(
+        session, msg.chat.id, mode, updated_by=msg.from_user.id, batch_size=batch_size or 20, instant_low=instant_low
+    )
+
+    if mode is None:
+        text = t("admin.digest.off", "🔔 Har bir sharh alohida yuboriladi")
+    elif mode == "hourly":
+        text = t("admin.digest.hourly", "🕐 Sharhlar soatiga bir marta dayjest bilan yuboriladi")
+    else:
+        text = t("admin.digest.batch", "📦 Har {n} ta sharhga bitta dayjest yuboriladi").format(n=batch_size)
+    if mode is not None and instant_low:
+        text += "\n" + t("admin.digest.instant_low", "⚠️ Past baholar (≤2⭐) darhol yuboriladi")
+    await msg.answer(text)
+
 # --- Reviews ---
-@router.callback_query(F.data == "adm:re")
+@callbacks.route("adm:re")
 async def reviews_menu(cb: CallbackQuery, session):
     if not await is_admin(session, cb.from_user.id):
         return
     t = await get_t(session, cb.from_user.id)
     await cb.message.edit_text(t("admin.reviews.title", "📝 Sharhlar"), reply_markup=reviews_menu_kb(t))
 
-@router.callback_query(F.data == "adm:re:list")
-async def reviews_list(cb: CallbackQuery, session):
+@callbacks.route("adm:re:list")
+async def reviews_list(cb: CallbackQuery, session, sender: OutboundSender):
     if not await is_admin(session, cb.from_user.id):
         return
     t = await get_t(session, cb.from_user.id)
@@ -598,55 +919,46 @@ async def reviews_list(cb: CallbackQuery, session):
         await cb.message.edit_text(t("no_data", "Ma'lumot yo'q"), reply_markup=reviews_menu_kb(t))
         return
 
+    await cb.answer()
     await cb.message.delete()  # oldingi menyuni tozalash
-
-    for r in reviews:
-        user = r.user
-        branch = r.branch
-        if branch:
-            branch_name = branch.nameuz or branch.nameru or "-"
-            if branch.nameuz and branch.nameru and branch.nameuz != branch.nameru:
-                branch_name = f"{branch.nameuz} / {branch.nameru}"
-        else:
-            branch_name = "-"
-
-        # User haqida
-        name = " ".join(filter(None, [user.first_name, user.last_name])) if user else "-"
-        phone = user.phone if user and user.phone else "-"
-        tg_link = f"<a href='tg://user?id={user.tg_id}'>{name or 'User'}</a>" if user else "-"
-
-        # Vaqt
-        localtime = r.created_at.astimezone(ZoneInfo("Asia/Tashkent"))
-
-        caption = (
-            f"#{r.id} | ⭐ {r.rating or '-'}\n"
-            f"👤 {tg_link} | 📱 {phone}\n"
-            f"📍 {branch_name}\n"
-            f"💬 {r.text or '-'}\n"
-            f"🕒 {localtime.strftime('%Y-%m-%d %H:%M')}"
-        )
-
-        photos = [p.file_id for p in (r.photos or [])]
+    chat_id = cb.message.chat.id
+
+    # Ketma-ket kelgan rasmsiz sharhlar bitta xabarga birlashtiriladi
+    pending: list[str] = []
+    locale = locale_of(t) or "uz"
+    rendered = [cards.review_card(r, locale) for r in reviews]
+    # Lokal arxivdagi rasmlar butun ro‘yxat uchun bitta so‘rovda aniqlanadi
+    paths = await blob_paths(session, [p for card in rendered for p in card.photos])
+    for card in rendered:
+        caption = card.caption
+        photos = photo_sources(card.photos, paths)
 
         if photos:
+            if pending:
+                await sender.send_texts(chat_id, pending, parse_mode="HTML")
+                pending = []
             media = []
             for idx, fid in enumerate(photos):
                 if idx == 0:
                     media.append(InputMediaPhoto(media=fid, caption=caption, parse_mode="HTML"))
                 else:
                     media.append(InputMediaPhoto(media=fid))
-            await cb.message.answer_media_group(media)
+            await sender.send_media_group(chat_id, media)
         else:
-            await cb.message.answer(caption, parse_mode="HTML")
+            pending.append(caption)
+
+    if pending:
+        await sender.send_texts(chat_id, pending, parse_mode="HTML")
 
     # menyuni qayta chiqarish
-    await cb.message.answer(
+    await sender.send_message(
+        chat_id,
         t("admin.reviews.title", "📝 Sharhlar"),
         reply_markup=reviews_menu_kb(t)
     )
 
 
-@router.callback_query(F.data == "adm:re:del")
+@callbacks.route("adm:re:del")
 async def review_delete_list(cb: CallbackQuery, session):
     if not await is_admin(session, cb.from_user.id):
         return
@@ -663,11 +975,10 @@ async def review_delete_list(cb: CallbackQuery, session):
     await cb.message.edit_text(t("admin.kb.reviews.delete", "🗑 Sharhni o‘chirish"), reply_markup=kb.as_markup())
 
 
-@router.callback_query(F.data.startswith("adm:re:del:"))
-async def review_delete_do(cb: CallbackQuery, session):
+@callbacks.route("adm:re:del:{review_id:int}")
+async def review_delete_do(cb: CallbackQuery, session, review_id: int):
     if not await is_admin(session, cb.from_user.id):
         return
-    review_id = int(cb.data.split(":")[3])
     ok = await crud.delete_review_admin(session, requested_by_tg_id=cb.from_user.id, review_id=review_id)
     t = await get_t(session, cb.from_user.id)
     if ok:
@@ -683,3 +994,348 @@ async def review_delete_do(cb: CallbackQuery, session):
     kb.button(text=t("common.kb.back", "⬅ Orqaga"), callback_data="adm:re")
     kb.adjust(2)
     await cb.message.edit_text(t("admin.kb.reviews.delete", "🗑 Sharhni o‘chirish"), reply_markup=kb.as_markup())
+
+
+# --- Reviews export ---
+EXPORT_PERIODS = ("7", "30", "90", "0")  # kunlar; 0 = butun davr
+
+
+def _parse_period(token: str) -> tuple[datetime | None, datetime | None]:
+    """``"30"`` → oxirgi 30 kun, ``"0"`` → cheklovsiz, ``"20250101-20250131"`` → oraliq (Toshkent vaqti)."""
+    if "-" in token:
+        start_raw, end_raw = token.split("-", 1)
+        start = datetime.strptime(start_raw, "%Y%m%d").date()
+        end = datetime.strptime(end_raw, "%Y%m%d").date()
+        return (
+            datetime.combine(start, time.min, TASHKENT),
+            datetime.combine(end + timedelta(days=1), time.min, TASHKENT),
+        )
+    days = int(token)
+    if days <= 0:
+        return None, None
+    today = datetime.now(TASHKENT).date()
+    return datetime.combine(today - timedelta(days=days - 1), time.min, TASHKENT), None
+
+
+def export_period_kb(t, branch_id: int):
+    kb = InlineKeyboardBuilder()
+    for days in EXPORT_PERIODS:
+        if days == "0":
+            label = t("admin.export.period.all", "Butun davr")
+        else:
+            label = f"{days} {t('admin.export.period.days', 'kun')}"
+        kb.button(text=label, callback_data=f"adm:re:exp:p:{branch_id}:{days}")
+    kb.button(text=t("admin.export.period.custom", "📅 Boshqa oraliq"), callback_data=f"adm:re:exp:c:{branch_id}")
+    kb.button(text=t("common.kb.back", "⬅ Orqaga"), callback_data="adm:re:exp")
+    kb.adjust(4, 1, 1)
+    return kb.as_markup()
+
+
+def export_format_kb(t, branch_id: int, period: str):
+    kb = InlineKeyboardBuilder()
+    kb.button(text="CSV", callback_data=f"adm:re:exp:f:{branch_id}:{period}:csv")
+    if export.xlsx_available():
+        kb.button(text="XLSX", callback_data=f"adm:re:exp:f:{branch_id}:{period}:xlsx")
+    kb.button(text=t("common.kb.back", "⬅ Orqaga"), callback_data=f"adm:re:exp:b:{branch_id}")
+    kb.adjust(2, 1)
+    return kb.as_markup()
+
+
+@callbacks.route("adm:re:exp")
+async def export_choose_branch(cb: CallbackQuery, state: FSMContext, session):
+    if not await is_admin(session, cb.from_user.id):
+        return
+    await state.clear()
+    t = await get_t(session, cb.from_user.id)
+    branches = await crud.list_branches(session)
+    kb = InlineKeyboardBuilder()
+    kb.button(text=t("admin.export.all_branches", "🏢 Barcha filiallar"), callback_data="adm:re:exp:b:0")
+    for b in branches:
+        kb.button(text=branch_label(b), callback_data=f"adm:re:exp:b:{b.id}")
+    kb.button(text=t("common.kb.back", "⬅ Orqaga"), callback_data="adm:re")
+    kb.adjust(1)
+    await cb.message.edit_text(t("admin.export.choose_branch", "📤 Eksport: filialni tanlang"), reply_markup=kb.as_markup())
+
+
+@callbacks.route("adm:re:exp:b:{branch_id:int}")
+async def export_choose_period(cb: CallbackQuery, state: FSMContext, session, branch_id: int):
+    if not await is_admin(session, cb.from_user.id):
+        return
+    await state.clear()
+    t = await get_t(session, cb.from_user.id)
+    await cb.message.edit_text(
+        t("admin.export.choose_period", "📤 Eksport: davrni tanlang"),
+        reply_markup=export_period_kb(t, branch_id),
+    )
+
+
+@callbacks.route("adm:re:exp:c:{branch_id:int}")
+async def export_ask_range(cb: CallbackQuery, state: FSMContext, session, branch_id: int):
+    if not await is_admin(session, cb.from_user.id):
+        return
+    t = await get_t(session, cb.from_user.id)
+    await state.set_state(AdminStates.re_export_range)
+    await state.update_data(export_branch=branch_id)
+    await cb.message.edit_text(
+        t("admin.export.ask_range", "Oraliqni kiriting: YYYY-MM-DD YYYY-MM-DD"),
+        reply_markup=None,
+    )
+
+
+@router.message(AdminStates.re_export_range)
+async def export_range_input(msg: Message, state: FSMContext, session):
+    if not await is_admin(session, msg.from_user.id):
+        await state.clear()
+        return
+    t = await get_t(session, msg.from_user.id)
+    parts = (msg.text or "").split()
+    try:
+        start = date.fromisoformat(parts[0])
+        end = date.fromisoformat(parts[1]) if len(parts) > 1 else start
+    except (IndexError, ValueError):
+        await msg.answer(t("admin.export.ask_range", "Oraliqni kiriting: YYYY-MM-DD YYYY-MM-DD"))
+        return
+    if end < start:
+        start, end = end, start
+    data = await state.get_data()
+    branch_id = int(data.get("export_branch") or 0)
+    await state.clear()
+    period = f"{start:%Y%m%d}-{end:%Y%m%d}"
+    await msg.answer(
+        t("admin.export.choose_format", "📤 Eksport: formatni tanlang"),
+        reply_markup=export_format_kb(t, branch_id, period),
+    )
+
+
+@callbacks.route("adm:re:exp:p:{branch_id:int}:{period}")
+async def export_choose_format(cb: CallbackQuery, session, branch_id: int, period: str):
+    if not await is_admin(session, cb.from_user.id):
+        return
+    t = await get_t(session, cb.from_user.id)
+    await cb.message.edit_text(
+        t("admin.export.choose_format", "📤 Eksport: formatni tanlang"),
+        reply_markup=export_format_kb(t, branch_id, period),
+    )
+
+
+@callbacks.route("adm:re:exp:f:{branch_id:int}:{period}:{fmt}")
+async def export_run(cb: CallbackQuery, session, sender: OutboundSender, branch_id: int, period: str, fmt: str):
+    if not await is_admin(session, cb.from_user.id):
+        return
+    t = await get_t(session, cb.from_user.id)
+    date_from, date_to = _parse_period(period)
+
+    await cb.answer()
+    try:
+        await cb.message.edit_text(t("admin.export.progress", "⏳ Eksport tayyorlanmoqda..."))
+    except TelegramBadRequest:
+        pass
+
+    chat_id = cb.message.chat.id
+    too_big = t("admin.export.too_big", "Fayl juda katta. Filial yoki davrni toraytiring.")
+    try:
+        spool, count = await export.build_reviews_export(
+            session,
+            requested_by_tg_id=cb.from_user.id,
+            fmt=fmt,
+            branch_id=branch_id or None,
+            date_from=date_from,
+            date_to=date_to,
+        )
+    except export.ExportTooBig:
+        await sender.send_message(chat_id, too_big, reply_markup=reviews_menu_kb(t))
+        return
+    with spool:
+        if not count:
+            await sender.send_message(chat_id, t("no_data", "Ma'lumot yo'q"), reply_markup=reviews_menu_kb(t))
+            return
+        if export.spool_size(spool) > settings.EXPORT_MAX_UPLOAD_BYTES:
+            await sender.send_message(chat_id, too_big, reply_markup=reviews_menu_kb(t))
+            return
+        filename = f"reviews_{datetime.now(TASHKENT):%Y%m%d_%H%M}.{fmt}"
+        await sender.send_document(
+            chat_id,
+            export.SpooledInputFile(spool, filename=filename),
+            caption=f"📤 {t('admin.export.done', 'Eksport tayyor')}: {count}",
+        )
+    await sender.send_message(chat_id, t("admin.reviews.title", "📝 Sharhlar"), reply_markup=reviews_menu_kb(t))
+
+
+# --- Reviews search ---
+SEARCH_PAGE_SIZE = 5
+SEARCH_SNIPPET_LEN = 300
+
+
+@registry.keyboard("admin.search_nav", has_prev=(False, True), has_next=(False, True), archive=(False, True))
+def _build_search_nav_kb(t, has_prev: bool, has_next: bool, archive: bool):
+    kb = InlineKeyboardBuilder()
+    if has_prev:
+        kb.button(text=t("common.kb.prev", "⬅ Oldingi"), callback_data="adm:se:prev")
+    if has_next:
+        kb.button(text=t("common.kb.next", "Keyingi ➡"), callback_data="adm:se:next")
+    if settings.ARCHIVE_AFTER_DAYS > 0:
+        if archive:
+            label = t("admin.search.archive_off", "🗄 Faqat so‘nggi sharhlar")
+        else:
+            label = t("admin.search.archive_on", "🗄 Arxivda ham qidirish")
+        kb.button(text=label, callback_data="adm:se:arch")
+    kb.adjust(2, 1)
+    return kb.as_markup()
+
+
+def search_nav_kb(t, has_prev: bool, has_next: bool, archive: bool = False):
+    return registry.get(
+        "admin.search_nav", t, has_prev=bool(has_prev), has_next=bool(has_next), archive=bool(archive)
+    )
+
+
+def _search_page_text(t, query: str, results, page_no: int, archive: bool = False) -> str:
+    scope = f" 🗄 {t('admin.search.with_archive', 'arxiv bilan')}" if archive else ""
+    lines = [f"🔎 {t('admin.search.header', 'Qidiruv')}: <b>{html.escape(query)}</b> ({page_no + 1}){scope}"]
+    for r, _score in results:
+        branch = branch_label(r.branch) if r.branch else "-"
+        name = " ".join(filter(None, [r.user.first_name, r.user.last_name])) if r.user else "-"
+        snippet = r.text or "-"
+        if len(snippet) > SEARCH_SNIPPET_LEN:
+            snippet = snippet[:SEARCH_SNIPPET_LEN] + "…"
+        localtime = r.created_at.astimezone(TASHKENT)
+        lines.append("")
+        lines.append(f"#{r.id} | ⭐ {r.rating or '-'} | 🕒 {localtime.strftime('%Y-%m-%d %H:%M')}")
+        lines.append(f"👤 {html.escape(name or '-')} | 📍 {html.escape(branch)}")
+        lines.append(f"💬 {html.escape(snippet)}")
+    return "\n".join(lines)
+
+
+async def _show_search_page(target: Message | CallbackQuery, state: FSMContext, session, t, page_no: int):
+    data = await state.get_data()
+    query = data.get("search_q")
+    cursors = data.get("search_cursors") or [None]
+    archive = bool(data.get("search_archive"))
+    user_id = target.from_user.id
+    if not query or page_no >= len(cursors):
+        if isinstance(target, CallbackQuery):
+            await target.answer(t("admin.search.expired", "Qidiruv eskirgan, qaytadan yuboring."), show_alert=True)
+        return
+
+    after = tuple(cursors[page_no]) if cursors[page_no] else None
+    results, next_cursor = await crud.search_reviews(
+        session,
+        requested_by_tg_id=user_id,
+        query=query,
+        limit=SEARCH_PAGE_SIZE,
+        after=after,
+        include_archive=archive,
+    )
+    # Har bir sahifaning boshlang‘ich kursori saqlanadi — orqaga qaytish uchun
+    cursors = cursors[: page_no + 1]
+    if next_cursor:
+        cursors.append(list(next_cursor))
+    await state.update_data(search_cursors=cursors, search_page=page_no)
+
+    if not results:
+        no_data = t("no_data", "Ma'lumot yo'q")
+        text = f"🔎 {html.escape(query)}\n\n{no_data}"
+    else:
+        text = _search_page_text(t, query, results, page_no, archive)
+    markup = search_nav_kb(t, has_prev=page_no > 0, has_next=next_cursor is not None, archive=archive)
+    if isinstance(target, CallbackQuery):
+        await target.answer()
+        await target.message.edit_text(text, reply_markup=markup, parse_mode="HTML")
+    else:
+        await target.answer(text, reply_markup=markup, parse_mode="HTML")
+
+
+@router.message(Command("search"))
+async def search_cmd(msg: Message, command: CommandObject, state: FSMContext, session):
+    if not await is_admin(session, msg.from_user.id):
+        return
+    t = await get_t(session, msg.from_user.id)
+    query = (command.args or "").strip()
+    if not query:
+        await msg.answer(t("admin.search.usage", "Foydalanish: /search so‘z yoki ibora"))
+        return
+    await state.update_data(search_q=query, search_cursors=[None], search_page=0, search_archive=False)
+    await _show_search_page(msg, state, session, t, 0)
+
+
+@callbacks.route("adm:se:{direction}")
+async def search_paginate(cb: CallbackQuery, state: FSMContext, session, direction: str):
+    if not await is_admin(session, cb.from_user.id):
+        return
+    t = await get_t(session, cb.from_user.id)
+    data = await state.get_data()
+    if direction == "arch":
+        # Arxiv boshqa natijalar to‘plami — kursorlar boshidan
+        await state.update_data(search_archive=not data.get("search_archive"), search_cursors=[None])
+        await _show_search_page(cb, state, session, t, 0)
+        return
+    page_no = int(data.get("search_page") or 0)
+    page_no = page_no + 1 if direction == "next" else max(0, page_no - 1)
+    await _show_search_page(cb, state, session, t, page_no)
+
+
+# --- Metrics ---
+def _fmt_metric(value) -> str:
+    if isinstance(value, dict):
+        return " ".join(
+            f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v if v is not None else '-'}"
+            for k, v in value.items()
+        )
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+@router.message(Command("metrics"))
+async def metrics_cmd(msg: Message, session):
+    if not is_super_admin_env(msg.from_user.id):
+        return
+    t = await get_t(session, msg.from_user.id)
+    snapshot = metrics.REGISTRY.snapshot()
+    if not snapshot:
+        await msg.answer(t("no_data", "Ma'lumot yo'q"))
+        return
+    lines = [f"{name}: {_fmt_metric(value)}" for name, value in snapshot.items()]
+    body = html.escape("\n".join(lines))
+    await msg.answer(f"<pre>{body}</pre>", parse_mode="HTML")
+
+
+# --- Slow queries ---
+SLOWLOG_SQL_LEN = 300
+SLOWLOG_PLAN_LINES = 4
+
+
+@router.message(Command("slowlog"))
+async def slowlog_cmd(msg: Message, command: CommandObject, session):
+    if not is_super_admin_env(msg.from_user.id):
+        return
+    t = await get_t(session, msg.from_user.id)
+    if (command.args or "").strip() == "reset":
+        slowlog.reset()
+        await msg.answer(t("admin.slowlog.reset", "🧹 Sekin so‘rovlar statistikasi tozalandi"))
+        return
+    entries = slowlog.top()
+    if not entries:
+        await msg.answer(t("no_data", "Ma'lumot yo'q"))
+        return
+    blocks = []
+    for i, e in enumerate(entries, 1):
+        lines = [
+            f"#{i} {e.total_ms:.0f} ms = {e.count} × avg {e.total_ms / e.count:.0f} ms (max {e.max_ms:.0f})",
+            f"handlers: {', '.join(sorted(e.handlers))}",
+            e.sql[:SLOWLOG_SQL_LEN],
+        ]
+        if e.plan:
+            lines.extend(e.plan.splitlines()[:SLOWLOG_PLAN_LINES])
+        blocks.append(html.escape("\n".join(lines)))
+    header = t("admin.slowlog.title", "🐢 Sekin so‘rovlar (> {ms} ms)").format(ms=slowlog.threshold_ms)
+    if settings.WORKER_COUNT > 1:
+        # Statistika jarayon xotirasida — boshqa workerlarnikini to‘liq ko‘rish uchun loglar kerak
+        header += "\n" + t(
+            "admin.slowlog.per_worker",
+            "ℹ️ Faqat shu chatga xizmat qiladigan worker ma'lumotlari ({n} tadan biri); to‘liq ro‘yxat loglarda",
+        ).format(n=settings.WORKER_COUNT)
+    body = ""
+    for block in blocks:
+        if len(body) + len(block) > 3800:
+            break
+        body += block + "\n\n"
+    await msg.answer(f"{header}\n<pre>{body.rstrip()}</pre>", parse_mode="HTML")
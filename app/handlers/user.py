@@ -1,11 +1,16 @@
 import asyncio
 from aiogram import Router, F
+from aiogram.filters import Command, CommandObject, CommandStart
 from aiogram.types import Message, CallbackQuery, ReplyKeyboardRemove
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
+from app.callbacks import CallbackRoutes
 from app.db import crud
-from app.config import settings
+from app.db.batcher import ReviewBatcher
 from app.i18n import I18N
+from app import notify, screens
+from app.deeplinks import parse_review_payload
+from app.sender import OutboundSender
 from app.keyboards import (
     branches_kb,
     contact_kb,
@@ -17,6 +22,7 @@ from app.keyboards import (
 )
 
 router = Router()
+callbacks = CallbackRoutes(router)
 
 
 class ReviewForm(StatesGroup):
@@ -42,10 +48,43 @@ async def start_cmd(msg: Message, state: FSMContext, session):
     await msg.answer(t("start.choose_lang", "Tilni tanlang / Выберите язык"), reply_markup=lang_kb(t))
 
 
+async def _open_review_menu(msg: Message, state: FSMContext, t, branch_id: int, rating: int | None):
+    """Filial (va ixtiyoriy reyting) oldindan tanlangan holda sharh menyusini ochadi."""
+    if rating:
+        text = f"{t('saved', 'Rahmat!')} ⭐ {rating}"
+    else:
+        text = t("ask.rating_or_review", "Baholash yoki sharh yoki rasm qoldiring:")
+    await state.set_data({"branch_id": branch_id, "rating": rating})
+    await screens.render(msg, state, text, reply_markup=review_menu_kb(t, can_submit=bool(rating)))
+    await state.set_state(ReviewForm.confirm)
+
+
+# 🔗 QR / deep link: /start b<branch_id>[_r<rating>]
+@router.message(CommandStart(deep_link=True))
+async def start_deep_link(msg: Message, command: CommandObject, state: FSMContext, session):
+    parsed = parse_review_payload(command.args)
+    branch = await crud.get_branch(session, parsed[0]) if parsed else None
+    if branch is None:
+        return await start_cmd(msg, state, session)
+    branch_id, rating = parsed
+
+    user = await crud.get_user_by_tg_id(session, msg.from_user.id)
+    if user and user.phone and user.locale:
+        # Ma'lum foydalanuvchi: til, kontakt va filial bosqichlari o‘tkazib yuboriladi
+        return await _open_review_menu(msg, state, I18N(user.locale).t, branch_id, rating)
+
+    if user is None:
+        await crud.upsert_user(session, msg.from_user.id, first_name=msg.from_user.first_name)
+    # Yangi foydalanuvchi: til va kontaktdan keyin shu filialga qaytiladi
+    await state.set_data({"deep_link": {"branch_id": branch_id, "rating": rating}})
+    t = I18N("uz").t
+    await msg.answer(t("start.choose_lang", "Tilni tanlang / Выберите язык"), reply_markup=lang_kb(t))
+
+
 # 🌐 Til tanlash
-@router.callback_query(F.data.startswith("lang:"))
-async def choose_lang(cb: CallbackQuery, state: FSMContext, session):
-    locale = cb.data.split(":")[1]
+@callbacks.route("lang:{locale}")
+async def choose_lang(cb: CallbackQuery, state: FSMContext, session, locale: str):
+    await screens.answer(cb)
     await crud.upsert_user(session, cb.from_user.id, locale=locale)
     t = I18N(locale).t
 
@@ -73,13 +112,19 @@ async def on_phone_contact(msg: Message, state: FSMContext, session):
     locale = getattr(getattr(t, "__self__", None), "locale", "uz")
     await msg.answer(t("thank_you", "Rahmat ✅"), reply_markup=ReplyKeyboardRemove())
 
+    pending = (await state.get_data()).get("deep_link")
+    if pending:
+        return await _open_review_menu(msg, state, t, pending["branch_id"], pending.get("rating"))
+
     branches = await crud.list_branches(session)
     if not branches:
         await msg.answer(t("branch.empty", "Hozircha filiallar yo‘q."))
         await state.clear()
         return
 
-    await msg.answer(
+    await screens.render(
+        msg,
+        state,
         t("ask.branch", "Filialni tanlang:"),
         reply_markup=branches_kb(branches, locale=locale),
     )
@@ -87,14 +132,14 @@ async def on_phone_contact(msg: Message, state: FSMContext, session):
 
 
 # 🏢 Filial tanlash
-@router.callback_query(F.data.startswith("branch:"))
-async def choose_branch(cb: CallbackQuery, state: FSMContext, session):
-    branch_id = int(cb.data.split(":")[1])
+@callbacks.route("branch:{branch_id:int}")
+async def choose_branch(cb: CallbackQuery, state: FSMContext, session, branch_id: int):
     await state.update_data(branch_id=branch_id)
     t = await get_t(session, cb.from_user.id)
 
-    await cb.message.delete()
-    await cb.message.answer(
+    await screens.render(
+        cb,
+        state,
         t("ask.rating_or_review", "Baholash yoki sharh yoki rasm qoldiring:"),
         reply_markup=review_menu_kb(t, can_submit=False)
     )
@@ -102,23 +147,22 @@ async def choose_branch(cb: CallbackQuery, state: FSMContext, session):
 
 
 # ⭐ Reyting
-@router.callback_query(F.data == "add_rating")
+@callbacks.route("add_rating")
 async def add_rating(cb: CallbackQuery, state: FSMContext, session):
     t = await get_t(session, cb.from_user.id)
-    await cb.message.delete()
-    await cb.message.answer("⭐ " + t("ask.rating", "Reyting tanlang:"), reply_markup=rating_kb())
+    await screens.render(cb, state, "⭐ " + t("ask.rating", "Reyting tanlang:"), reply_markup=rating_kb())
     await state.set_state(ReviewForm.rating)
 
 
-@router.callback_query(F.data.startswith("rate:"))
-async def choose_rating(cb: CallbackQuery, state: FSMContext, session):
-    rating = int(cb.data.split(":")[1])
+@callbacks.route("rate:{rating:int}")
+async def choose_rating(cb: CallbackQuery, state: FSMContext, session, rating: int):
     await state.update_data(rating=rating)
     data = await state.get_data()
     t = await get_t(session, cb.from_user.id)
 
-    await cb.message.delete()
-    await cb.message.answer(
+    await screens.render(
+        cb,
+        state,
         f"{t('saved', 'Rahmat!')} ⭐ {rating}",
         reply_markup=review_menu_kb(
             t,
@@ -130,11 +174,12 @@ async def choose_rating(cb: CallbackQuery, state: FSMContext, session):
 
 
 # ✍️ Izoh (text + photo + album)
-@router.callback_query(F.data == "add_text")
+@callbacks.route("add_text")
 async def ask_text(cb: CallbackQuery, state: FSMContext, session):
     t = await get_t(session, cb.from_user.id)
-    await cb.message.delete()
-    await cb.message.answer(
+    await screens.render(
+        cb,
+        state,
         t("ask.review", "Sharh yozing (rasm yoki albom yuborishingiz ham mumkin)."),
         reply_markup=back_to_review_menu_kb(t)
     )
@@ -157,7 +202,9 @@ async def handle_review_content(msg: Message, state: FSMContext, session):
 async def save_text(msg: Message, state: FSMContext, session):
     await state.update_data(text=msg.text)
     t = await get_t(session, msg.from_user.id)
-    await msg.answer(
+    await screens.render(
+        msg,
+        state,
         t("saved", "Sharhingiz qabul qilindi ✅"),
         reply_markup=review_menu_kb(
             t,
@@ -170,14 +217,26 @@ async def save_text(msg: Message, state: FSMContext, session):
     await state.set_state(ReviewForm.confirm)
 
 
+def _photo_ref(msg: Message) -> dict:
+    """Eng katta o‘lchamdagi rasm: file_id + dedup/arxiv uchun file_unique_id va hajmi."""
+    photo = msg.photo[-1]
+    return {
+        "file_id": photo.file_id,
+        "file_unique_id": photo.file_unique_id,
+        "file_size": photo.file_size,
+    }
+
+
 async def save_single_photo(msg: Message, state: FSMContext, session):
     data = await state.get_data()
     photos = data.get("photos", [])
-    photos.append(msg.photo[-1].file_id)
+    photos.append(_photo_ref(msg))
     await state.update_data(photos=photos)
 
     t = await get_t(session, msg.from_user.id)
-    await msg.answer(
+    await screens.render(
+        msg,
+        state,
         t("saved.photo", "📷 Rasm qabul qilindi ✅"),
         reply_markup=review_menu_kb(
             t,
@@ -199,7 +258,7 @@ async def save_album(msg: Message, state: FSMContext, session):
 
     if album_buffer.get(media_id):
         messages = album_buffer.pop(media_id)
-        file_ids = [m.photo[-1].file_id for m in messages if m.photo]
+        file_ids = [_photo_ref(m) for m in messages if m.photo]
 
         data = await state.get_data()
         photos = data.get("photos", [])
@@ -207,7 +266,9 @@ async def save_album(msg: Message, state: FSMContext, session):
         await state.update_data(photos=photos)
 
         t = await get_t(session, msg.from_user.id)
-        await msg.answer(
+        await screens.render(
+            msg,
+            state,
             t("saved.album", f"📷 {len(file_ids)} ta rasm qabul qilindi ✅"),
             reply_markup=review_menu_kb(
                 t,
@@ -221,26 +282,28 @@ async def save_album(msg: Message, state: FSMContext, session):
 
 
 # 📷 Rasm tugmasi (xohlasa alohida rasm yuborishi uchun)
-@router.callback_query(F.data == "add_photo")
+@callbacks.route("add_photo")
 async def ask_photo(cb: CallbackQuery, state: FSMContext, session):
     t = await get_t(session, cb.from_user.id)
-    await cb.message.delete()
-    await cb.message.answer(
+    await screens.render(
+        cb,
+        state,
         t("ask.photo", "Rasm yuboring (bir nechta rasm bo‘lishi mumkin):"),
         reply_markup=back_to_review_menu_kb(t)
     )
     await state.set_state(ReviewForm.text)  # 👈 universal handler ishlaydi
 
 
-@router.callback_query(F.data == "go_back_choose_review")
+@callbacks.route("go_back_choose_review")
 async def go_back_to_review_menu(cb: CallbackQuery, state: FSMContext, session):
     data = await state.get_data()
     t = await get_t(session, cb.from_user.id)
     can_submit = bool(data.get("rating") or data.get("text") or data.get("photos"))
     has_photo = bool(data.get("photos"))
 
-    await cb.message.delete()
-    await cb.message.answer(
+    await screens.render(
+        cb,
+        state,
         t("ask.rating_or_review", "Baholash yoki sharh yoki rasm qoldiring:"),
         reply_markup=review_menu_kb(
             t,
@@ -253,19 +316,20 @@ async def go_back_to_review_menu(cb: CallbackQuery, state: FSMContext, session):
     await state.set_state(ReviewForm.confirm)
 
 
-@router.callback_query(F.data == "go_back_choose_branch")
+@callbacks.route("go_back_choose_branch")
 async def go_back_to_branch_selection(cb: CallbackQuery, state: FSMContext, session):
     t = await get_t(session, cb.from_user.id)
     branches = await crud.list_branches(session)
     if not branches:
-        await cb.message.edit_text(t("branch.empty", "Hozircha filiallar yo‘q."))
+        await screens.render(cb, state, t("branch.empty", "Hozircha filiallar yo‘q."))
         await state.clear()
         return
 
     locale = getattr(getattr(t, "__self__", None), "locale", "uz")
 
-    await cb.message.delete()
-    await cb.message.answer(
+    await screens.render(
+        cb,
+        state,
         t("ask.branch", "Filialni tanlang:"),
         reply_markup=branches_kb(branches, locale=locale),
     )
@@ -273,14 +337,28 @@ async def go_back_to_branch_selection(cb: CallbackQuery, state: FSMContext, sess
 
 
 # ✅ Yakuniy yuborish
-@router.callback_query(F.data == "submit_review")
-async def submit_review(cb: CallbackQuery, state: FSMContext, session):
+@callbacks.route("submit_review")
+async def submit_review(
+    cb: CallbackQuery,
+    state: FSMContext,
+    session,
+    sender: OutboundSender,
+    batcher: ReviewBatcher | None = None,
+):
     data = await state.get_data()
     t = await get_t(session, cb.from_user.id)
 
+    if data.get("branch_id") is None:
+        # Suhbat muddati o‘tib, FSM ma'lumotlari tozalangan — filialdan qayta boshlaymiz
+        await screens.answer(cb, t("review.expired", "Sessiya muddati tugadi, filialni qaytadan tanlang."), show_alert=True)
+        await go_back_to_branch_selection(cb, state, session)
+        return
+
     if not (data.get("rating") or data.get("text") or data.get("photos")):
-        await cb.answer(t("review.submit.empty", "Kamida bittasini tanlang: Sharh yoki Rasm."), show_alert=True)
-        await cb.message.edit_text(
+        await screens.answer(cb, t("review.submit.empty", "Kamida bittasini tanlang: Sharh yoki Rasm."), show_alert=True)
+        await screens.render(
+            cb,
+            state,
             t("ask.rating_or_review", "Baholash yoki sharh yoki rasm qoldiring:"),
             reply_markup=review_menu_kb(
                 t,
@@ -288,7 +366,8 @@ async def submit_review(cb: CallbackQuery, state: FSMContext, session):
                 allow_add_text=not bool(data.get("text")),
                 allow_add_photo=not bool(data.get("photos")),
                 show_back=not bool(data.get("photos")),
-            )
+            ),
+            answered=True,
         )
         return
 
@@ -296,23 +375,32 @@ async def submit_review(cb: CallbackQuery, state: FSMContext, session):
     if user is None:
         user = await crud.upsert_user(session, cb.from_user.id, first_name=cb.from_user.first_name)
 
-    review = await crud.create_review(
-        session,
+    review_data = dict(
         user_id=user.id,
         branch_id=data["branch_id"],
         rating=data.get("rating"),
         text=data.get("text"),
         photos=data.get("photos", [])
     )
+    if batcher is not None:
+        # Jurnalga yozildi; bazaga partiya bilan tushadi, guruhga xabar flush dan keyin
+        await batcher.submit(**review_data)
+        review = None
+    else:
+        review = await crud.create_review(session, **review_data)
+    # Panel "rahmat" ga aylanadi; reply-klaviatura uchun alohida xabar kerak.
+    # Avval render (eski panel ID si kerak bo‘lishi mumkin), keyin FSM yozuvi butunlay o‘chiriladi
+    await screens.render(cb, state, t("saved", "Rahmat! Sharhingiz saqlandi"), track=False)
     await state.clear()
-    await cb.message.delete()
-    await cb.message.answer(t("saved", "Rahmat! Sharhingiz saqlandi"))
-    await crud.notify_superadmin_group(cb.bot, session, settings.SUPER_ADMINS[0], review)
+    if review is not None:
+        notify.schedule_notify(sender, [review.id])
     await cb.message.answer(
         t("ask.new_review", "Yangi sharh boshlash uchun tugmani bosing."),
         reply_markup=new_review_kb(t),
     )
     
+
+
 # new review and change language 
 
 
@@ -338,13 +426,16 @@ async def _start_new_review_flow(msg: Message, state: FSMContext, session):
         await msg.answer(t("branch.empty", "Hozircha filiallar yo‘q."))
         return
     locale = getattr(getattr(t, "__self__", None), "locale", "uz")
-    await msg.answer(
+    await screens.render(
+        msg,
+        state,
         t("ask.branch", "Filialni tanlang:"),
         reply_markup=branches_kb(branches, locale=locale),
     )
     await state.set_state(ReviewForm.branch)
 
 
+@router.message(Command("new_review"))
 @router.message(F.text.in_(_labels_new_review()))
 async def on_new_review_label(msg: Message, state: FSMContext, session):
     await _start_new_review_flow(msg, state, session)
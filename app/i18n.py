@@ -1,11 +1,45 @@
-import json
 from pathlib import Path
+from typing import Callable
+
+from app import runtime
+
+LOCALES_DIR = Path(__file__).parent / "locales"
+LOCALES = ("uz", "ru")
+
+# Kataloglar bir marta o‘qiladi va xotirada saqlanadi
+_catalogs: dict[str, dict[str, str]] = {}
+_reload_hooks: list[Callable[[], None]] = []
+
+
+def load_catalog(locale: str) -> dict[str, str]:
+    catalog = _catalogs.get(locale)
+    if catalog is None:
+        catalog = runtime.json_loads((LOCALES_DIR / f"{locale}.json").read_text(encoding="utf-8"))
+        _catalogs[locale] = catalog
+    return catalog
+
+
+def reload_catalogs() -> None:
+    _catalogs.clear()
+    for hook in _reload_hooks:
+        hook()
+
+
+def on_reload(hook: Callable[[], None]) -> None:
+    """Kataloglar qayta yuklanganda chaqiriladigan funksiya (masalan, kesh tozalash)."""
+    _reload_hooks.append(hook)
+
+
+def locale_of(t: Callable[[str, str], str]) -> str | None:
+    """``I18N(...).t`` dan locale ni oladi; boshqa callable bo‘lsa None."""
+    owner = getattr(t, "__self__", None)
+    return owner.locale if isinstance(owner, I18N) else None
+
 
 class I18N:
     def __init__(self, locale: str = "uz"):
         self.locale = locale
-        base = Path(__file__).parent / "locales"
-        self.data = json.loads((base / f"{locale}.json").read_text(encoding="utf-8"))
+        self.data = load_catalog(locale)
 
     def t(self, key: str, default: str = "") -> str:
-        return self.data.get(key, default or key)
\ No newline at end of file
+        return self.data.get(key, default or key)
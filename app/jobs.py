@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+from aiogram import Bot
+
+from app import metrics
+from app.broadcast import Broadcaster
+from app.config import settings
+from app.db import crud
+from app.db.session import SessionLocal
+from app.digest import DigestScheduler
+from app.photo_archive import PhotoArchive
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_BATCH = 50_000
+
+reviews_archived = metrics.counter("reviews_archived_total", "Reviews moved to reviews_archive")
+
+
+async def _periodic(name: str, interval: float, job: Callable[[], Awaitable[None]]) -> None:
+    while True:
+        try:
+            await job()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Background job %s failed", name)
+        await asyncio.sleep(interval)
+
+
+async def rollup_branch_stats() -> None:
+    """Yangi sharhlarni kunlik statistikaga qo‘shadi (watermark dan davom etadi)."""
+    async with SessionLocal() as session:
+        while True:
+            processed = await crud.refresh_branch_rollups(
+                session,
+                settle_seconds=settings.ROLLUP_SETTLE_SEC,
+                batch_size=ROLLUP_BATCH,
+            )
+            if processed:
+                logger.info("Rolled up %s reviews into branch_daily_stats", processed)
+            if processed < ROLLUP_BATCH:
+                return
+
+
+async def archive_old_reviews() -> None:
+    """``ARCHIVE_AFTER_DAYS`` dan eski sharhlarni bo‘laklab reviews_archive ga ko‘chiradi."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+    total = 0
+    async with SessionLocal() as session:
+        while True:
+            moved = await crud.archive_reviews_chunk(session, cutoff, batch_size=settings.ARCHIVE_BATCH)
+            total += moved
+            reviews_archived.inc(moved)
+            if moved < settings.ARCHIVE_BATCH:
+                break
+            # Bo‘laklar orasida boshqa so‘rovlarga navbat beriladi
+            await asyncio.sleep(0)
+    if total:
+        logger.info("Archived %s reviews older than %s", total, cutoff.date())
+
+
+def start_background_jobs(
+    bot: Bot,
+    broadcaster: Broadcaster | None = None,
+    digests: DigestScheduler | None = None,
+) -> list[asyncio.Task]:
+    archive = PhotoArchive(bot, settings.PHOTO_ARCHIVE_DIR, concurrency=settings.PHOTO_ARCHIVE_CONCURRENCY)
+    jobs = [
+        ("rollups", settings.ROLLUP_INTERVAL_SEC, rollup_branch_stats),
+        ("photo_archive", settings.PHOTO_ARCHIVE_INTERVAL_SEC, archive.run),
+    ]
+    if settings.ARCHIVE_AFTER_DAYS > 0:
+        jobs.append(("review_archive", settings.ARCHIVE_INTERVAL_SEC, archive_old_reviews))
+    if broadcaster is not None:
+        # Uzilgan yoki boshqa workerda yaratilgan xabarnomalarni davom ettiradi
+        jobs.append(("broadcasts", settings.BROADCAST_RESUME_SEC, broadcaster.resume))
+    if digests is not None:
+        jobs.append(("digests", settings.DIGEST_CHECK_SEC, digests.run))
+    return [
+        asyncio.create_task(_periodic(name, interval, job), name=f"job:{name}")
+        for name, interval, job in jobs
+        if interval > 0
+    ]
+
+
+async def stop_background_jobs(tasks: list[asyncio.Task]) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
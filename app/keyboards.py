@@ -1,10 +1,69 @@
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder,InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.types import KeyboardButton, ReplyKeyboardRemove
-from typing import Callable
-from app.i18n import I18N
+from itertools import product
+from typing import Any, Callable
+from app.i18n import I18N, LOCALES, locale_of, on_reload
 
+BOOLS = (False, True)
 
-def lang_kb(t: Callable[[str, str], str]):
+
+class KeyboardRegistry:
+    """
+    Faqat locale va bir nechta flag ga bog‘liq klaviaturalar uchun kesh.
+
+    Har bir (nom, locale, flaglar) kombinatsiyasi startupda bir marta quriladi;
+    aiogram markup obyektlari frozen, shuning uchun ular handlerlar o‘rtasida
+    bemalol qayta ishlatiladi. Kesh faqat locale kataloglari qayta yuklanganda tozalanadi.
+    """
+
+    def __init__(self):
+        self._builders: dict[str, tuple[Callable[..., Any], dict[str, tuple]]] = {}
+        self._cache: dict[tuple, Any] = {}
+        on_reload(self.invalidate)
+
+    def keyboard(self, name: str, **variants: tuple) -> Callable:
+        """Builder ni ro‘yxatdan o‘tkazadi: ``variants`` — har bir flag ning mumkin bo‘lgan qiymatlari."""
+        def decorator(builder: Callable[..., Any]) -> Callable[..., Any]:
+            self._builders[name] = (builder, variants)
+            return builder
+        return decorator
+
+    @staticmethod
+    def _key(name: str, locale: str, flags: dict) -> tuple:
+        return (name, locale, *sorted(flags.items()))
+
+    def get(self, name: str, t: Callable[[str, str], str], **flags: Any):
+        locale = locale_of(t)
+        builder, _ = self._builders[name]
+        if locale is None:
+            # Oddiy callable (I18N emas) — keshsiz quriladi
+            return builder(t, **flags)
+        key = self._key(name, locale, flags)
+        markup = self._cache.get(key)
+        if markup is None:
+            markup = self._cache[key] = builder(t, **flags)
+        return markup
+
+    def build(self) -> int:
+        """Barcha (locale × flag) kombinatsiyalarini oldindan quradi; markuplar sonini qaytaradi."""
+        for name, (builder, variants) in self._builders.items():
+            names = list(variants)
+            for locale in LOCALES:
+                t = I18N(locale).t
+                for values in product(*(variants[n] for n in names)):
+                    flags = dict(zip(names, values))
+                    self._cache[self._key(name, locale, flags)] = builder(t, **flags)
+        return len(self._cache)
+
+    def invalidate(self) -> None:
+        self._cache.clear()
+
+
+registry = KeyboardRegistry()
+
+
+@registry.keyboard("lang")
+def _build_lang_kb(t: Callable[[str, str], str]):
     kb = InlineKeyboardBuilder()
     kb.button(text=t("lang.uz", "🇺🇿 O'zbekcha"), callback_data="lang:uz")
     kb.button(text=t("lang.ru", "🇷🇺 Русский"), callback_data="lang:ru")
@@ -12,7 +71,12 @@ def lang_kb(t: Callable[[str, str], str]):
     return kb.as_markup()
 
 
-def contact_kb(t: Callable[[str, str], str]):
+def lang_kb(t: Callable[[str, str], str]):
+    return registry.get("lang", t)
+
+
+@registry.keyboard("contact")
+def _build_contact_kb(t: Callable[[str, str], str]):
     label = t("kb.contact", "📞 Kontaktni yuborish")
     kb = ReplyKeyboardBuilder()
     kb.add(KeyboardButton(text=label, request_contact=True))
@@ -20,6 +84,10 @@ def contact_kb(t: Callable[[str, str], str]):
     return kb.as_markup(resize_keyboard=True, one_time_keyboard=True)
 
 
+def contact_kb(t: Callable[[str, str], str]):
+    return registry.get("contact", t)
+
+
 def branches_kb(branches: list, locale: str = "uz"):
     kb = InlineKeyboardBuilder()
     for b in branches:
@@ -32,12 +100,20 @@ def branches_kb(branches: list, locale: str = "uz"):
     kb.adjust(1)
     return kb.as_markup()
 
-def review_menu_kb(
+
+@registry.keyboard(
+    "review_menu",
+    can_submit=BOOLS,
+    allow_add_text=BOOLS,
+    allow_add_photo=BOOLS,
+    show_back=BOOLS,
+)
+def _build_review_menu_kb(
     t: Callable[[str, str], str],
-    can_submit: bool = False,
-    allow_add_text: bool = True,
-    allow_add_photo: bool = True,
-    show_back: bool = True,
+    can_submit: bool,
+    allow_add_text: bool,
+    allow_add_photo: bool,
+    show_back: bool,
 ):
     kb = InlineKeyboardBuilder()
     if allow_add_text:
@@ -51,33 +127,65 @@ def review_menu_kb(
     kb.adjust(2, 2, 1)
     return kb.as_markup()
 
-def back_to_review_menu_kb(t):
+
+def review_menu_kb(
+    t: Callable[[str, str], str],
+    can_submit: bool = False,
+    allow_add_text: bool = True,
+    allow_add_photo: bool = True,
+    show_back: bool = True,
+):
+    return registry.get(
+        "review_menu",
+        t,
+        can_submit=bool(can_submit),
+        allow_add_text=bool(allow_add_text),
+        allow_add_photo=bool(allow_add_photo),
+        show_back=bool(show_back),
+    )
+
+
+@registry.keyboard("back_to_review_menu")
+def _build_back_to_review_menu_kb(t):
     kb = InlineKeyboardBuilder()
     kb.button(text=t("common.kb.back", "⬅ Orqaga"), callback_data="go_back_choose_review")
     kb.adjust(1)
     return kb.as_markup()
-def rating_kb():
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(text="1 ⭐", callback_data="rate:1"),
-                InlineKeyboardButton(text="2 ⭐", callback_data="rate:2"),
-                InlineKeyboardButton(text="3 ⭐", callback_data="rate:3"),
-                InlineKeyboardButton(text="4 ⭐", callback_data="rate:4"),
-                InlineKeyboardButton(text="5 ⭐", callback_data="rate:5"),
-            ],
-            [
-                InlineKeyboardButton(text="⬅️ Orqaga", callback_data="go_back_choose_review"),
-            ]
+
+
+def back_to_review_menu_kb(t):
+    return registry.get("back_to_review_menu", t)
+
+
+_RATING_KB = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [
+            InlineKeyboardButton(text="1 ⭐", callback_data="rate:1"),
+            InlineKeyboardButton(text="2 ⭐", callback_data="rate:2"),
+            InlineKeyboardButton(text="3 ⭐", callback_data="rate:3"),
+            InlineKeyboardButton(text="4 ⭐", callback_data="rate:4"),
+            InlineKeyboardButton(text="5 ⭐", callback_data="rate:5"),
+        ],
+        [
+            InlineKeyboardButton(text="⬅️ Orqaga", callback_data="go_back_choose_review"),
         ]
-    )
-    
+    ]
+)
+
+
+def rating_kb():
+    return _RATING_KB
+
+
+_REMOVE_REPLY_KB = ReplyKeyboardRemove()
+
+
 def remove_reply_kb():
-    return ReplyKeyboardRemove()
+    return _REMOVE_REPLY_KB
 
 
-def new_review_kb(t: Callable[[str, str], str]):
-    """Reply keyboard with localized labels: New Review, Change Language."""
+@registry.keyboard("new_review")
+def _build_new_review_kb(t: Callable[[str, str], str]):
     kb = ReplyKeyboardBuilder()
     label_new = t("kb.new_review", "🆕 Yangi sharh")
     label_lang = t("kb.change_lang", "🌐 Tilni o'zgartirish")
@@ -85,3 +193,8 @@ def new_review_kb(t: Callable[[str, str], str]):
     kb.add(KeyboardButton(text=label_lang))
     kb.adjust(2)
     return kb.as_markup(resize_keyboard=True)
+
+
+def new_review_kb(t: Callable[[str, str], str]):
+    """Reply keyboard with localized labels: New Review, Change Language."""
+    return registry.get("new_review", t)
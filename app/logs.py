@@ -0,0 +1,215 @@
+"""
+Loglash: yozuvlar event loop da faqat navbatga qo‘yiladi, formatlash (JSON, traceback)
+va stdout ga yozish ``QueueListener`` threadida bajariladi.
+
+Har bir yozuvga joriy update konteksti (``update_id``, ``user_id``, ``handler``) qo‘shiladi;
+ko‘p yoziladigan loggerlar uchun sampling (``LOG_SAMPLING="app.updates=0.1,aiogram.event=0"``).
+"""
+import atexit
+import logging
+import queue
+import random
+import sys
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from app import metrics, runtime
+from app.config import settings
+
+TEXT_FORMAT = "%(levelname)s:%(name)s:%(message)s"
+CONTEXT_FIELDS = ("update_id", "user_id", "handler", "duration_ms", "trace_id")
+
+# Joriy update konteksti — middleware o‘rnatadi, ichkaridagi barcha loglar (va fon tasklar) ko‘radi
+log_context: ContextVar[dict[str, Any] | None] = ContextVar("log_context", default=None)
+
+sampled_out = metrics.counter("log_records_sampled_out_total", "Log records dropped by sampling")
+update_seconds = metrics.histogram("update_duration_seconds", "Update handling latency")
+
+updates_logger = logging.getLogger("app.updates")
+
+
+def parse_sampling(raw: str) -> dict[str, float]:
+    rates: dict[str, float] = {}
+    for item in raw.split(","):
+        name, _, rate = item.strip().partition("=")
+        if name and rate:
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """WARNING dan past yozuvlarni logger nomi (eng uzun prefiks) bo‘yicha ``rate`` ulushda o‘tkazadi."""
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._cache: dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            prefix = name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition(".")[0]
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        if rate >= 1.0 or (rate > 0 and random.random() < rate):
+            return True
+        sampled_out.inc()
+        return False
+
+
+class ContextFilter(logging.Filter):
+    """Kontekst maydonlarini yozuvga ko‘chiradi — listener threadida contextvars ko‘rinmaydi."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        ctx = log_context.get()
+        if ctx:
+            for key, value in ctx.items():
+                if value is not None and not hasattr(record, key):
+                    setattr(record, key, value)
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Faqat xabar matni shu yerda yig‘iladi; traceback (diskdan o‘qiydi) listener threadida
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def __init__(self, static: dict[str, Any] | None = None):
+        super().__init__()
+        self.static = static or {}
+
+    def format(self, record: logging.LogRecord) -> str:
+        out: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **self.static,
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                out[field] = value
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            out["exc"] = record.exc_text
+        return runtime.json_dumps(out)
+
+
+def setup_logging(worker: int | None = None) -> QueueListener:
+    """Root logger ni navbat orqali ishlaydigan qilib sozlaydi; listener ni qaytaradi."""
+    if settings.LOG_FORMAT == "json":
+        formatter: logging.Formatter = JsonFormatter({"worker": worker} if worker is not None else None)
+    else:
+        prefix = f"[w{worker}] " if worker is not None else ""
+        formatter = logging.Formatter(prefix + TEXT_FORMAT)
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(formatter)
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _QueueHandler(records)
+    handler.addFilter(SamplingFilter(parse_sampling(settings.LOG_SAMPLING)))
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    listener = QueueListener(records, stream, respect_handler_level=True)
+    listener.start()
+    atexit.register(_stop_listener, listener)
+    return listener
+
+
+def _stop_listener(listener: QueueListener) -> None:
+    # Navbatda qolganlarni yozib bo‘ladi; ikkinchi marta chaqirilsa jim o‘tadi
+    if listener._thread is not None:
+        listener.stop()
+
+
+# --- Middleware ---
+
+def _handler_name(data: dict[str, Any]) -> str | None:
+    match = data.get("callback_match")
+    if match is not None:
+        return match.endpoint.handler.__name__
+    handler = data.get("handler")
+    callback = getattr(handler, "callback", None)
+    return getattr(callback, "__name__", None)
+
+
+class UpdateLogMiddleware(BaseMiddleware):
+    """
+    Outer (update) middleware: kontekstni o‘rnatadi va har bir update uchun bitta yozuv
+    (davomiylik, handler). ``LOG_SLOW_UPDATE_MS`` dan sekinlari WARNING — sampling ga tushmaydi.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        ctx: dict[str, Any] = {
+            "update_id": event.update_id if isinstance(event, Update) else None,
+            "user_id": user.id if user else None,
+            "handler": None,
+        }
+        token = log_context.set(ctx)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            elapsed = time.perf_counter() - started
+            update_seconds.observe(elapsed)
+            level = logging.WARNING if elapsed * 1000 >= settings.LOG_SLOW_UPDATE_MS else logging.INFO
+            if updates_logger.isEnabledFor(level):
+                updates_logger.log(
+                    level,
+                    "update %s handled in %.1f ms",
+                    ctx["update_id"],
+                    elapsed * 1000,
+                    extra={"duration_ms": round(elapsed * 1000, 2)},
+                )
+            log_context.reset(token)
+
+
+class HandlerNameMiddleware(BaseMiddleware):
+    """Inner middleware (message/callback_query): tanlangan handler nomini kontekstga yozadi."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        ctx = log_context.get()
+        if ctx is not None:
+            ctx["handler"] = _handler_name(data)
+        return await handler(event, data)
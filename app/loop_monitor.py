@@ -0,0 +1,104 @@
+"""
+Event loop kechikishini o‘lchaydi: probe har ``interval`` da uxlab uyg‘onadi, kechikkan vaqti —
+loop ni boshqa kod band qilib turgani. Percentile lar ``loop_lag_seconds`` (``/metrics``) da.
+
+Watchdog thread loop ``threshold`` dan ko‘p javob bermasa, loop threadining stekini va joriy
+task (handler, update_id) ni ushlaydi — bloklayotgan sinxron kod aynan qaysi qatorda ekani ko‘rinadi.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from app import metrics
+from app.logs import log_context
+
+logger = logging.getLogger(__name__)
+
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+STACK_LIMIT = 30
+
+lag_seconds = metrics.histogram("loop_lag_seconds", "Event loop scheduling lag", buckets=LAG_BUCKETS)
+blocked_total = metrics.counter("loop_blocked_total", "Loop stalls longer than LOOP_BLOCK_MS")
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = 0.1, threshold: float = 0.25):
+        self.interval = interval
+        self.threshold = threshold
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._heartbeat = time.monotonic()
+        self._probe: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+        # Watchdog ushlagan stek; probe uyg‘onganda bitta yozuv bilan loglaydi
+        self._captured: str | None = None
+
+    def start(self) -> None:
+        if self._probe is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._probe = asyncio.create_task(self._run(), name="loop:monitor")
+        if self.threshold > 0:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._probe is not None:
+            self._probe.cancel()
+            await asyncio.gather(self._probe, return_exceptions=True)
+            self._probe = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.monotonic()
+            self._heartbeat = started
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            lag = max(0.0, now - started - self.interval)
+            lag_seconds.observe(lag)
+            if self.threshold > 0 and lag >= self.threshold:
+                blocked_total.inc()
+                captured, self._captured = self._captured, None
+                logger.warning(
+                    "Event loop blocked for %.0f ms%s",
+                    lag * 1000,
+                    f"\n{captured}" if captured else "",
+                    extra={"duration_ms": round(lag * 1000, 2)},
+                )
+
+    # --- Watchdog (alohida thread) ---
+    def _watch(self) -> None:
+        stalled = False
+        while not self._stopped.wait(self.threshold / 2):
+            behind = time.monotonic() - self._heartbeat - self.interval
+            if behind < self.threshold:
+                stalled = False
+            elif not stalled:
+                # Har bir to‘xtashda bir marta — eng boshidagi (sababchi) stek
+                stalled = True
+                self._captured = self._capture()
+
+    def _capture(self) -> str:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        lines = []
+        task = asyncio.current_task(self._loop)
+        if task is not None:
+            ctx = task.get_context().get(log_context) or {}
+            lines.append(
+                f"task={task.get_name()} handler={ctx.get('handler') or '-'} update_id={ctx.get('update_id') or '-'}"
+            )
+        if frame is not None:
+            lines.extend(line.rstrip() for line in traceback.format_stack(frame, limit=STACK_LIMIT))
+        return "\n".join(lines)
@@ -1,72 +1,172 @@
 import sys
+import time
 from pathlib import Path
 
+_STARTED = time.perf_counter()
+
 ROOT_DIR = Path(__file__).resolve().parent.parent
 # ensure the repository root is on sys.path so `app` imports work when running this file directly
 if str(ROOT_DIR) not in sys.path:
     sys.path.append(str(ROOT_DIR))
 
-import asyncio
 import logging
 from contextlib import asynccontextmanager
+from functools import partial
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
-from aiogram.types import BotCommand
 
+from app.broadcast import Broadcaster
+from app.cache import CacheListener
 from app.config import settings
-from app.db import models
-from app.db.session import engine
+from app.db.batcher import ReviewBatcher
+from app.db.schema import ensure_schema
+from app.db.session import SessionLocal, engine
+from app.digest import DigestScheduler
+from app.fsm_storage import TTLMemoryStorage
 from app.handlers import admin as admin_handlers
 from app.handlers import user as user_handlers
+from app.jobs import start_background_jobs, stop_background_jobs
+from app.keyboards import registry as keyboards
+from app.logs import HandlerNameMiddleware, UpdateLogMiddleware, setup_logging
+from app.loop_monitor import LoopMonitor
 from app.middlewares import DbSessionMiddleware
+from app import notify, runtime, tracing
+from app.sender import OutboundSender
+from app.startup import StartupReport, sync_bot_commands
 
-logging.basicConfig(level=logging.INFO)
 
 
-@asynccontextmanager
-async def lifespan(dp: Dispatcher):
-    async with engine.begin() as conn:
-        await conn.run_sync(models.Base.metadata.create_all)
-    yield
+ALLOWED_UPDATES = ["message", "callback_query"]
 
 
-async def main():
-    bot = Bot(
+def create_bot() -> Bot:
+    return Bot(
         token=settings.BOT_TOKEN,
+        session=runtime.bot_session(),
         default=DefaultBotProperties(parse_mode="HTML"),
     )
-    dp = Dispatcher(storage=MemoryStorage())
 
+
+def create_dispatcher(bot: Bot) -> Dispatcher:
+    storage = TTLMemoryStorage(
+        ttl=settings.FSM_TTL_SEC,
+        max_entries=settings.FSM_MAX_ENTRIES,
+        max_bytes=settings.FSM_MAX_MB * 1024 * 1024,
+        sweep_interval=settings.FSM_SWEEP_SEC,
+    )
+    dp = Dispatcher(storage=tracing.TracingStorage(storage) if settings.TRACING else storage)
+    # Barcha handlerlarga `sender` argumenti sifatida uzatiladi
+    dp["sender"] = OutboundSender.shard(bot, settings.OUTBOUND_SHARDS)
+
+    dp.update.outer_middleware(UpdateLogMiddleware())
+    if settings.TRACING:
+        # Log kontekstidan keyin — trace_id loglarga ham tushadi
+        dp.update.outer_middleware(tracing.TracingMiddleware())
     dp.update.middleware(DbSessionMiddleware())
+    # Ichki middleware lar child routerlarga ham tarqaladi
+    dp.message.middleware(HandlerNameMiddleware())
+    dp.callback_query.middleware(HandlerNameMiddleware())
     dp.include_router(user_handlers.router)
     dp.include_router(admin_handlers.router)
+    return dp
 
-    from app.i18n import I18N
-
-    t_uz = I18N("uz").t
-    t_ru = I18N("ru").t
-    await bot.set_my_commands(
-        [
-            BotCommand(command="start", description=t_uz("cmd.start", "Boshlash")),
-            BotCommand(
-                command="new_review",
-                description=t_uz("cmd.new_review", "Yangi sharh"),
-            ),
-            BotCommand(
-                command="new_review",
-                description=t_ru("cmd.new_review", "Новый отзыв"),
-            ),
-        ]
-    )
 
-    async with lifespan(dp):
-        await dp.start_polling(bot, allowed_updates=["message", "callback_query"])
+async def prepare(bot: Bot, report: StartupReport) -> None:
+    """Bir martalik startup ishlari (sxema, buyruqlar) — worker rejimida supervisor bajaradi."""
+    with report.phase("schema") as phase:
+        async with engine.begin() as conn:
+            applied = await ensure_schema(conn, force=not settings.FAST_START)
+        phase.note = "applied" if applied else "unchanged"
+    with report.phase("commands") as phase:
+        async with SessionLocal() as session:
+            updated = await sync_bot_commands(bot, session)
+        phase.note = f"{updated} updated" if updated else "unchanged"
+
+
+@asynccontextmanager
+async def serving(dp: Dispatcher, bot: Bot, report: StartupReport, worker: int = 0):
+    """
+    Har bir update qayta ishlovchi jarayon uchun: klaviaturalar, write-behind batcher,
+    FSM sweeper, fon ishlari, xabarnomalar (ikkalasi faqat 0-workerda) va gc.freeze.
+    """
+    with report.phase("keyboards") as phase:
+        phase.note = f"{keyboards.build()} markups"
+    dp.storage.start()
+    # Boshqa jarayonlardagi o‘zgarishlar (filiallar, adminlar, marshrutlar) keshdan darhol chiqariladi
+    cache_listener = CacheListener(engine.url)
+    cache_listener.start()
+    loop_monitor = LoopMonitor(settings.LOOP_MONITOR_INTERVAL_MS / 1000, settings.LOOP_BLOCK_MS / 1000)
+    loop_monitor.start()
+    if settings.TRACING:
+        tracing.start(bot, engine, worker)
+    batcher = None
+    if settings.REVIEW_BATCHING:
+        with report.phase("batcher") as phase:
+            batcher = ReviewBatcher(
+                Path(settings.REVIEW_JOURNAL_DIR) / f"worker-{worker}",
+                flush_ms=settings.REVIEW_BATCH_FLUSH_MS,
+                max_rows=settings.REVIEW_BATCH_MAX_ROWS,
+                on_flush=partial(notify.notify_reviews, dp["sender"]),
+            )
+            await batcher.start()
+            dp["batcher"] = batcher
+    broadcaster = digests = None
+    if worker == 0:
+        # Xabarnomalar bitta jarayonda yuboriladi — global limit bitta sender da hisoblanadi
+        broadcaster = Broadcaster(
+            bot,
+            dp["sender"],
+            rate=settings.BROADCAST_RATE,
+            concurrency=settings.BROADCAST_CONCURRENCY,
+        )
+        dp["broadcaster"] = broadcaster
+        digests = DigestScheduler(dp["sender"], settle_seconds=settings.ROLLUP_SETTLE_SEC)
+    tasks = start_background_jobs(bot, broadcaster, digests) if worker == 0 else []
+    runtime.freeze_startup()
+    report.log()
+    try:
+        yield
+    finally:
+        await stop_background_jobs(tasks)
+        if broadcaster is not None:
+            await broadcaster.stop()
+        if batcher is not None:
+            await batcher.stop()
+        await notify.drain()
+        await dp.storage.close()
+        await loop_monitor.stop()
+        await cache_listener.stop()
+        tracing.stop()
+
+
+@asynccontextmanager
+async def lifespan(dp: Dispatcher, bot: Bot, report: StartupReport):
+    await prepare(bot, report)
+    async with serving(dp, bot, report):
+        yield
+
+
+async def main():
+    report = StartupReport(started_at=_STARTED)
+    report.add("imports", time.perf_counter() - _STARTED)
+
+    bot = create_bot()
+    dp = create_dispatcher(bot)
+
+    async with lifespan(dp, bot, report):
+        await dp.start_polling(bot, allowed_updates=ALLOWED_UPDATES)
 
 
 if __name__ == "__main__":
+    setup_logging()
     try:
-        asyncio.run(main())
+        logging.info("Runtime: %s", runtime.configure())
+        if settings.WORKERS > 1:
+            from app.workers import Supervisor
+
+            runtime.run(Supervisor(settings.WORKERS).run())
+        else:
+            runtime.run(main())
     except (KeyboardInterrupt, SystemExit):
         logging.info("Bot to‘xtatildi")
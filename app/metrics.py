@@ -0,0 +1,158 @@
+import math
+import threading
+from collections import deque
+from typing import Iterable
+
+# Latency histogrammalari uchun standart chegaralar (sekund)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RESERVOIR_SIZE = 2048
+
+
+def _fmt_labels(labels: dict[str, str], **extra: str) -> str:
+    items = {**labels, **extra}
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in sorted(items.items())) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str = "", labels: dict[str, str] | None = None):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.value = 0
+
+    def inc(self, n: int = 1) -> None:
+        self.value += n
+
+
+class Gauge:
+    def __init__(self, name: str, help: str = "", labels: dict[str, str] | None = None):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, n: float = 1) -> None:
+        self.value += n
+
+    def dec(self, n: float = 1) -> None:
+        self.value -= n
+
+
+class Histogram:
+    """Bucket lar (Prometheus uslubida) + oxirgi kuzatuvlar rezervuari (percentile lar uchun)."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str = "",
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+        labels: dict[str, str] | None = None,
+    ):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._recent: deque[float] = deque(maxlen=RESERVOIR_SIZE)
+        # watchdog kabi boshqa threadlar ham yozishi mumkin
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            i = 0
+            while i < len(self.buckets) and value > self.buckets[i]:
+                i += 1
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+            self._recent.append(value)
+
+    def quantile(self, q: float) -> float | None:
+        with self._lock:
+            values = sorted(self._recent)
+        if not values:
+            return None
+        return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+class Registry:
+    """
+    Metrikalar ``nom{label="..."}`` kaliti bo‘yicha saqlanadi: bir xil nom turli label lar
+    bilan alohida seriya (masalan, ``fsm_active_states{state="ReviewForm:text"}``).
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Gauge | Histogram] = {}
+
+    def _get(self, cls, name: str, labels: dict[str, str], **kwargs):
+        key = name + _fmt_labels(labels)
+        metric = self._metrics.get(key)
+        if metric is None:
+            metric = self._metrics[key] = cls(name, labels=labels, **kwargs)
+        elif not isinstance(metric, cls):
+            raise TypeError(f"Metric {name} is already registered as {type(metric).__name__}")
+        return metric
+
+    def counter(self, name: str, help: str = "", **labels: str) -> Counter:
+        return self._get(Counter, name, labels, help=help)
+
+    def gauge(self, name: str, help: str = "", **labels: str) -> Gauge:
+        return self._get(Gauge, name, labels, help=help)
+
+    def histogram(
+        self, name: str, help: str = "", buckets: Iterable[float] = DEFAULT_BUCKETS, **labels: str
+    ) -> Histogram:
+        return self._get(Histogram, name, labels, help=help, buckets=buckets)
+
+    def snapshot(self) -> dict[str, float | dict]:
+        out: dict[str, float | dict] = {}
+        for key, m in sorted(self._metrics.items()):
+            if isinstance(m, Histogram):
+                out[key] = {
+                    "count": m.count,
+                    "sum": round(m.sum, 6),
+                    "p50": m.quantile(0.5),
+                    "p95": m.quantile(0.95),
+                    "p99": m.quantile(0.99),
+                }
+            else:
+                out[key] = m.value
+        return out
+
+    def render(self) -> str:
+        """Prometheus text formati."""
+        lines: list[str] = []
+        described: set[str] = set()
+        # Bir nomdagi seriyalar ketma-ket turishi kerak
+        for _, m in sorted(self._metrics.items(), key=lambda item: (item[1].name, item[0])):
+            name = m.name
+            if name not in described:
+                described.add(name)
+                if m.help:
+                    lines.append(f"# HELP {name} {m.help}")
+                kind = "histogram" if isinstance(m, Histogram) else "counter" if isinstance(m, Counter) else "gauge"
+                lines.append(f"# TYPE {name} {kind}")
+            if isinstance(m, Histogram):
+                cumulative = 0
+                for bound, c in zip(m.buckets, m.counts):
+                    cumulative += c
+                    lines.append(f"{name}_bucket{_fmt_labels(m.labels, le=str(bound))} {cumulative}")
+                lines.append(f"{name}_bucket{_fmt_labels(m.labels, le='+Inf')} {m.count}")
+                lines.append(f"{name}_sum{_fmt_labels(m.labels)} {m.sum}")
+                lines.append(f"{name}_count{_fmt_labels(m.labels)} {m.count}")
+            else:
+                lines.append(f"{name}{_fmt_labels(m.labels)} {m.value}")
+        return "\n".join(lines)
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
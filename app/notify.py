@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from aiogram.types import InputMediaPhoto
+
+from app import cache, cards
+from app.db import crud
+from app.db.models import Review
+from app.db.session import SessionLocal
+from app.sender import OutboundSender
+
+logger = logging.getLogger(__name__)
+
+# Zaxira: LISTEN ulanishi uzilgan bo‘lsa ham shundan keyin qayta o‘qiladi
+ROUTES_TTL = 300.0
+# Shundan past baholar dayjest rejimida ham darhol yuboriladi
+LOW_RATING = 2
+
+
+@dataclass(frozen=True)
+class RouteTable:
+    """
+    ``notification_routes`` va ``digest_settings`` ning xotiradagi nusxasi: filial → chat ID lar,
+    chat → dayjest rejimi. ``routes`` kesh regionida turadi — ``/setgroup`` va ``/digest``
+    o‘zgarishlari NOTIFY orqali barcha jarayonlarda darhol ko‘rinadi.
+    """
+
+    all_chats: tuple[int, ...]
+    by_branch: dict[int, tuple[int, ...]]
+    by_chat: dict[int, tuple[int, ...] | None]
+    # chat_id → instant_low (dayjest rejimidagi chatlar)
+    digests: dict[int, bool]
+
+    def chats_for(self, branch_id: int) -> tuple[int, ...]:
+        return self.by_branch.get(branch_id, self.all_chats)
+
+    def branches_for(self, chat_id: int) -> tuple[int, ...] | None:
+        """Chat oladigan filiallar: None — barchasi, ``()`` — chat marshrutda yo‘q."""
+        return self.by_chat.get(chat_id, ())
+
+    def sends_now(self, chat_id: int, review: Review) -> bool:
+        """Dayjest rejimidagi chatga faqat past baho (``instant_low`` yoqilgan bo‘lsa) darhol ketadi."""
+        instant_low = self.digests.get(chat_id)
+        if instant_low is None:
+            return True
+        return instant_low and review.rating is not None and review.rating <= LOW_RATING
+
+
+routes_cache = cache.region("routes", ttl=ROUTES_TTL)
+
+
+async def _load_routes() -> RouteTable:
+    async with SessionLocal() as session:
+        rows = await crud.list_notification_routes(session)
+        digests = await crud.list_digest_settings(session)
+    all_chats = {chat_id for chat_id, branch_id in rows if branch_id is None}
+    by_branch: dict[int, set[int]] = {}
+    by_chat: dict[int, set[int] | None] = {chat_id: None for chat_id in all_chats}
+    for chat_id, branch_id in rows:
+        if branch_id is not None:
+            by_branch.setdefault(branch_id, set(all_chats)).add(chat_id)
+            if chat_id not in all_chats:
+                by_chat.setdefault(chat_id, set()).add(branch_id)
+    return RouteTable(
+        all_chats=tuple(sorted(all_chats)),
+        by_branch={b: tuple(sorted(chats)) for b, chats in by_branch.items()},
+        by_chat={c: None if b is None else tuple(sorted(b)) for c, b in by_chat.items()},
+        digests={d.chat_id: d.instant_low for d in digests},
+    )
+
+
+async def route_table() -> RouteTable:
+    return await routes_cache.get("all", _load_routes)
+
+
+async def _send_review(sender: OutboundSender, chat_id: int, caption: str, photos: list[str]) -> bool:
+    try:
+        if not photos:
+            await sender.send_message(chat_id, caption, parse_mode="HTML")
+        elif len(photos) == 1:
+            await sender.send_photo(chat_id, photos[0], caption=caption, parse_mode="HTML")
+        else:
+            media = [InputMediaPhoto(media=photos[0], caption=caption, parse_mode="HTML")]
+            media.extend(InputMediaPhoto(media=file_id) for file_id in photos[1:])
+            await sender.send_media_group(chat_id, media)
+    except Exception as e:
+        logger.warning("Review notification to %s failed: %s", chat_id, e)
+        return False
+    return True
+
+
+async def notify_review(sender: OutboundSender, review: Review) -> int:
+    """
+    Sharhni filialga mos barcha chatlarga bir vaqtda yuboradi (har bir chat limiti
+    ``sender`` da); yetkazilganlar sonini qaytaradi.
+    """
+    table = await route_table()
+    chat_ids = table.chats_for(review.branch_id)
+    if not chat_ids:
+        logger.warning("No notification route for branch %s (review #%s)", review.branch_id, review.id)
+        return 0
+    # Dayjest rejimidagi chatlar sharhni keyinroq umumlashma ichida oladi
+    chat_ids = [chat_id for chat_id in chat_ids if table.sends_now(chat_id, review)]
+    if not chat_ids:
+        return 0
+    card = cards.review_card(review, kind="new")
+    caption = card.caption
+    photos = [p.file_id for p in card.photos]
+    results = await asyncio.gather(*(_send_review(sender, chat_id, caption, photos) for chat_id in chat_ids))
+    return sum(results)
+
+
+async def notify_reviews(sender: OutboundSender, review_ids: list[int]) -> None:
+    async with SessionLocal() as session:
+        reviews = await crud.get_reviews_for_notify(session, review_ids)
+    # Bitta chatga tushadiganlar tartibi saqlanadi: slotlar yaratilish tartibida band qilinadi
+    await asyncio.gather(*(notify_review(sender, review) for review in reviews))
+
+
+_pending: set[asyncio.Task] = set()
+
+
+def schedule_notify(sender: OutboundSender, review_ids: list[int]) -> None:
+    """Foydalanuvchi javobini kutdirmaslik uchun xabarlar fon vazifasida yuboriladi."""
+    task = asyncio.create_task(_notify_safely(sender, review_ids))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+async def _notify_safely(sender: OutboundSender, review_ids: list[int]) -> None:
+    try:
+        await notify_reviews(sender, review_ids)
+    except Exception:
+        logger.exception("Review notification failed for %s", review_ids)
+
+
+async def drain() -> None:
+    """To‘xtashdan oldin navbatdagi xabarlarni yuborib bo‘lish."""
+    await asyncio.gather(*_pending, return_exceptions=True)
@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+from pathlib import Path
+
+from aiogram import Bot
+from aiogram.types import FSInputFile
+
+from app.botapi import local_file_path
+from app.config import settings
+from app.db import crud
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 200
+MAX_ATTEMPTS = 3
+
+
+def _hash_file(path: Path) -> tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _copy_into_place(src: Path, dest: Path) -> None:
+    if dest.exists():
+        return
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_suffix(dest.suffix + ".part")
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dest)
+
+
+def _move_into_place(tmp: Path, dest: Path) -> None:
+    if dest.exists():
+        # Xuddi shu kontent allaqachon bor (boshqa file_unique_id bilan) — nusxa kerak emas
+        tmp.unlink(missing_ok=True)
+        return
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(tmp, dest)
+
+
+class PhotoArchive:
+    """
+    Telegram rasmlarini lokal kontent-manzilli omborga (sha256) yuklab oladi.
+    Har bir file_unique_id faqat bir marta yuklanadi; progress job_watermarks da saqlanadi.
+    """
+
+    def __init__(self, bot: Bot, root: str | Path, concurrency: int = 4):
+        self.bot = bot
+        self.root = Path(root)
+        self.concurrency = max(1, concurrency)
+        self._failures: dict[int, int] = {}
+
+    def relative_path(self, sha256: str, ext: str = ".jpg") -> str:
+        return f"{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}"
+
+    def local_path(self, relative: str) -> Path:
+        return self.root / relative
+
+    async def _archive_one(self, photo_id: int, file_id: str) -> None:
+        file = await self.bot.get_file(file_id)
+        ext = Path(file.file_path or "").suffix or ".jpg"
+        src = local_file_path(self.bot.session.api, file.file_path)
+        if src is not None:
+            # Local Bot API: fayl allaqachon diskda — HTTP yuklashsiz o‘qiladi
+            sha256, size = await asyncio.to_thread(_hash_file, src)
+            relative = self.relative_path(sha256, ext)
+            await asyncio.to_thread(_copy_into_place, src, self.local_path(relative))
+        else:
+            tmp_dir = self.root / "tmp"
+            tmp_dir.mkdir(parents=True, exist_ok=True)
+            tmp = tmp_dir / f"{file.file_unique_id}.part"
+            try:
+                await self.bot.download_file(file.file_path, destination=tmp)
+                sha256, size = await asyncio.to_thread(_hash_file, tmp)
+                relative = self.relative_path(sha256, ext)
+                await asyncio.to_thread(_move_into_place, tmp, self.local_path(relative))
+            finally:
+                tmp.unlink(missing_ok=True)
+        async with SessionLocal() as session:
+            await crud.save_photo_blob(
+                session,
+                photo_id=photo_id,
+                file_unique_id=file.file_unique_id,
+                sha256=sha256,
+                path=relative,
+                size=size,
+            )
+
+    async def _worker(self, queue: asyncio.Queue, failed: list[int]) -> None:
+        while True:
+            try:
+                photo_id, file_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                await self._archive_one(photo_id, file_id)
+                self._failures.pop(photo_id, None)
+            except Exception as e:
+                attempts = self._failures.get(photo_id, 0) + 1
+                self._failures[photo_id] = attempts
+                if attempts < MAX_ATTEMPTS:
+                    failed.append(photo_id)
+                logger.warning("Photo #%s archive failed (attempt %s): %s", photo_id, attempts, e)
+
+    async def run_once(self) -> int:
+        """Bitta partiyani arxivlaydi; ko‘rib chiqilgan rasmlar sonini qaytaradi."""
+        async with SessionLocal() as session:
+            after_id = await crud.get_watermark(session, crud.PHOTO_ARCHIVE_WATERMARK)
+            await session.commit()
+            rows = await crud.list_photos_to_archive(session, after_id=after_id, limit=BATCH_SIZE)
+        if not rows:
+            return 0
+
+        queue: asyncio.Queue = asyncio.Queue()
+        seen: set[str] = set()
+        for photo_id, file_id, file_unique_id in rows:
+            # Bir partiyadagi bir xil rasmlar bir marta yuklanadi
+            if file_unique_id and file_unique_id in seen:
+                continue
+            if file_unique_id:
+                seen.add(file_unique_id)
+            queue.put_nowait((photo_id, file_id))
+
+        failed: list[int] = []
+        workers = [self._worker(queue, failed) for _ in range(min(self.concurrency, queue.qsize()))]
+        await asyncio.gather(*workers)
+
+        # Muvaffaqiyatsizlar qayta urinilishi uchun watermark ulardan oldinda to‘xtaydi
+        watermark = min(failed) - 1 if failed else rows[-1][0]
+        if watermark > after_id:
+            async with SessionLocal() as session:
+                await crud.get_watermark(session, crud.PHOTO_ARCHIVE_WATERMARK)
+                await crud.set_watermark(session, crud.PHOTO_ARCHIVE_WATERMARK, watermark)
+                await session.commit()
+        return len(rows)
+
+    async def run(self) -> None:
+        while await self.run_once() >= BATCH_SIZE:
+            pass
+
+    def input_file(self, relative: str) -> FSInputFile:
+        return FSInputFile(self.local_path(relative))
+
+
+async def blob_paths(session, photos) -> dict[str, str]:
+    """
+    ``photos`` dagi arxivlangan rasmlarning lokal yo‘llari — butun ro‘yxat uchun bitta so‘rov
+    (PHOTO_ARCHIVE_SERVE_LOCAL o‘chiq bo‘lsa so‘rovsiz bo‘sh).
+    """
+    if not settings.PHOTO_ARCHIVE_SERVE_LOCAL:
+        return {}
+    return await crud.get_photo_blob_paths(session, list({p.file_unique_id for p in photos if p.file_unique_id}))
+
+
+def photo_sources(photos, paths: dict[str, str]) -> list:
+    """
+    ``ReviewPhoto`` lar uchun yuborish manbasi: arxivda bo‘lsa lokal fayl, aks holda Telegram
+    file_id. ``paths`` — ``blob_paths`` natijasi.
+    """
+    root = Path(settings.PHOTO_ARCHIVE_DIR)
+    sources = []
+    for p in photos:
+        relative = paths.get(p.file_unique_id)
+        if relative and (root / relative).exists():
+            sources.append(FSInputFile(root / relative))
+        else:
+            sources.append(p.file_id)
+    return sources
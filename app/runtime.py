@@ -0,0 +1,227 @@
+import asyncio
+import gc
+import json
+import logging
+import os
+from typing import Any, Awaitable, Callable
+
+from app import botapi
+from app.config import settings
+
+try:  # uvloop Windows da yo‘q
+    import uvloop
+except ImportError:  # pragma: no cover
+    uvloop = None
+
+try:  # orjson ixtiyoriy: bo‘lmasa stdlib json ishlatiladi
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+PROFILES = ("default", "performance")
+# Startupdan keyin ko‘p uzoq yashovchi obyektlar bor — 0-avlod kamroq yig‘iladi
+GC_THRESHOLDS = (50_000, 20, 100)
+
+
+def _std_dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def _orjson_dumps(obj: Any) -> str:
+    return orjson.dumps(obj).decode("utf-8")
+
+
+_loads: Callable[[str | bytes], Any] = json.loads
+_dumps: Callable[[Any], str] = _std_dumps
+
+
+def _performance() -> bool:
+    return settings.RUNTIME_PROFILE == "performance"
+
+
+def json_loads(data: str | bytes) -> Any:
+    return _loads(data)
+
+
+def json_dumps(obj: Any) -> str:
+    return _dumps(obj)
+
+
+def configure() -> dict[str, str]:
+    """
+    ``RUNTIME_PROFILE`` bo‘yicha jarayonni sozlaydi; event loop yaratilishidan oldin chaqiriladi.
+    Tanlangan komponentlar (loop, json, gc) ni qaytaradi.
+    """
+    global _loads, _dumps
+    profile = settings.RUNTIME_PROFILE
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown RUNTIME_PROFILE: {profile}")
+
+    info = {"profile": profile, "loop": "asyncio", "json": "json", "gc": "default"}
+    if profile != "performance":
+        _loads, _dumps = json.loads, _std_dumps
+        return info
+
+    if uvloop is not None:
+        info["loop"] = "uvloop"
+    else:
+        logger.warning("RUNTIME_PROFILE=performance, but uvloop is not installed")
+    if orjson is not None:
+        _loads, _dumps = orjson.loads, _orjson_dumps
+        info["json"] = "orjson"
+    else:
+        logger.warning("RUNTIME_PROFILE=performance, but orjson is not installed")
+    gc.set_threshold(*GC_THRESHOLDS)
+    info["gc"] = "tuned"
+    return info
+
+
+def run(main: Awaitable[Any]) -> Any:
+    """``asyncio.run`` ning profilga mos varianti (performance da uvloop)."""
+    loop_factory = uvloop.new_event_loop if _performance() and uvloop is not None else None
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        return runner.run(main)
+
+
+def bot_session(**kwargs: Any) -> botapi.PooledAiohttpSession:
+    """Bot API sessiyasi: javoblarni o‘qish va so‘rov parametrlarini yozish tanlangan json bilan."""
+    return botapi.create_session(json_loads=_loads, json_dumps=_dumps, **kwargs)
+
+
+def freeze_startup() -> None:
+    """
+    Startup davomida yaratilgan obyektlarni (modullar, kataloglar, klaviaturalar)
+    GC kuzatuvidan chiqaradi — keyingi yig‘ishlar ularni qayta skanerlamaydi.
+    """
+    if not _performance():
+        return
+    gc.collect()
+    gc.freeze()
+    logger.info("gc.freeze: %s objects", gc.get_freeze_count())
+
+
+# --- Benchmark: python -m app.runtime ---
+
+BENCH_UPDATES = 20_000
+BENCH_BATCH = 100
+
+
+def _bench_payload(offset: int) -> bytes:
+    updates = []
+    for i in range(BENCH_BATCH):
+        uid = offset + i
+        updates.append({
+            "update_id": uid,
+            "callback_query": {
+                "id": str(uid),
+                "chat_instance": "1",
+                "data": f"branch:{uid % 50}",
+                "from": {"id": 1000 + uid % 500, "is_bot": False, "first_name": "Bench", "language_code": "uz"},
+                "message": {
+                    "message_id": uid,
+                    "date": 1_700_000_000,
+                    "chat": {"id": 1000 + uid % 500, "type": "private"},
+                    "text": "Filialni tanlang / Выберите филиал",
+                },
+            },
+        })
+    return json.dumps({"ok": True, "result": updates}, ensure_ascii=False).encode("utf-8")
+
+
+async def _bench_profile() -> dict[str, float]:
+    import time
+
+    from aiogram import Bot, Dispatcher, Router
+    from aiogram.fsm.storage.memory import MemoryStorage
+    from aiogram.methods import EditMessageText
+    from aiogram.types import CallbackQuery, Update
+
+    from app.i18n import I18N
+    from app.keyboards import review_menu_kb
+
+    bot = Bot("42:BENCH", session=bot_session())
+    router = Router()
+    dp = Dispatcher(storage=MemoryStorage())
+    dp.include_router(router)
+    session = bot.session
+
+    @router.callback_query()
+    async def on_branch(cb: CallbackQuery, state):
+        # Polling dagi handlerga o‘xshash: FSM yozish + javob so‘rovini serializatsiya qilish
+        await state.update_data(branch_id=int(cb.data.split(":")[1]), photos=[])
+        t = I18N(cb.from_user.language_code or "uz").t
+        method = EditMessageText(
+            chat_id=cb.message.chat.id,
+            message_id=cb.message.message_id,
+            text=t("choose_rating", "Bahoni tanlang"),
+            reply_markup=review_menu_kb(t, can_submit=True),
+        )
+        form = {k: session.prepare_value(v, bot=bot, files={}) for k, v in method.model_dump(warnings=False).items()}
+        return form
+
+    payloads = [_bench_payload(i * BENCH_BATCH) for i in range(BENCH_UPDATES // BENCH_BATCH)]
+    latencies: list[float] = []
+    freeze_startup()
+
+    gc0 = gc.get_stats()[0]["collections"]
+    started = time.perf_counter()
+    for raw in payloads:
+        batch = session.json_loads(raw)["result"]
+
+        async def one(data: dict) -> None:
+            t0 = time.perf_counter()
+            await dp.feed_update(bot, Update.model_validate(data, context={"bot": bot}))
+            latencies.append(time.perf_counter() - t0)
+
+        await asyncio.gather(*(one(u) for u in batch))
+    elapsed = time.perf_counter() - started
+    await session.close()
+
+    latencies.sort()
+    n = len(latencies)
+    return {
+        "updates_per_sec": n / elapsed,
+        "p50_ms": latencies[n // 2] * 1e3,
+        "p99_ms": latencies[int(n * 0.99)] * 1e3,
+        "gc_gen0": gc.get_stats()[0]["collections"] - gc0,
+    }
+
+
+def _bench() -> None:
+    """Har bir profil alohida jarayonda ishga tushiriladi (loop policy va gc holati toza)."""
+    import subprocess
+    import sys
+
+    for profile in PROFILES:
+        env = {**os.environ, "RUNTIME_PROFILE": profile}
+        out = subprocess.run(
+            [sys.executable, "-m", "app.runtime", "--child"],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        print(f"{profile:<12} {out}")
+
+
+def _bench_child() -> None:
+    info = configure()
+    from app.i18n import I18N  # noqa: F401 — kataloglar startupda yuklanadi
+
+    result = run(_bench_profile())
+    print(
+        f"loop={info['loop']} json={info['json']} "
+        f"{result['updates_per_sec']:.0f} upd/s  p50={result['p50_ms']:.2f}ms  "
+        f"p99={result['p99_ms']:.2f}ms  gc0={result['gc_gen0']}"
+    )
+
+
+if __name__ == "__main__":
+    import sys
+
+    # __main__ emas, app.runtime moduli sozlanishi kerak (i18n u orqali o‘qiydi)
+    from app import runtime
+
+    if "--child" in sys.argv:
+        runtime._bench_child()
+    else:
+        runtime._bench()
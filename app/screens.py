@@ -0,0 +1,81 @@
+import logging
+from contextlib import suppress
+from typing import Any
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, Message
+
+logger = logging.getLogger(__name__)
+
+# FSM data dagi joriy "panel" xabarining ID si
+PANEL_KEY = "_panel_id"
+
+
+async def answer(cb: CallbackQuery, text: str | None = None, **kwargs: Any) -> None:
+    """Spinnerni darhol to‘xtatadi; callback allaqachon javob berilgan/eskirgan bo‘lsa jim o‘tadi."""
+    with suppress(TelegramBadRequest):
+        await cb.answer(text, **kwargs)
+
+
+def _not_modified(e: TelegramBadRequest) -> bool:
+    return "message is not modified" in e.message
+
+
+async def _edit(bot, chat_id: int, message_id: int, text: str, reply_markup, **kwargs) -> bool:
+    try:
+        await bot.edit_message_text(
+            chat_id=chat_id, message_id=message_id, text=text, reply_markup=reply_markup, **kwargs
+        )
+    except TelegramBadRequest as e:
+        if _not_modified(e):
+            return True
+        # O‘chirilgan, rasmli yoki boshqa sabab bilan tahrirlab bo‘lmaydigan xabar
+        logger.debug("Panel %s in chat %s is not editable: %s", message_id, chat_id, e.message)
+        return False
+    return True
+
+
+async def render(
+    event: CallbackQuery | Message,
+    state: FSMContext,
+    text: str,
+    reply_markup: Any = None,
+    answered: bool = False,
+    track: bool = True,
+    **kwargs: Any,
+) -> int:
+    """
+    Foydalanuvchining "panel" xabarini ``text``/``reply_markup`` bilan ko‘rsatadi.
+
+    Callback dan kelganda panel joyida tahrirlanadi (bitta so‘rov) va callback darhol
+    javoblanadi. Yangi xabar faqat tahrirlash imkonsiz bo‘lganda yuboriladi: foydalanuvchi
+    xabariga javob, reply-klaviatura yoki panel o‘chirilgan/rasmli bo‘lsa.
+    ``track=False`` — suhbatning oxirgi ekrani: panel ID si FSM ga yozilmaydi (yozuv qayta tug‘ilmaydi).
+    Panel xabarining ID sini qaytaradi.
+    """
+    bot = event.bot
+    editable = reply_markup is None or isinstance(reply_markup, InlineKeyboardMarkup)
+
+    if isinstance(event, CallbackQuery):
+        if not answered:
+            await answer(event)
+        chat_id = event.message.chat.id if event.message else event.from_user.id
+        if editable:
+            message = event.message
+            if isinstance(message, Message) and message.text is not None:
+                target = message.message_id
+            else:
+                # 48 soatdan eski xabarlar "inaccessible" keladi — kuzatilgan panel ID si ishlatiladi
+                target = (await state.get_data()).get(PANEL_KEY)
+            if target and await _edit(bot, chat_id, target, text, reply_markup, **kwargs):
+                if track:
+                    await state.update_data({PANEL_KEY: target})
+                return target
+    else:
+        chat_id = event.chat.id
+
+    sent = await bot.send_message(chat_id=chat_id, text=text, reply_markup=reply_markup, **kwargs)
+    if track:
+        await state.update_data({PANEL_KEY: sent.message_id})
+    return sent.message_id
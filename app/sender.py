@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Awaitable, Callable, Iterable
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+# Telegram Bot API limitlari
+TEXT_LIMIT = 4096
+GLOBAL_RATE = 30          # ~30 xabar / sekund (butun bot uchun)
+PRIVATE_INTERVAL = 1.0    # bitta chatga ~1 xabar / sekund
+GROUP_INTERVAL = 3.0      # guruhga ~20 xabar / minut
+MAX_RETRIES = 5
+
+
+class _SlotScheduler:
+    """Books the next free send slot per key.
+
+    Every caller reserves its slot synchronously (no await in between), so
+    concurrent senders are queued in FIFO order without locks.
+    """
+
+    def __init__(self):
+        self._next: dict[Any, float] = {}
+
+    def reserve(self, key: Any, interval: float, cost: int = 1) -> float:
+        now = time.monotonic()
+        slot = max(now, self._next.get(key, 0.0))
+        self._next[key] = slot + interval * cost
+        if len(self._next) > 10_000:
+            self._prune(now)
+        return slot - now
+
+    def delay(self, key: Any, seconds: float) -> None:
+        now = time.monotonic()
+        self._next[key] = max(self._next.get(key, 0.0), now + seconds)
+
+    def _prune(self, now: float) -> None:
+        for key in [k for k, v in self._next.items() if v < now]:
+            del self._next[key]
+
+
+# Uzun matn bo‘linadigan joylar, afzallik tartibida: karta, qator, so‘z chegarasi
+_BREAKS = ("\n\n", "\n", " ")
+_TAG_RE = re.compile(r"<[^>]*>")
+
+
+def _tag_name(tag: str) -> str:
+    return re.match(r"</?\s*([a-zA-Z0-9-]*)", tag).group(1).lower()
+
+
+def _cut_point(text: str, limit: int, start: int = 0) -> tuple[int, tuple[str, ...]]:
+    """
+    Last position ``start < pos <= limit`` where an HTML ``text`` can be split, never inside
+    a tag or ``&entity;``, and the opening tags still open there. Positions with no element
+    open are preferred, then card, line and word boundaries; a chunk cut inside an element
+    must still fit ``limit`` after its open tags are closed. Returns ``(0, ())`` if there is
+    no such position.
+    """
+    best: dict[str, tuple[int, tuple[str, ...]]] = {}
+    inside_best: dict[str, tuple[int, tuple[str, ...]]] = {}
+    anywhere = inside = (0, ())
+    stack: list[str] = []
+    closers = 0
+    i = 0
+    while i <= limit and i < len(text):
+        if i > start and i + closers <= limit:
+            if not stack:
+                anywhere = (i, ())
+                target = best
+            else:
+                inside = (i, tuple(stack))
+                target = inside_best
+            for brk in _BREAKS:
+                if text.startswith(brk, i):
+                    target[brk] = anywhere if not stack else inside
+                    break
+        char = text[i]
+        if char == "<":
+            end = text.find(">", i)
+            if end < 0:
+                break
+            tag = text[i:end + 1]
+            if tag.startswith("</"):
+                if stack:
+                    closers -= len(_tag_name(stack.pop())) + 3
+            elif not tag.endswith("/>"):
+                stack.append(tag)
+                closers += len(_tag_name(tag)) + 3
+            i = end + 1
+            continue
+        if char == "&":
+            end = text.find(";", i, i + 12)
+            i = end + 1 if end > 0 else i + 1
+        else:
+            i += 1
+    for brk in _BREAKS:
+        if brk in best:
+            return best[brk]
+    if anywhere[0]:
+        return anywhere
+    for brk in _BREAKS:
+        if brk in inside_best:
+            return inside_best[brk]
+    return inside
+
+
+def _split_long(text: str, limit: int) -> list[str]:
+    """
+    Split ``text`` into chunks of at most ``limit`` that are each valid HTML on their own:
+    an element cut in two is closed at the end of one chunk and reopened in the next. If
+    the reopened tags leave no room for text, the rest is sent as plain text.
+    """
+    parts = []
+    prefix = ""
+    while len(text) > limit:
+        cut, opened = _cut_point(text, limit, len(prefix))
+        if not cut:
+            # Teglarning o‘zi limitga sig‘maydi — qolganini oddiy matn qilib yuboramiz
+            text = _TAG_RE.sub("", text)
+            prefix = ""
+            cut = _cut_point(text, limit)[0] or limit
+            opened = ()
+        closing = "".join(f"</{_tag_name(tag)}>" for tag in reversed(opened))
+        head = text[:cut].rstrip() + closing
+        prefix = "".join(opened)
+        text = prefix + text[cut:].lstrip()
+        if _TAG_RE.sub("", head).strip():
+            parts.append(head)
+    if _TAG_RE.sub("", text).strip():
+        parts.append(text)
+    return parts
+
+
+def pack_texts(texts: Iterable[str], sep: str = "\n\n", limit: int = TEXT_LIMIT) -> list[str]:
+    """
+    Merge consecutive texts into as few messages as fit into ``limit``. A text longer than
+    ``limit`` is split at card/line/word boundaries, never inside HTML markup; every chunk is
+    valid HTML on its own.
+    """
+    chunks: list[str] = []
+    current = ""
+    for text in texts:
+        if len(text) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            *full, text = _split_long(text, limit) or [""]
+            chunks.extend(full)
+        if not text:
+            continue
+        if current and len(current) + len(sep) + len(text) <= limit:
+            current = f"{current}{sep}{text}"
+        else:
+            if current:
+                chunks.append(current)
+            current = text
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class OutboundSender:
+    """Rate-limited wrapper around ``Bot`` for every outgoing message.
+
+    Enforces the global and per-chat flood limits and retries on
+    ``TelegramRetryAfter`` instead of failing the handler.
+    """
+
+    GLOBAL_KEY = "*"
+
+    def __init__(
+        self,
+        bot: Bot,
+        global_rate: float = GLOBAL_RATE,
+        private_interval: float = PRIVATE_INTERVAL,
+        group_interval: float = GROUP_INTERVAL,
+        max_retries: int = MAX_RETRIES,
+    ):
+        self.bot = bot
+        self.global_interval = 1.0 / global_rate
+        self.private_interval = private_interval
+        self.group_interval = group_interval
+        self.max_retries = max_retries
+        self._slots = _SlotScheduler()
+
+    @classmethod
+    def shard(cls, bot: Bot, shards: int = 1) -> "OutboundSender":
+        """
+        One of ``shards`` independent senders (one per worker process) sharing the bot's limits.
+
+        Any worker may post to the same group, so the global rate and the group interval are
+        split evenly. Private chats keep the full rate: updates of a chat always go to one worker.
+        """
+        shards = max(1, shards)
+        return cls(bot, global_rate=GLOBAL_RATE / shards, group_interval=GROUP_INTERVAL * shards)
+
+    def _chat_interval(self, chat_id: int | str) -> float:
+        # Guruh va kanallarning ID si manfiy bo‘ladi
+        if isinstance(chat_id, int) and chat_id < 0:
+            return self.group_interval
+        return self.private_interval
+
+    async def _acquire(self, chat_id: int | str, cost: int) -> None:
+        wait = self._slots.reserve(chat_id, self._chat_interval(chat_id), cost)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        wait = self._slots.reserve(self.GLOBAL_KEY, self.global_interval, cost)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def call(
+        self,
+        chat_id: int | str,
+        factory: Callable[[], Awaitable[Any]],
+        cost: int = 1,
+    ) -> Any:
+        """Run ``factory()`` once a slot for ``chat_id`` is free, honoring ``retry_after``."""
+        attempt = 0
+        while True:
+            await self._acquire(chat_id, cost)
+            try:
+                return await factory()
+            except TelegramRetryAfter as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                logger.warning("Flood limit for chat %s, retry after %ss", chat_id, e.retry_after)
+                self._slots.delay(chat_id, e.retry_after)
+
+    async def send_message(self, chat_id: int | str, text: str, **kwargs):
+        return await self.call(chat_id, lambda: self.bot.send_message(chat_id=chat_id, text=text, **kwargs))
+
+    async def send_photo(self, chat_id: int | str, photo, **kwargs):
+        return await self.call(chat_id, lambda: self.bot.send_photo(chat_id=chat_id, photo=photo, **kwargs))
+
+    async def send_media_group(self, chat_id: int | str, media: list, **kwargs):
+        # Albomdagi har bir rasm alohida xabar sifatida hisoblanadi
+        return await self.call(
+            chat_id,
+            lambda: self.bot.send_media_group(chat_id=chat_id, media=media, **kwargs),
+            cost=max(1, len(media)),
+        )
+
+    async def send_document(self, chat_id: int | str, document, **kwargs):
+        return await self.call(chat_id, lambda: self.bot.send_document(chat_id=chat_id, document=document, **kwargs))
+
+    async def send_texts(self, chat_id: int | str, texts: Iterable[str], sep: str = "\n\n", **kwargs) -> int:
+        """Send ``texts`` merged into as few messages as possible; returns the message count."""
+        chunks = pack_texts(texts, sep=sep)
+        for chunk in chunks:
+            await self.send_message(chat_id, chunk, **kwargs)
+        return len(chunks)
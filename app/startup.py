@@ -0,0 +1,90 @@
+import hashlib
+import json
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from aiogram import Bot
+from aiogram.types import BotCommand
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import crud
+from app.i18n import I18N
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Phase:
+    name: str
+    ms: float = 0.0
+    note: str = ""
+
+
+@dataclass
+class StartupReport:
+    """Startup bosqichlari bo‘yicha vaqt hisoboti."""
+
+    started_at: float = field(default_factory=time.perf_counter)
+    phases: list[Phase] = field(default_factory=list)
+
+    def add(self, name: str, seconds: float, note: str = "") -> None:
+        self.phases.append(Phase(name, seconds * 1000, note))
+
+    @contextmanager
+    def phase(self, name: str):
+        p = Phase(name)
+        t0 = time.perf_counter()
+        try:
+            yield p
+        finally:
+            p.ms = (time.perf_counter() - t0) * 1000
+            self.phases.append(p)
+
+    def log(self) -> None:
+        total = (time.perf_counter() - self.started_at) * 1000
+        parts = [f"{p.name}={p.ms:.0f}ms" + (f" ({p.note})" if p.note else "") for p in self.phases]
+        logger.info("Startup: %s total=%.0fms", " ".join(parts), total)
+
+
+# (buyruq, i18n kaliti, standart tavsif)
+COMMANDS = [
+    ("start", "cmd.start", "Boshlash"),
+    ("new_review", "cmd.new_review", "Yangi sharh"),
+]
+
+# (katalog, language_code) — None: tilga bog‘lanmagan standart ro‘yxat
+COMMAND_SCOPES = [
+    ("uz", None),
+    ("uz", "uz"),
+    ("ru", "ru"),
+]
+
+
+def bot_commands(locale: str) -> list[BotCommand]:
+    t = I18N(locale).t
+    return [BotCommand(command=cmd, description=t(key, default)) for cmd, key, default in COMMANDS]
+
+
+def _commands_digest(commands: list[BotCommand]) -> str:
+    payload = json.dumps([[c.command, c.description] for c in commands], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def sync_bot_commands(bot: Bot, session: AsyncSession) -> int:
+    """
+    Har bir til uchun buyruqlar ro‘yxatini faqat o‘zgargan bo‘lsa yuboradi.
+    Yuborilgan ``set_my_commands`` chaqiruvlari sonini qaytaradi.
+    """
+    updated = 0
+    for locale, language_code in COMMAND_SCOPES:
+        commands = bot_commands(locale)
+        digest = _commands_digest(commands)
+        key = f"bot_commands:{bot.id}:{language_code or 'default'}"
+        if await crud.get_meta(session, key) == digest:
+            continue
+        await bot.set_my_commands(commands, language_code=language_code)
+        await crud.set_meta(session, key, digest)
+        updated += 1
+    return updated
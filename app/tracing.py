@@ -0,0 +1,386 @@
+"""
+Yengil tracing: har bir update uchun root span, ichida SQL so‘rovlar, Bot API chaqiruvlari
+va FSM storage operatsiyalari. Kontekst ``contextvars`` orqali uzatiladi (fon tasklar ham meros oladi).
+
+Tugagan trace lar OTLP/JSON formatida (har qatorda bitta ``resourceSpans``) aylanma fayllarga
+yoziladi — OpenTelemetry collector ning ``otlpjsonfile`` receiver i yoki Jaeger/otel-desktop-viewer
+bilan ochiladi. Yozish alohida threadda.
+"""
+import itertools
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterator
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app import metrics, runtime
+from app.config import settings
+from app.logs import log_context
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "sardoba-review-bot"
+MAX_SPANS_PER_TRACE = 1000
+STATEMENT_MAX_LEN = 1000
+
+spans_dropped = metrics.counter("trace_spans_dropped_total", "Spans dropped (trace too big or queue full)")
+traces_exported = metrics.counter("traces_exported_total", "Traces written to the span sink")
+
+
+@dataclass
+class _Trace:
+    trace_id: str
+    sampled: bool
+    spans: list["Span"] = field(default_factory=list)
+    exported: bool = False
+
+
+@dataclass
+class Span:
+    trace: _Trace
+    span_id: str
+    parent_id: str | None
+    name: str
+    attrs: dict[str, Any]
+    start_ns: int
+    end_ns: int = 0
+    error: str | None = None
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+
+current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+_ids = random.Random()
+_exporter: "SpanExporter | None" = None
+
+
+def _new_id(bits: int) -> str:
+    return f"{_ids.getrandbits(bits):0{bits // 4}x}"
+
+
+def start_span(name: str, parent: Span | None = None, **attrs: Any) -> Span | None:
+    """Joriy trace ichida yangi span; trace yo‘q bo‘lsa None (tracing o‘chiq yoki update tashqarisi)."""
+    parent = parent or current_span.get()
+    if parent is None:
+        return None
+    return Span(parent.trace, _new_id(64), parent.span_id, name, attrs, time.time_ns())
+
+
+def end_span(span: Span | None, error: BaseException | str | None = None) -> None:
+    if span is None:
+        return
+    span.end_ns = time.time_ns()
+    if error is not None:
+        span.error = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+    trace = span.trace
+    if trace.exported:
+        # Root tugagandan keyin tugagan span (masalan, fon task) — alohida yoziladi
+        _submit(trace, [span])
+    elif len(trace.spans) < MAX_SPANS_PER_TRACE:
+        trace.spans.append(span)
+    else:
+        spans_dropped.inc()
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Span | None]:
+    s = start_span(name, **attrs)
+    if s is None:
+        yield None
+        return
+    token = current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        end_span(s, e)
+        raise
+    else:
+        end_span(s)
+    finally:
+        current_span.reset(token)
+
+
+def _submit(trace: _Trace, spans: list[Span]) -> None:
+    if _exporter is not None and trace.sampled:
+        _exporter.submit(spans)
+
+
+# --- Update (root span) ---
+
+class TracingMiddleware(BaseMiddleware):
+    """
+    Outer (update) middleware: root span. ``TRACE_SAMPLE_RATE`` ulushdagi va ``TRACE_SLOW_MS`` dan
+    sekin update lar yoziladi (ya'ni span lar har doim yig‘iladi, qaror oxirida qilinadi).
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        trace = _Trace(_new_id(128), sampled=random.random() < settings.TRACE_SAMPLE_RATE)
+        attrs: dict[str, Any] = {}
+        if isinstance(event, Update):
+            attrs["update.id"] = event.update_id
+            attrs["update.type"] = event.event_type
+        user = data.get("event_from_user")
+        if user is not None:
+            attrs["user.id"] = user.id
+        root = Span(trace, _new_id(64), None, "update", attrs, time.time_ns())
+        token = current_span.set(root)
+        ctx = log_context.get()
+        if ctx is not None:
+            ctx["trace_id"] = trace.trace_id
+        error: BaseException | None = None
+        try:
+            return await handler(event, data)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            current_span.reset(token)
+            if ctx is not None and ctx.get("handler"):
+                root.name = f"update {ctx['handler']}"
+                root.attrs["handler"] = ctx["handler"]
+            end_span(root, error)
+            trace.exported = True
+            duration_ms = (root.end_ns - root.start_ns) / 1e6
+            if not trace.sampled and settings.TRACE_SLOW_MS and duration_ms >= settings.TRACE_SLOW_MS:
+                trace.sampled = True
+            _submit(trace, trace.spans)
+
+
+# --- Bot API ---
+
+class TracingRequestMiddleware(BaseRequestMiddleware):
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Any:
+        s = start_span(f"bot.{method.__api_method__}", **{"rpc.method": method.__api_method__})
+        if s is None:
+            return await make_request(bot, method)
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is not None:
+            s.set(**{"chat.id": chat_id})
+        try:
+            result = await make_request(bot, method)
+        except BaseException as e:
+            end_span(s, e)
+            raise
+        end_span(s)
+        return result
+
+
+# --- SQLAlchemy ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    s = start_span("db.query", **{"db.system": "postgresql", "db.statement": statement[:STATEMENT_MAX_LEN]})
+    if s is not None and context is not None:
+        context._trace_span = s
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    s = getattr(context, "_trace_span", None)
+    if s is not None:
+        if cursor is not None and cursor.rowcount is not None and cursor.rowcount >= 0:
+            s.set(**{"db.rows": cursor.rowcount})
+        end_span(s)
+        context._trace_span = None
+
+
+def _handle_error(exception_context) -> None:
+    context = exception_context.execution_context
+    s = getattr(context, "_trace_span", None)
+    if s is not None:
+        end_span(s, exception_context.original_exception)
+        context._trace_span = None
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    # Async engine da hodisalar greenlet ichida, lekin contextvars shu task niki
+    sync_engine = engine.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(sync_engine, "handle_error", _handle_error)
+
+
+# --- FSM storage ---
+
+class TracingStorage(BaseStorage):
+    """Istalgan FSM storage ni o‘rab, har bir chaqiruvni span sifatida yozadi."""
+
+    def __init__(self, storage: BaseStorage):
+        self.storage = storage
+
+    def __getattr__(self, name: str) -> Any:
+        # start() va boshqa storage ga xos metodlar
+        return getattr(self.storage, name)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        with span("fsm.set_state"):
+            await self.storage.set_state(key, state)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        with span("fsm.get_state"):
+            return await self.storage.get_state(key)
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        with span("fsm.set_data"):
+            await self.storage.set_data(key, data)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        with span("fsm.get_data"):
+            return await self.storage.get_data(key)
+
+    async def close(self) -> None:
+        await self.storage.close()
+
+
+# --- Export ---
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(s: Span) -> dict[str, Any]:
+    out: dict[str, Any] = {
+        "traceId": s.trace.trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": 2 if s.parent_id is None else 1,  # SERVER | INTERNAL
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(s.end_ns),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attrs.items()],
+        "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+    }
+    if s.parent_id is not None:
+        out["parentSpanId"] = s.parent_id
+    return out
+
+
+class SpanExporter:
+    """
+    Navbat + thread: span larni ``traces-w<worker>-*.jsonl`` fayllariga yozadi, hajm bo‘yicha
+    aylantiradi. ``keep`` — shu worker fayllari soni (qayta ishga tushgan oldingi jarayonnikilar ham
+    hisobga kiradi, boshqa workerlarnikiga tegilmaydi).
+    """
+
+    def __init__(
+        self, directory: str | Path, max_bytes: int, keep: int, resource: dict[str, Any], worker: int = 0
+    ):
+        self.dir = Path(directory)
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.resource = {"attributes": [{"key": k, "value": _otlp_value(v)} for k, v in resource.items()]}
+        self._prefix = f"traces-w{worker}-"
+        self._seq = itertools.count()
+        self._queue: queue.Queue = queue.Queue(maxsize=10_000)
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._file = None
+        self._size = 0
+
+    def start(self) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def submit(self, spans: list[Span]) -> None:
+        if not spans:
+            return
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            spans_dropped.inc(len(spans))
+
+    def _line(self, spans: list[Span]) -> bytes:
+        payload = {
+            "resourceSpans": [{
+                "resource": self.resource,
+                "scopeSpans": [{"scope": {"name": "app.tracing"}, "spans": [_otlp_span(s) for s in spans]}],
+            }]
+        }
+        return (runtime.json_dumps(payload) + "\n").encode("utf-8")
+
+    def _rotate(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        name = f"{self._prefix}{time.strftime('%Y%m%d-%H%M%S')}-{next(self._seq)}.jsonl"
+        self._file = open(self.dir / name, "ab")
+        self._size = 0
+        files = sorted(self.dir.glob(f"{self._prefix}*.jsonl"), key=lambda p: p.stat().st_mtime)
+        for old in files[: max(0, len(files) - self.keep)]:
+            old.unlink(missing_ok=True)
+
+    def _run(self) -> None:
+        while True:
+            spans = self._queue.get()
+            if spans is None:
+                break
+            try:
+                if self._file is None or self._size >= self.max_bytes:
+                    self._rotate()
+                line = self._line(spans)
+                self._file.write(line)
+                self._file.flush()
+                self._size += len(line)
+                if spans[-1].parent_id is None:
+                    traces_exported.inc()
+            except Exception:
+                logger.exception("Trace export failed")
+        if self._file is not None:
+            self._file.close()
+
+
+def start(bot: Bot, engine: AsyncEngine, worker: int = 0) -> None:
+    """Bot sessiyasi va engine ni instrument qiladi, eksport threadini ishga tushiradi."""
+    global _exporter
+    if _exporter is not None:
+        return
+    instrument_engine(engine)
+    bot.session.middleware(TracingRequestMiddleware())
+    _exporter = SpanExporter(
+        settings.TRACE_DIR,
+        max_bytes=settings.TRACE_FILE_MAX_MB * 1024 * 1024,
+        keep=settings.TRACE_FILE_KEEP,
+        resource={"service.name": SERVICE_NAME, "service.instance.id": f"{os.getpid()}", "worker": worker},
+        worker=worker,
+    )
+    _exporter.start()
+
+
+def stop() -> None:
+    global _exporter
+    if _exporter is not None:
+        _exporter.stop()
+        _exporter = None
@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import multiprocessing as mp
+import os
+import signal
+import time
+from typing import Any
+
+import aiohttp
+
+from app import runtime
+from app.config import settings
+from app.logs import setup_logging
+
+logger = logging.getLogger(__name__)
+
+POLL_TIMEOUT = 30
+RESTART_BACKOFF_MAX = 30.0
+# Shu vaqtdan ko‘p ishlagan worker "sog‘lom" hisoblanadi — backoff nolga tushadi
+HEALTHY_UPTIME = 60.0
+STOP_TIMEOUT = 10.0
+
+# Update turlari va chat ID si qayerda turishi
+_CHAT_PATHS = {
+    "message": ("chat", "id"),
+    "edited_message": ("chat", "id"),
+    "callback_query": ("message", "chat", "id"),
+}
+
+
+def chat_id_of(update: dict) -> int:
+    """Update qaysi chatga tegishli; chat bo‘lmasa foydalanuvchi ID si (FSM kaliti bilan mos)."""
+    for kind, path in _CHAT_PATHS.items():
+        obj = update.get(kind)
+        if obj is None:
+            continue
+        value: Any = obj
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        if value is not None:
+            return int(value)
+        return int((obj.get("from") or {}).get("id", 0))
+    return 0
+
+
+def shard_of(update: dict, workers: int) -> int:
+    return chat_id_of(update) % workers
+
+
+def worker_env(workers: int) -> dict[str, str]:
+    """
+    Umumiy byudjetlarni workerlar orasida teng bo‘ladi: DB ulanishlari (overflow siz) va
+    Bot API limitlari (``OUTBOUND_SHARDS`` — har bir sender global va guruh tezligining 1/N qismi).
+    ``WORKER_COUNT`` — jarayonlar soni (jarayon ichidagi statistikani ko‘rsatishda kerak).
+    """
+    return {
+        "DB_POOL_SIZE": str(max(1, settings.DB_POOL_BUDGET // workers)),
+        "DB_MAX_OVERFLOW": "0",
+        "OUTBOUND_SHARDS": str(workers),
+        "WORKERS": "0",
+        "WORKER_COUNT": str(workers),
+    }
+
+
+# --- Worker jarayoni ---
+
+def worker_main(index: int, queue: mp.Queue) -> None:
+    """Spawn qilingan jarayon: o‘z engine, Bot sessiyasi va Dispatcher i bilan update larni qayta ishlaydi."""
+    setup_logging(worker=index)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # to‘xtatishni supervisor boshqaradi
+    runtime.configure()
+    runtime.run(_worker_loop(index, queue))
+
+
+async def _worker_loop(index: int, queue: mp.Queue) -> None:
+    from aiogram.types import Update
+
+    from app.db.session import engine
+    from app.main import create_bot, create_dispatcher, serving
+    from app.startup import StartupReport
+
+    bot = create_bot()
+    dp = create_dispatcher(bot)
+    loop = asyncio.get_running_loop()
+    pending: set[asyncio.Task] = set()
+
+    # Fon ishlari faqat 0-workerda; har bir worker o‘z jurnaliga yozadi
+    async with serving(dp, bot, StartupReport(), worker=index):
+        while True:
+            raw = await loop.run_in_executor(None, queue.get)
+            if raw is None:
+                break
+            update = Update.model_validate(raw, context={"bot": bot})
+            task = asyncio.create_task(dp.feed_update(bot, update))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        await asyncio.gather(*pending, return_exceptions=True)
+    await bot.session.close()
+    await engine.dispose()
+
+
+# --- Supervisor ---
+
+class Supervisor:
+    """
+    Bitta poller update larni ``chat_id % N`` bo‘yicha N ta worker jarayoniga taqsimlaydi:
+    bir chatning barcha update lari (va FSM holati) doim bitta workerda bo‘ladi.
+    Yiqilgan worker backoff bilan qayta ishga tushiriladi.
+    """
+
+    def __init__(self, workers: int):
+        self.n = workers
+        self.ctx = mp.get_context("spawn")
+        self.queues = [self.ctx.Queue() for _ in range(workers)]
+        self.procs: list[mp.Process | None] = [None] * workers
+        self._started_at = [0.0] * workers
+        self._backoff = [0.0] * workers
+        self._restart_at = [0.0] * workers
+        self._stopping = asyncio.Event()
+
+    def _spawn(self, index: int) -> None:
+        proc = self.ctx.Process(
+            target=worker_main, args=(index, self.queues[index]), name=f"worker-{index}", daemon=True
+        )
+        proc.start()
+        self.procs[index] = proc
+        self._started_at[index] = time.monotonic()
+        logger.info("Worker %s started (pid=%s)", index, proc.pid)
+
+    async def _monitor(self) -> None:
+        while not self._stopping.is_set():
+            now = time.monotonic()
+            for i, proc in enumerate(self.procs):
+                if proc is not None and proc.is_alive():
+                    continue
+                if proc is not None:
+                    uptime = now - self._started_at[i]
+                    self._backoff[i] = 0.0 if uptime > HEALTHY_UPTIME else min(
+                        RESTART_BACKOFF_MAX, max(1.0, self._backoff[i] * 2)
+                    )
+                    self._restart_at[i] = now + self._backoff[i]
+                    logger.error(
+                        "Worker %s exited with code %s after %.0fs, restarting in %.0fs",
+                        i, proc.exitcode, uptime, self._backoff[i],
+                    )
+                    self.procs[i] = None
+                    # O‘lgan jarayon navbat qulfini ushlab qolgan bo‘lishi mumkin — yangi navbat
+                    # (undagi hali olinmagan update lar yo‘qoladi)
+                    self.queues[i].cancel_join_thread()
+                    self.queues[i].close()
+                    self.queues[i] = self.ctx.Queue()
+                if now >= self._restart_at[i]:
+                    self._spawn(i)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), 1.0)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, bot) -> None:
+        """getUpdates ni xom JSON sifatida o‘qiydi — supervisor update larni parse qilmaydi."""
+        from app.main import ALLOWED_UPDATES
+
+        http = await bot.session.create_session()
+        url = bot.session.api.api_url(token=bot.token, method="getUpdates")
+        offset = None
+        backoff = 1.0
+        while not self._stopping.is_set():
+            params: dict[str, Any] = {"timeout": POLL_TIMEOUT, "allowed_updates": ALLOWED_UPDATES}
+            if offset is not None:
+                params["offset"] = offset
+            try:
+                async with http.post(
+                    url, json=params, timeout=aiohttp.ClientTimeout(total=POLL_TIMEOUT + 10)
+                ) as resp:
+                    payload = await resp.json(loads=runtime.json_loads, content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning("getUpdates failed: %s, retry in %.0fs", e, backoff)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, RESTART_BACKOFF_MAX)
+                continue
+            if not payload.get("ok"):
+                retry = (payload.get("parameters") or {}).get("retry_after", backoff)
+                logger.warning("getUpdates error: %s, retry in %ss", payload.get("description"), retry)
+                await asyncio.sleep(retry)
+                continue
+            backoff = 1.0
+            for update in payload["result"]:
+                offset = update["update_id"] + 1
+                self.queues[shard_of(update, self.n)].put(update)
+
+    async def _stop_workers(self) -> None:
+        for q in self.queues:
+            q.put(None)
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for proc in self.procs:
+            if proc is None:
+                continue
+            await asyncio.to_thread(proc.join, max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                proc.terminate()
+
+    async def run(self) -> None:
+        from app.db.session import engine
+        from app.main import create_bot, prepare
+        from app.startup import StartupReport
+
+        bot = create_bot()
+        await prepare(bot, StartupReport())
+        await engine.dispose()
+
+        # spawn qilingan jarayon env ni startda meros oladi (settings import paytida o‘qiladi)
+        os.environ.update(worker_env(self.n))
+        for i in range(self.n):
+            self._spawn(i)
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stopping.set)
+
+        monitor = asyncio.create_task(self._monitor())
+        poller = asyncio.create_task(self._poll(bot))
+        logger.info("Supervisor: %s workers, db pool %s each", self.n, os.environ["DB_POOL_SIZE"])
+        try:
+            await self._stopping.wait()
+        finally:
+            poller.cancel()
+            await asyncio.gather(poller, return_exceptions=True)
+            await monitor
+            await self._stop_workers()
+            await bot.session.close()
@@ -0,0 +1,43 @@
+import pytest
+
+from app.handlers.admin import _parse_digest_args, _parse_setgroup_args
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        (None, None),
+        ("", None),
+        ("all", None),
+        ("off", []),
+        ("1,3", [1, 3]),
+        ("1, 3 5", [1, 3, 5]),
+    ],
+)
+def test_parse_setgroup_args(raw, expected):
+    assert _parse_setgroup_args(raw) == expected
+
+
+def test_parse_setgroup_args_rejects_garbage():
+    with pytest.raises(ValueError):
+        _parse_setgroup_args("1,x")
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ("off", (None, 0, True)),
+        ("hourly", ("hourly", 0, True)),
+        ("hourly quiet", ("hourly", 0, False)),
+        ("20", ("batch", 20, True)),
+        ("20 quiet", ("batch", 20, False)),
+    ],
+)
+def test_parse_digest_args(raw, expected):
+    assert _parse_digest_args(raw) == expected
+
+
+@pytest.mark.parametrize("raw", [None, "", "1", "weekly", "20 loud", "-5"])
+def test_parse_digest_args_rejects(raw):
+    with pytest.raises(ValueError):
+        _parse_digest_args(raw)
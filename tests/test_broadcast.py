@@ -0,0 +1,14 @@
+from app.broadcast import SENDER_SHARE, Broadcaster
+from app.sender import GLOBAL_RATE, OutboundSender
+
+
+def test_rate_is_capped_by_the_sender_share():
+    sender = OutboundSender.shard(None, shards=4)
+    broadcaster = Broadcaster(None, sender, rate=25)
+    assert broadcaster.interval == sender.global_interval / SENDER_SHARE
+    assert 1.0 / broadcaster.interval < GLOBAL_RATE / 4
+
+
+def test_rate_below_the_cap_is_kept():
+    broadcaster = Broadcaster(None, OutboundSender(None), rate=5)
+    assert broadcaster.interval == 1.0 / 5
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from app.cache import Region
+
+
+def _region(name: str) -> Region:
+    return Region(f"test_{name}", ttl=60)
+
+
+def test_concurrent_misses_share_one_load():
+    region = _region("single_flight")
+    loads = 0
+
+    async def load():
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def scenario():
+        results = await asyncio.gather(*(region.get("k", load) for _ in range(10)))
+        assert results == ["value"] * 10
+        assert await region.get("k", load) == "value"
+
+    asyncio.run(scenario())
+    assert loads == 1
+
+
+def test_invalidate_during_load_is_not_cached():
+    region = _region("epoch")
+    versions = iter(["stale", "fresh"])
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def slow_load():
+            value = next(versions)
+            await gate.wait()
+            return value
+
+        first = asyncio.create_task(region.get("k", slow_load))
+        await asyncio.sleep(0)
+        region.invalidate("k")  # yuklash davomida ma'lumot o‘zgardi
+        gate.set()
+        assert await first == "stale"  # chaqiruvchi o‘z natijasini oladi, lekin keshga tushmaydi
+        assert await region.get("k", slow_load) == "fresh"
+
+    asyncio.run(scenario())
+
+
+def test_waiters_retry_when_leader_is_cancelled():
+    region = _region("leader_gone")
+    calls = 0
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                await gate.wait()
+            return calls
+
+        leader = asyncio.create_task(region.get("k", load))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(region.get("k", load))
+        await asyncio.sleep(0)
+        leader.cancel()
+        assert await waiter == 2
+
+    asyncio.run(scenario())
+
+
+def test_errors_are_shared_and_not_cached():
+    region = _region("errors")
+    calls = 0
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("db down")
+
+    async def scenario():
+        results = await asyncio.gather(*(region.get("k", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert calls == 1
+        with pytest.raises(RuntimeError):
+            await region.get("k", failing)
+        assert calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_ttl_and_max_entries(monkeypatch):
+    from app import cache
+
+    now = [0.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    region = Region("test_ttl", ttl=10, max_entries=2)
+
+    async def value(v):
+        return v
+
+    async def scenario():
+        await region.get("a", lambda: value(1))
+        await region.get("b", lambda: value(2))
+        await region.get("c", lambda: value(3))
+        assert "a" not in region._data
+        now[0] += 11
+        assert await region.get("b", lambda: value(20)) == 20
+
+    asyncio.run(scenario())
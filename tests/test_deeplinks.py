@@ -0,0 +1,27 @@
+import pytest
+
+from app.deeplinks import parse_review_payload, review_link, review_payload
+
+
+@pytest.mark.parametrize(
+    "payload, expected",
+    [
+        ("b3", (3, None)),
+        ("b3_r5", (3, 5)),
+        ("b12_r1", (12, 1)),
+        ("b3_r6", None),
+        ("b3_r0", None),
+        ("3", None),
+        ("b3_r5x", None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_parse_review_payload(payload, expected):
+    assert parse_review_payload(payload) == expected
+
+
+def test_payload_round_trip():
+    assert parse_review_payload(review_payload(7, 4)) == (7, 4)
+    assert parse_review_payload(review_payload(7)) == (7, None)
+    assert review_link("sardoba_bot", 7, 4) == "https://t.me/sardoba_bot?start=b7_r4"
@@ -0,0 +1,28 @@
+from app.db.diagnostics import normalize_sql, redact
+
+
+def test_normalize_sql_replaces_literals_and_params():
+    assert normalize_sql("SELECT * FROM users WHERE tg_id = 12345 AND phone = '+998 90'") == (
+        "SELECT * FROM users WHERE tg_id = ? AND phone = ?"
+    )
+    assert normalize_sql("SELECT id FROM reviews WHERE id = $1 AND branch_id = %(branch_id_1)s") == (
+        "SELECT id FROM reviews WHERE id = ? AND branch_id = ?"
+    )
+
+
+def test_normalize_sql_collapses_in_lists_and_whitespace():
+    a = normalize_sql("SELECT 1 FROM t WHERE id IN ($1, $2, $3)")
+    b = normalize_sql("SELECT 1\n  FROM t\n WHERE id IN (%s, %s)")
+    assert a == b == "SELECT ? FROM t WHERE id IN (...)"
+
+
+def test_normalize_sql_keeps_identifiers_with_digits_and_casts():
+    assert normalize_sql("SELECT r1, r5 FROM branch_daily_stats WHERE day > :d::date") == (
+        "SELECT r1, r5 FROM branch_daily_stats WHERE day > ?::date"
+    )
+
+
+def test_redact_hides_values():
+    assert redact(("+998901234567", 5, None, True)) == ["<str:13>", "<int>", None, True]
+    assert redact({"text": "salom"}) == {"text": "<str:5>"}
+    assert redact(list(range(12))) == ["<int>"] * 10 + ["..."]
@@ -0,0 +1,57 @@
+import asyncio
+import csv
+import io
+
+import pytest
+
+from app import export
+
+
+def _row(n, text="ok", phone="+998901234567"):
+    return (n, None, 5, text, 1, "Filial", "Филиал", 100 + n, "Ali", None, phone, None)
+
+
+async def _chunks(*chunks):
+    for rows in chunks:
+        yield rows
+
+
+def _read_csv(spool) -> list[list[str]]:
+    return list(csv.reader(io.StringIO(spool.getvalue().decode("utf-8-sig"))))
+
+
+def test_csv_escapes_formulas_and_strips_control_chars():
+    spool = io.BytesIO()
+    rows = [_row(1, text="=HYPERLINK(\"x\")"), _row(2, text="a\x0bb")]
+    count = asyncio.run(export._write_csv(spool, _chunks(rows), max_bytes=10**6))
+    assert count == 2
+    header, first, second = _read_csv(spool)
+    assert header == export.EXPORT_COLUMNS
+    assert first[3] == "'=HYPERLINK(\"x\")"
+    assert first[10] == "'+998901234567"
+    assert second[3] == "ab"
+
+
+def test_csv_stops_once_over_the_limit():
+    spool = io.BytesIO()
+    rows = [_row(n, text="x" * 100) for n in range(10)]
+    with pytest.raises(export.ExportTooBig):
+        asyncio.run(export._write_csv(spool, _chunks(rows, rows, rows), max_bytes=1500))
+    assert spool.tell() < 2 * 1500
+
+
+@pytest.mark.skipif(not export.xlsx_available(), reason="openpyxl is not installed")
+def test_xlsx_splits_sheets_at_the_row_limit(monkeypatch):
+    from openpyxl import load_workbook
+
+    monkeypatch.setattr(export, "XLSX_MAX_ROWS", 3)
+    spool = io.BytesIO()
+    rows = [_row(n, text="=1+1" if n == 0 else "a\x0bb") for n in range(5)]
+    assert asyncio.run(export._write_xlsx(spool, _chunks(rows), max_bytes=10**6)) == 5
+    spool.seek(0)
+    wb = load_workbook(spool, read_only=True)
+    assert wb.sheetnames == ["reviews", "reviews_2", "reviews_3"]
+    values = [r for ws in wb.worksheets for r in ws.iter_rows(min_row=2, values_only=True)]
+    assert [r[0] for r in values] == list(range(5))
+    assert values[0][3] == "'=1+1"
+    assert values[1][3] == "ab"
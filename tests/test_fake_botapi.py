@@ -0,0 +1,117 @@
+"""OutboundSender va PhotoArchive haqiqiy HTTP orqali — ``app.fake_botapi`` serveriga qarshi."""
+import asyncio
+import hashlib
+import socket
+from contextlib import asynccontextmanager
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import InputMediaPhoto
+
+from app import photo_archive
+from app.fake_botapi import FakeBotAPI
+from app.photo_archive import PhotoArchive
+from app.sender import OutboundSender
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@asynccontextmanager
+async def fake_bot(**kwargs):
+    api = FakeBotAPI(**kwargs)
+    url = await api.start(port=_free_port())
+    bot = Bot("42:TEST", session=AiohttpSession(api=TelegramAPIServer.from_base(url, is_local=api.local)))
+    try:
+        yield api, bot
+    finally:
+        await bot.session.close()
+        await api.stop()
+
+
+def test_sender_packs_texts_and_counts_album_photos():
+    async def scenario():
+        async with fake_bot() as (api, bot):
+            sender = OutboundSender(bot, global_rate=1000, private_interval=0, group_interval=0)
+            sent = await sender.send_texts(100, [f"<b>#{i}</b> sharh" for i in range(3)], parse_mode="HTML")
+            album = [InputMediaPhoto(media=f"photo-{i}") for i in range(3)]
+            messages = await sender.send_media_group(-100, album)
+            return api, sent, messages
+
+    api, sent, messages = asyncio.run(scenario())
+    assert sent == 1
+    assert api.methods() == ["sendMessage", "sendMediaGroup"]
+    _, params = api.calls[0]
+    assert params["text"] == "<b>#0</b> sharh\n\n<b>#1</b> sharh\n\n<b>#2</b> sharh"
+    assert [m.chat.id for m in messages] == [-100] * 3
+
+
+def test_sender_spaces_group_messages():
+    async def scenario():
+        async with fake_bot() as (api, bot):
+            sender = OutboundSender(bot, global_rate=1000, private_interval=0, group_interval=0.05)
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await asyncio.gather(*(sender.send_message(-100, str(i)) for i in range(4)))
+            return loop.time() - started, api
+
+    elapsed, api = asyncio.run(scenario())
+    assert api.methods() == ["sendMessage"] * 4
+    # 4 ta xabar — 3 ta interval; event loop taymerni bir tik erta uyg‘otishi mumkin
+    assert elapsed >= 0.15 - 0.01
+
+
+class _Session:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return None
+
+
+def _archive_once(monkeypatch, tmp_path, local: bool) -> tuple[list[dict], list[str]]:
+    saved: list[dict] = []
+
+    async def save_photo_blob(session, **kwargs):
+        saved.append(kwargs)
+
+    monkeypatch.setattr(photo_archive, "SessionLocal", _Session)
+    monkeypatch.setattr(photo_archive.crud, "save_photo_blob", save_photo_blob)
+
+    async def scenario():
+        async with fake_bot(local=local, files_dir=tmp_path / "botapi") as (api, bot):
+            archive = PhotoArchive(bot, tmp_path / "photos")
+            await archive._archive_one(1, "photo-a")
+            await archive._archive_one(2, "photo-a")  # bir xil kontent — bitta fayl
+            return api.methods()
+
+    return saved, asyncio.run(scenario())
+
+
+def test_photo_archive_downloads_over_http(monkeypatch, tmp_path):
+    saved, methods = _archive_once(monkeypatch, tmp_path, local=False)
+    unique = hashlib.md5(b"photo-a").hexdigest()[:16]
+    content = FakeBotAPI._file_bytes(unique)
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    assert methods == ["getFile", "getFile"]
+    assert [s["photo_id"] for s in saved] == [1, 2]
+    assert saved[0]["file_unique_id"] == unique
+    assert saved[0]["sha256"] == sha256
+    assert saved[0]["size"] == len(content)
+    stored = tmp_path / "photos" / saved[0]["path"]
+    assert stored.read_bytes() == content
+    assert list((tmp_path / "photos").rglob("*.jpg")) == [stored]
+    assert not list((tmp_path / "photos").rglob("*.part"))
+
+
+def test_photo_archive_copies_local_files(monkeypatch, tmp_path):
+    saved, methods = _archive_once(monkeypatch, tmp_path, local=True)
+    assert methods == ["getFile", "getFile"]
+    stored = tmp_path / "photos" / saved[0]["path"]
+    source = next((tmp_path / "botapi").rglob("*.jpg"))
+    assert stored.read_bytes() == source.read_bytes()
@@ -0,0 +1,108 @@
+import asyncio
+
+from aiogram.fsm.storage.base import StorageKey
+
+from app import fsm_storage
+from app.fsm_storage import TTLMemoryStorage
+
+
+def _key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=42, chat_id=user_id, user_id=user_id)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _storage(monkeypatch, **kwargs) -> tuple[TTLMemoryStorage, Clock]:
+    clock = Clock()
+    monkeypatch.setattr(fsm_storage.time, "monotonic", clock)
+    return TTLMemoryStorage(sweep_interval=0, **kwargs), clock
+
+
+def test_reads_do_not_create_records(monkeypatch):
+    storage, _ = _storage(monkeypatch)
+
+    async def scenario():
+        assert await storage.get_state(_key(1)) is None
+        assert await storage.get_data(_key(1)) == {}
+        await storage.set_data(_key(1), {})
+        await storage.set_state(_key(1), None)
+
+    asyncio.run(scenario())
+    assert len(storage._records) == 0
+
+
+def test_clear_removes_record(monkeypatch):
+    storage, _ = _storage(monkeypatch)
+
+    async def scenario():
+        await storage.set_state(_key(1), "ReviewForm:text")
+        await storage.set_data(_key(1), {"branch_id": 3})
+        # FSMContext.clear() = set_state(None) + set_data({})
+        await storage.set_state(_key(1), None)
+        await storage.set_data(_key(1), {})
+
+    asyncio.run(scenario())
+    assert len(storage._records) == 0
+    assert storage._bytes == 0
+
+
+def test_ttl_expiry_and_activity_extends_it(monkeypatch):
+    storage, clock = _storage(monkeypatch, ttl=60)
+
+    async def scenario():
+        await storage.set_state(_key(1), "a")
+        await storage.set_state(_key(2), "b")
+        clock.now += 50
+        assert await storage.get_state(_key(1)) == "a"  # faollik — muddat uzayadi
+        clock.now += 20
+        assert await storage.get_state(_key(2)) is None
+        assert await storage.get_state(_key(1)) == "a"
+
+    asyncio.run(scenario())
+    assert list(storage._records) == [_key(1)]
+
+
+def test_sweep_drops_expired_from_the_front(monkeypatch):
+    storage, clock = _storage(monkeypatch, ttl=60)
+
+    async def scenario():
+        for user_id in range(5):
+            await storage.set_state(_key(user_id), "s")
+            clock.now += 10
+
+    asyncio.run(scenario())
+    clock.now += 25  # 0 va 1 ning muddati (60, 70) o‘tdi
+    assert storage.sweep() == 2
+    assert [k.user_id for k in storage._records] == [2, 3, 4]
+
+
+def test_lru_eviction_by_entries(monkeypatch):
+    storage, _ = _storage(monkeypatch, max_entries=3)
+
+    async def scenario():
+        for user_id in range(3):
+            await storage.set_state(_key(user_id), "s")
+        await storage.get_state(_key(0))  # 0 eng yangi ishlatilgan bo‘ladi
+        await storage.set_state(_key(3), "s")
+
+    asyncio.run(scenario())
+    assert [k.user_id for k in storage._records] == [2, 0, 3]
+
+
+def test_lru_eviction_by_bytes_keeps_current_record(monkeypatch):
+    storage, _ = _storage(monkeypatch, max_bytes=600)
+
+    async def scenario():
+        await storage.set_data(_key(1), {"text": "x" * 200})
+        await storage.set_data(_key(2), {"text": "x" * 200})
+        await storage.set_data(_key(3), {"text": "x" * 1000})
+
+    asyncio.run(scenario())
+    assert [k.user_id for k in storage._records] == [3]
+    assert storage._bytes == fsm_storage.approx_size({"text": "x" * 1000})
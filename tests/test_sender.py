@@ -0,0 +1,77 @@
+import re
+
+from app.sender import pack_texts
+
+CARD = (
+    "#{n} | ⭐ 5\n"
+    "👤 <a href='tg://user?id={n}'>Ali &amp; Vali</a> | 📱 +998901234567\n"
+    "📍 Sardoba (5-mkr)\n"
+    "💬 {text}"
+)
+
+
+def _assert_no_cut_markup(chunk: str) -> None:
+    assert not re.search(r"<[^>]*$", chunk)
+    assert not re.search(r"^[^<]*>", chunk)
+    assert not re.search(r"&[a-z#0-9]*$", chunk)
+
+
+def _assert_balanced(chunk: str) -> None:
+    # Har bir bo‘lak alohida parse qilinadi: teglar yopilgan, teg/entity kesilmagan
+    _assert_no_cut_markup(chunk)
+    assert chunk.count("<a ") == chunk.count("</a>")
+
+
+def test_merges_short_texts():
+    assert pack_texts(["a", "b", "c"], limit=10) == ["a\n\nb\n\nc"]
+    assert pack_texts(["aaaa", "bbbb"], limit=9) == ["aaaa", "bbbb"]
+
+
+def test_long_text_is_split_at_card_boundaries():
+    cards = [CARD.format(n=n, text="x" * 40) for n in range(10)]
+    text = "\n\n".join(cards)
+    chunks = pack_texts([text], limit=400)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert len(chunk) <= 400
+        assert chunk.startswith("#")
+        _assert_balanced(chunk)
+    assert "\n\n".join(chunks) == text
+
+
+def test_never_cuts_inside_markup():
+    card = CARD.format(n=1, text="so‘z " * 30)
+    link = re.search(r"<a .*?</a>", card).group()
+    for limit in range(len(link), len(card)):
+        chunks = pack_texts([card], limit=limit)
+        for chunk in chunks:
+            assert len(chunk) <= limit
+            _assert_balanced(chunk)
+        assert "".join(chunks).replace(" ", "").replace("\n", "") == card.replace(" ", "").replace("\n", "")
+
+
+def test_element_longer_than_limit_is_closed_and_reopened():
+    link = "<a href='tg://user?id=1'>" + "Ali &amp; Vali " * 10 + "</a>"
+    text = re.sub(r"<[^>]*>", "", link)
+    for limit in range(12, len(link)):
+        chunks = pack_texts([link], limit=limit)
+        for chunk in chunks:
+            assert len(chunk) <= limit
+            _assert_balanced(chunk)
+        plain = "".join(re.sub(r"<[^>]*>", "", c) for c in chunks)
+        assert plain.replace(" ", "") == text.replace(" ", "")
+
+
+def test_nested_elements_are_reopened_in_order():
+    text = "<b>bold <i>" + "italic " * 20 + "</i> tail</b>"
+    for chunk in pack_texts([text], limit=60):
+        assert len(chunk) <= 60
+        _assert_no_cut_markup(chunk)
+        assert chunk.startswith("<b>") and chunk.endswith("</b>")
+        assert chunk.count("<i>") == chunk.count("</i>")
+
+
+def test_long_text_flushes_pending_chunk():
+    chunks = pack_texts(["head", "word " * 5], limit=12)
+    assert chunks[0] == "head"
+    assert all(len(c) <= 12 for c in chunks)